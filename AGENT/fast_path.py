@@ -0,0 +1,70 @@
+import re
+from typing import Dict, List
+
+
+# Queries that only ask to find/recall what the notes say can skip tool selection
+RETRIEVAL_PATTERNS = [
+    r"^\s*(найди|найти|поищи|ищи|отыщи|подбери)\b",
+    r"^\s*(что|где|когда|как)\b.*\bв\s+(моих\s+|своих\s+)?заметк",
+    r"\b(по|из)\s+(моим\s+)?заметкам\b",
+    r"^\s*(find|search|look\s+up|lookup)\b",
+    r"\b(in|from)\s+my\s+notes\b",
+    r"\bnotes?\s+(about|on|mentioning)\b",
+]
+
+# Anything that writes, deletes or needs the folder tree still goes through the agent
+AGENT_PATTERNS = [
+    r"\b(созда\w*|удал\w*|измен\w*|редакт\w*|отредакт\w*|перепиш\w*|переимен\w*|добав\w*|запиш\w*|сохран\w*)",
+    r"\b(create|delete|remove|edit|update|rename|write|append|save)\b",
+    r"\bструктур\w*|\bпапк\w*|\bдиректор\w*",
+    r"\b(structure|folder|directory|tree)\b",
+    r"\.(md|txt)\b",
+]
+
+_RETRIEVAL_RE = [re.compile(p, re.IGNORECASE | re.UNICODE) for p in RETRIEVAL_PATTERNS]
+_AGENT_RE = [re.compile(p, re.IGNORECASE | re.UNICODE) for p in AGENT_PATTERNS]
+
+
+def is_lookup(query: str) -> bool:
+    """True when the query asks to find something in the notes, whatever else it asks for."""
+    return any(p.search(query) for p in _RETRIEVAL_RE)
+
+
+def classify_query(query: str) -> str:
+    """Returns "retrieval" for pure note-lookup questions and "agent" for everything else."""
+    if any(p.search(query) for p in _AGENT_RE):
+        return "agent"
+    if is_lookup(query):
+        return "retrieval"
+    return "agent"
+
+
+def build_rag_prompt(
+    query: str,
+    documents: List[str],
+    metadatas: List[Dict] | None = None,
+    history: List[Dict[str, str]] | None = None,
+    max_turn_chars: int = 1000
+) -> str:
+    metadatas = metadatas or [{}] * len(documents)
+    context = "\n\n".join(
+        f"[{i + 1}] ({(meta or {}).get('source', 'unknown')})\n{doc}"
+        for i, (doc, meta) in enumerate(zip(documents, metadatas))
+    )
+
+    dialogue = ""
+    if history:
+        # Follow-up questions ("а про второе?") only make sense with the preceding turns
+        lines = "\n".join(
+            f"{'Пользователь' if turn['role'] == 'user' else 'Ассистент'}: {turn['content'][:max_turn_chars]}"
+            for turn in history
+        )
+        dialogue = f"\nНЕДАВНИЙ ДИАЛОГ:\n{lines}\n"
+
+    return f"""Ответь на вопрос пользователя, опираясь только на фрагменты его заметок ниже.
+Если в заметках нет ответа, так и скажи. Указывай номера фрагментов, на которые ссылаешься.
+{dialogue}
+ФРАГМЕНТЫ ЗАМЕТОК:
+{context}
+
+ВОПРОС: {query}"""
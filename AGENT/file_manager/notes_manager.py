@@ -6,6 +6,7 @@ class NotesManager():
     def __init__(self, notes_directory):
         self.notes_dir = Path(notes_directory)
         self.notes_dir.mkdir(parents=True, exist_ok=True)
+        self.metadata = {}
 
     def read_note(self, filename: str):
         filepath = self.notes_dir / filename
@@ -0,0 +1,82 @@
+from concurrent.futures import Executor, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Any, Dict, Optional
+
+from langchain.agents.middleware import AgentMiddleware, hook_config
+from langchain_core.messages import AIMessage, ToolMessage
+
+from AGENT.run_budget import call_within, current_run_budget, current_turn, partial_answer
+from LLM.tokens import usage_from_messages
+from MONITORING.tracing import span
+
+
+class RunBudgetMiddleware(AgentMiddleware):
+    """Stops the agent loop once the active RunBudget is exhausted.
+
+    Model and tool calls get the remaining run time as their timeout. A call
+    that overruns it is abandoned to finish in the background, and the turn
+    ends with a partial answer.
+    """
+
+    def __init__(self, max_workers: int = 16, executor: Optional[Executor] = None):
+        super().__init__()
+        self._executor = executor or ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="agent-call")
+
+    def _with_deadline(self, budget, handler, request):
+        return call_within(budget, self._executor, handler, request)
+
+    @hook_config(can_jump_to=["end"])
+    def before_model(self, state, runtime) -> Dict[str, Any] | None:
+        budget = current_run_budget.get()
+        if budget is None:
+            return None
+
+        budget.tokens = usage_from_messages(current_turn(state["messages"]))["total_tokens"]
+        limit = budget.check()
+        if limit is None:
+            budget.steps += 1
+            return None
+
+        return {
+            "jump_to": "end",
+            "messages": [AIMessage(content=partial_answer(state["messages"], limit))],
+        }
+
+    def wrap_model_call(self, request, handler):
+        budget = current_run_budget.get()
+        if budget is None:
+            return handler(request)
+        try:
+            return self._with_deadline(budget, handler, request)
+        except FutureTimeoutError:
+            return AIMessage(content=partial_answer(request.messages, budget.limit_hit))
+
+    def wrap_tool_call(self, request, handler):
+        budget = current_run_budget.get()
+        if budget is None:
+            return handler(request)
+        if budget.check() in ("max_seconds", "max_tokens"):
+            return self._skipped(request, f"Инструмент пропущен: исчерпан лимит {budget.limit_hit}")
+        try:
+            return self._with_deadline(budget, handler, request)
+        except FutureTimeoutError:
+            return self._skipped(request, f"Инструмент не уложился в лимит {budget.limit_hit}, результат неизвестен")
+
+    @staticmethod
+    def _skipped(request, content):
+        return ToolMessage(
+            content=content,
+            tool_call_id=request.tool_call["id"],
+            name=request.tool_call["name"],
+            status="error",
+        )
+
+
+class TracingMiddleware(AgentMiddleware):
+    """Wraps every tool call in a span, nested under the agent turn that issued it."""
+
+    def wrap_tool_call(self, request, handler):
+        with span("tool.call", tool=request.tool_call["name"]) as s:
+            result = handler(request)
+            content = getattr(result, "content", "")
+            s.set(result_chars=len(content) if isinstance(content, str) else 0, tool_status=getattr(result, "status", "success"))
+            return result
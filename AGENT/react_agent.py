@@ -2,19 +2,39 @@ import os
 import sys
 import json
 import logging
+import sqlite3
+import threading
+import time
+import contextvars
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from contextlib import contextmanager
+from pathlib import Path
 from typing import Optional, Dict, Any, List
 from uuid import uuid4
 from datetime import datetime
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from langchain.agents import create_agent
-from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
-from langchain_core.tools import BaseTool
+from langchain_core.messages import HumanMessage, AIMessage, SystemMessage, ToolMessage
 
 from AGENT.tools import FileOperationTools
+from AGENT.fast_path import classify_query, build_rag_prompt, is_lookup
+from AGENT.run_budget import RunBudget, call_within, current_run_budget, partial_answer
 from RAG.notes_rag import RAGAssistant
-from LLM.openrouter_llm import OpenRouterAdapter, openrouter_config
+from LLM.tokens import usage_from_messages
+from MONITORING.metrics import registry, count_items, observe_stage
+from MONITORING.tracing import span
+from MONITORING.profiling import profiled
+
+class AgentSession:
+    """Per-user conversation state; everything else in ReActAgent is shareable."""
+
+    def __init__(self, thread_id: Optional[str] = None, history_limit: int = 100):
+        self.thread_id = thread_id or str(uuid4())
+        self.conversation_history: deque = deque(maxlen=history_limit)
+        self.last_run_metrics: Dict[str, Any] = {}
+
 
 class ReActAgent:
     def __init__(
@@ -22,14 +42,51 @@ class ReActAgent:
         notes_dir: str,
         persist_dir: str = "./vectorstorage",
         verbose: bool = True,
-        max_iterations: int = 5
+        max_iterations: int = 5,
+        max_seconds: float = 60.0,
+        max_run_tokens: int = 20000,
+        max_tool_concurrency: int = 4,
+        llm: Optional[Any] = None,
+        llm_providers: Optional[List[str]] = None,
+        rag_assistant: Optional[RAGAssistant] = None,
+        thread_id: Optional[str] = None,
+        checkpoint_path: Optional[str] = None,
+        summary_trigger_tokens: int = 4000,
+        summary_keep_messages: int = 20,
+        history_limit: int = 100,
+        fast_path: bool = True,
+        fast_path_k: int = 5,
+        fast_path_context_tokens: Optional[int] = None,
+        fast_path_history: int = 6,
+        prefetch: bool = True
     ):
-        self.thread_id = str(uuid4())
+        self.history_limit = history_limit
+        self.default_session = AgentSession(thread_id, history_limit)
         
         self.notes_dir = notes_dir
         self.persist_dir = persist_dir
         self.verbose = verbose
         self.max_iterations = max_iterations
+        self.max_seconds = max_seconds
+        self.max_run_tokens = max_run_tokens
+        self.max_tool_concurrency = max_tool_concurrency
+        self.llm = llm
+        self.rag_assistant = rag_assistant
+        self.llm_providers = llm_providers or os.getenv("LLM_PROVIDERS", "openrouter").split(",")
+        self.checkpoint_path = checkpoint_path or os.getenv(
+            "AGENT_CHECKPOINT_PATH", os.path.join(persist_dir, "checkpoints.sqlite")
+        )
+        self.summary_trigger_tokens = summary_trigger_tokens
+        self.summary_keep_messages = summary_keep_messages
+        self.fast_path = fast_path
+        self.fast_path_k = fast_path_k
+        # When set, fast-path hits are widened to neighbouring chunks within this budget
+        self.fast_path_context_tokens = fast_path_context_tokens
+        self.fast_path_history = fast_path_history
+        self.prefetch = prefetch
+        self._prefetch_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="rag-prefetch")
+        # Model/tool calls bounded by the run's remaining time, on both paths
+        self._call_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="agent-call")
         
         self.logger = self._setup_logger()
         self.logger.info("Initializing ReActAgent...")
@@ -37,13 +94,43 @@ class ReActAgent:
         self._init_llm()
         self._init_rag()
         self._init_tools()
+        self._init_checkpointer()
         
-        self.agent = self._create_agent()
+        self._agent = None
+        self._agent_lock = threading.Lock()
         
-        self.conversation_history: List[Dict[str, str]] = []
+        self.path_stats: Dict[str, Dict[str, float]] = {
+            path: {"count": 0, "llm_calls": 0, "total_latency": 0.0, "prefetch_issued": 0, "prefetch_hits": 0}
+            for path in ("fast", "agent")
+        }
+        self._path_stats_lock = threading.Lock()
         
         self.logger.info("✓ ReActAgent initialized successfully")
 
+    @property
+    def thread_id(self) -> str:
+        return self.default_session.thread_id
+
+    @property
+    def conversation_history(self) -> deque:
+        return self.default_session.conversation_history
+
+    @property
+    def last_run_metrics(self) -> Dict[str, Any]:
+        return self.default_session.last_run_metrics
+
+    @property
+    def agent(self):
+        # Building the graph imports langchain.agents/langgraph; defer it to the first agent-path query
+        if self._agent is None:
+            with self._agent_lock:
+                if self._agent is None:
+                    self._agent = self._create_agent()
+        return self._agent
+
+    def new_session(self, thread_id: Optional[str] = None) -> AgentSession:
+        return AgentSession(thread_id, self.history_limit)
+
     def _setup_logger(self) -> logging.Logger:
         logger = logging.getLogger(f"ReActAgent-{self.thread_id[:8]}")
         logger.setLevel(logging.DEBUG if self.verbose else logging.INFO)
@@ -60,21 +147,38 @@ class ReActAgent:
         return logger
 
     def _init_llm(self):
-        self.llm = OpenRouterAdapter(openrouter_config)
-        self.logger.debug("LLM initialized")
+        if self.llm is None:
+            from LLM.router import create_router
+            self.llm = create_router(self.llm_providers)
+        self.logger.debug("LLM initialized: %s", type(self.llm).__name__)
 
     def _init_rag(self):
-        self.rag_assistant = RAGAssistant(
-            notes_dir=self.notes_dir,
-            persist_dir=self.persist_dir
-        )
+        if self.rag_assistant is None:
+            self.rag_assistant = RAGAssistant(
+                notes_dir=self.notes_dir,
+                persist_dir=self.persist_dir
+            )
         self.logger.debug("RAG system initialized")
 
     def _init_tools(self):
         self.tools_manager = FileOperationTools(notes_dir=self.notes_dir)
         self.tools_manager.rag_assistant = self.rag_assistant
         self.tools_functions = self.tools_manager.create_tools()
-        self.logger.debug(f"Created {len(self.tools_functions)} tools")
+        self.logger.debug("Created %s tools", len(self.tools_functions))
+
+    def _init_checkpointer(self):
+        try:
+            from langgraph.checkpoint.sqlite import SqliteSaver
+        except ImportError:
+            from langgraph.checkpoint.memory import InMemorySaver
+            self.logger.warning("langgraph-checkpoint-sqlite не установлен, память диалога не переживёт перезапуск")
+            self.checkpointer = InMemorySaver()
+            return
+
+        Path(self.checkpoint_path).parent.mkdir(parents=True, exist_ok=True)
+        connection = sqlite3.connect(self.checkpoint_path, check_same_thread=False)
+        self.checkpointer = SqliteSaver(connection)
+        self.logger.debug("Checkpointer initialized at %s", self.checkpoint_path)
 
     def _create_system_prompt(self) -> str:
         tools_info = "\n".join([
@@ -103,30 +207,103 @@ class ReActAgent:
 Всегда будьте конкретны и полезны в своих ответах."""
 
     def _create_agent(self):
+        from langchain.agents import create_agent
+        from langchain.agents.middleware import SummarizationMiddleware
+        from AGENT.middleware import RunBudgetMiddleware, TracingMiddleware
+
         system_prompt = self._create_system_prompt()
         
+        # Older turns are rolled into a running summary once the thread outgrows the trigger
+        summarization = SummarizationMiddleware(
+            model=self.llm,
+            trigger=("tokens", self.summary_trigger_tokens),
+            keep=("messages", self.summary_keep_messages),
+        )
+
         agent = create_agent(
             model=self.llm,
             tools=self.tools_functions,
             system_prompt=system_prompt,
+            middleware=[summarization, RunBudgetMiddleware(executor=self._call_executor), TracingMiddleware()],
+            checkpointer=self.checkpointer,
         )
         
         self.logger.debug("Agent created with create_agent API")
         return agent
 
-    def answer(self, query: str) -> str:
-        self.logger.info(f"Processing query: {query[:80]}...")
-        self.conversation_history.append({"role": "user", "content": query})
+    def _run_config(self, session: AgentSession) -> Dict[str, Any]:
+        # Tool calls emitted in one model turn are dispatched as parallel graph tasks;
+        # max_concurrency bounds how many of them run at once
+        return {
+            "configurable": {"thread_id": session.thread_id},
+            "max_concurrency": self.max_tool_concurrency,
+            # Backstop only: RunBudgetMiddleware normally ends the loop long before this
+            "recursion_limit": self.max_iterations * 4 + 10
+        }
 
+    @contextmanager
+    def _run_scope(self, query: str, prefetch: bool = True):
+        budget = RunBudget(
+            max_steps=self.max_iterations,
+            max_seconds=self.max_seconds,
+            max_tokens=self.max_run_tokens
+        )
+        token = current_run_budget.set(budget)
         try:
-            response = self.agent.invoke({
-                "messages": [HumanMessage(content=query)]
-            })
+            with self.tools_manager.run_scope() as tool_cache:
+                # Only lookups are likely to start with a search; anything else would
+                # just occupy the shared prefetch workers
+                if prefetch and self.prefetch and is_lookup(query):
+                    # Speculatively run the search the model will most likely ask for
+                    # while its first tool-selection call is still in flight
+                    future = self._prefetch_executor.submit(
+                        contextvars.copy_context().run, self.rag_assistant.query, query, k=self.fast_path_k
+                    )
+                    tool_cache.add_prefetch(query, self.fast_path_k, future)
+                try:
+                    yield budget, tool_cache
+                finally:
+                    tool_cache.cancel_prefetch()
+        finally:
+            current_run_budget.reset(token)
+
+    def _partial_from_checkpoint(self, budget: RunBudget, session: AgentSession) -> Dict[str, Any]:
+        budget.limit_hit = budget.limit_hit or "max_steps"
+        messages = self.agent.get_state(self._run_config(session)).values.get("messages", [])
+        return {"messages": messages + [AIMessage(content=partial_answer(messages, budget.limit_hit))]}
+
+    def _log_limit(self, budget: RunBudget):
+        if budget.limit_hit:
+            self.logger.warning("Run stopped by %s: %s", budget.limit_hit, budget.as_dict())
 
-            answer_text = self._extract_response(response)
+    def answer(self, query: str, session: Optional[AgentSession] = None) -> str:
+        session = session or self.default_session
+        self.logger.info("Processing query: %s...", query[:80])
+        session.conversation_history.append({"role": "user", "content": query})
+
+        route = classify_query(query) if self.fast_path else "agent"
+        started = time.perf_counter()
+
+        try:
+            with span("agent.turn", path=route, thread_id=session.thread_id, query_chars=len(query)) as turn, \
+                    profiled("agent.answer"):
+                if route == "retrieval":
+                    answer_text, metrics = self._answer_fast(query, session)
+                else:
+                    answer_text, metrics = self._answer_agent(query, session)
+                turn.set(
+                    llm_calls=metrics.get("llm_calls", 0),
+                    answer_chars=len(answer_text),
+                    limit_hit=metrics.get("budget", {}).get("limit_hit") or ""
+                )
+
+            metrics["latency"] = round(time.perf_counter() - started, 4)
+            self._record_path(metrics)
+            session.last_run_metrics = metrics
+            self.logger.debug("Run metrics: %s", metrics)
             
-            self.logger.debug(f"Agent response: {answer_text[:100]}...")
-            self.conversation_history.append({
+            self.logger.debug("Agent response: %s...", answer_text[:100])
+            session.conversation_history.append({
                 "role": "assistant",
                 "content": answer_text
             })
@@ -134,34 +311,164 @@ class ReActAgent:
             return answer_text
 
         except Exception as e:
-            self.logger.error(f"Error processing query: {e}", exc_info=True)
+            self.logger.error("Error processing query: %s", e, exc_info=True)
             error_msg = f"Ошибка: {str(e)}"
-            self.conversation_history.append({
+            session.conversation_history.append({
                 "role": "assistant",
                 "content": error_msg
             })
             return error_msg
 
-    def stream(self, query: str):
-        self.logger.info(f"Streaming query: {query[:80]}...")
+    def _answer_agent(self, query: str, session: AgentSession):
+        from langgraph.errors import GraphRecursionError
+
+        with self._run_scope(query) as (budget, tool_cache):
+            try:
+                response = self.agent.invoke({
+                    "messages": [HumanMessage(content=query)]
+                }, config=self._run_config(session))
+            except GraphRecursionError:
+                response = self._partial_from_checkpoint(budget, session)
+
+        self._log_limit(budget)
+        return self._extract_response(response), {
+            "path": "agent",
+            "llm_calls": budget.steps,
+            "tokens": self._extract_usage(response),
+            "tool_cache": tool_cache.stats(),
+            "budget": budget.as_dict()
+        }
+
+    def _answer_fast(self, query: str, session: AgentSession):
+        # Pure retrieval: one RAG lookup and a single synthesis call instead of
+        # a tool-selection round-trip followed by the answer round-trip.
+        # The search is done here, so nothing is prefetched for it
+        documents, tokens = [], usage_from_messages([])
+
+        with self._run_scope(query, prefetch=False) as (budget, _):
+            history = self._checkpoint_history(session)
+            try:
+                documents, metadatas = call_within(budget, self._call_executor, self._retrieve, query)
+                budget.steps += 1
+                response = call_within(budget, self._call_executor, self.llm.invoke, [
+                    SystemMessage(content="Вы - экспертный ассистент для работы с текстовыми заметками пользователя."),
+                    HumanMessage(content=build_rag_prompt(query, documents, metadatas, history))
+                ])
+                answer_text = response.content
+                tokens = usage_from_messages([response])
+            except FutureTimeoutError:
+                found = [ToolMessage(content="\n\n".join(documents), tool_call_id="fast-path")] if documents else []
+                answer_text = partial_answer([HumanMessage(content=query), *found], budget.limit_hit)
+
+            # The turn joins the checkpointed thread right away, so the agent path
+            # and a restarted process see it as part of the conversation
+            self.agent.update_state(
+                self._run_config(session),
+                {"messages": [HumanMessage(content=query), AIMessage(content=answer_text)]},
+                as_node="model"
+            )
+
+        self._log_limit(budget)
+        return answer_text, {
+            "path": "fast",
+            "llm_calls": budget.steps,
+            "tokens": tokens,
+            "documents": len(documents),
+            "budget": budget.as_dict()
+        }
+
+    def _retrieve(self, query: str):
+        if self.fast_path_context_tokens:
+            results = self.rag_assistant.query_context(query, k=self.fast_path_k, max_tokens=self.fast_path_context_tokens)
+        else:
+            results = self.rag_assistant.query(query, k=self.fast_path_k)
+        return (results.get('documents') or [[]])[0], (results.get('metadatas') or [[]])[0]
+
+    def _checkpoint_history(self, session: AgentSession) -> List[Dict[str, str]]:
+        # Read from the thread itself, so summarised turns and turns from before a restart count
+        if not self.fast_path_history:
+            return []
+        messages = self.agent.get_state(self._run_config(session)).values.get("messages", [])
+        turns = [
+            {"role": "user" if isinstance(m, HumanMessage) else "assistant", "content": m.content}
+            for m in messages
+            if isinstance(m, (HumanMessage, AIMessage)) and m.content and not getattr(m, "tool_calls", None)
+        ]
+        return turns[-self.fast_path_history:]
+
+    def _record_path(self, metrics: Dict[str, Any]):
+        observe_stage("agent_answer", metrics.get("latency", 0.0), path=metrics["path"])
+        count_items("agent_answer", metrics.get("llm_calls", 0), path=metrics["path"], kind="llm_calls")
+        if metrics.get("budget", {}).get("limit_hit"):
+            registry.counter("notes_agent_limits_total", "Agent runs stopped by a budget limit").labels(limit=metrics["budget"]["limit_hit"]).inc()
+        with self._path_stats_lock:
+            stats = self.path_stats[metrics["path"]]
+            stats["count"] += 1
+            stats["llm_calls"] += metrics.get("llm_calls", 0)
+            stats["total_latency"] += metrics.get("latency", 0.0)
+            tool_cache = metrics.get("tool_cache", {})
+            stats["prefetch_issued"] += tool_cache.get("prefetch_issued", 0)
+            stats["prefetch_hits"] += tool_cache.get("prefetch_hits", 0)
+
+    def get_path_stats(self) -> Dict[str, Dict[str, float]]:
+        with self._path_stats_lock:
+            return {
+                path: {
+                    **stats,
+                    "avg_latency": round(stats["total_latency"] / stats["count"], 4) if stats["count"] else 0.0,
+                    "avg_llm_calls": round(stats["llm_calls"] / stats["count"], 2) if stats["count"] else 0.0,
+                    "prefetch_hit_rate": round(stats["prefetch_hits"] / stats["prefetch_issued"], 4) if stats["prefetch_issued"] else 0.0,
+                }
+                for path, stats in self.path_stats.items()
+            }
+
+    def stream(self, query: str, session: Optional[AgentSession] = None):
+        from langgraph.errors import GraphRecursionError
+
+        session = session or self.default_session
+        self.logger.info("Streaming query: %s...", query[:80])
 
         try:
-            for event in self.agent.stream({
-                "messages": [HumanMessage(content=query)]
-            }):
-                yield event
+            with self._run_scope(query) as (budget, tool_cache):
+                try:
+                    for event in self.agent.stream({
+                        "messages": [HumanMessage(content=query)]
+                    }, config=self._run_config(session)):
+                        yield event
+                except GraphRecursionError:
+                    yield {"partial": self._partial_from_checkpoint(budget, session)}
+
+            self._log_limit(budget)
+            session.last_run_metrics = {
+                "tool_cache": tool_cache.stats(),
+                "budget": budget.as_dict()
+            }
 
         except Exception as e:
-            self.logger.error(f"Error in stream: {e}")
+            self.logger.error("Error in stream: %s", e)
             yield {"error": str(e)}
 
-    def reset_memory(self):
+    def reset_memory(self, session: Optional[AgentSession] = None):
+        session = session or self.default_session
         self.logger.info("Resetting memory")
-        self.thread_id = str(uuid4())
-        self.conversation_history = []
+        try:
+            self.checkpointer.delete_thread(session.thread_id)
+        except Exception as e:
+            self.logger.warning("Could not delete checkpoint for thread %s: %s", session.thread_id, e)
+        session.thread_id = str(uuid4())
+        session.conversation_history.clear()
+
+    def get_conversation_history(self, session: Optional[AgentSession] = None) -> List[Dict[str, str]]:
+        return list((session or self.default_session).conversation_history)
+
+    def _extract_usage(self, response: Any) -> Dict[str, int]:
+        if not (isinstance(response, dict) and response.get("messages")):
+            return usage_from_messages([])
 
-    def get_conversation_history(self) -> List[Dict[str, str]]:
-        return self.conversation_history.copy()
+        # The checkpointed state holds the whole thread; only count this turn
+        messages = response["messages"]
+        last_human = max((i for i, m in enumerate(messages) if isinstance(m, HumanMessage)), default=0)
+        return usage_from_messages(messages[last_human:])
 
     def _extract_response(self, response: Any) -> str:
         if isinstance(response, dict):
@@ -0,0 +1,88 @@
+import time
+import contextvars
+from concurrent.futures import Executor, TimeoutError as FutureTimeoutError
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, ToolMessage
+
+
+@dataclass
+class RunBudget:
+    """Hard limits for a single answer/stream call."""
+
+    max_steps: int = 5
+    max_seconds: float = 60.0
+    max_tokens: int = 20000
+    started_at: float = field(default_factory=time.monotonic)
+    steps: int = 0
+    tokens: int = 0
+    limit_hit: Optional[str] = None
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started_at
+
+    @property
+    def remaining(self) -> float:
+        return max(0.0, self.max_seconds - self.elapsed)
+
+    def check(self) -> Optional[str]:
+        if self.limit_hit:
+            return self.limit_hit
+        if self.steps >= self.max_steps:
+            self.limit_hit = "max_steps"
+        elif self.elapsed >= self.max_seconds:
+            self.limit_hit = "max_seconds"
+        elif self.tokens >= self.max_tokens:
+            self.limit_hit = "max_tokens"
+        return self.limit_hit
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "steps": self.steps,
+            "elapsed": round(self.elapsed, 3),
+            "tokens": self.tokens,
+            "limit_hit": self.limit_hit,
+        }
+
+
+current_run_budget: ContextVar[Optional[RunBudget]] = ContextVar("current_run_budget", default=None)
+
+
+def call_within(budget: RunBudget, executor: Executor, fn, *args, **kwargs):
+    """Runs fn on executor with the budget's remaining time as the timeout.
+
+    On overrun the call is abandoned to finish in the background, the budget is
+    marked with max_seconds and FutureTimeoutError is raised.
+    """
+    # Run in a copy of the caller's context so spans and the budget stay visible
+    future = executor.submit(contextvars.copy_context().run, fn, *args, **kwargs)
+    try:
+        return future.result(timeout=budget.remaining)
+    except FutureTimeoutError:
+        future.cancel()
+        budget.limit_hit = budget.limit_hit or "max_seconds"
+        raise
+
+
+def current_turn(messages: List[BaseMessage]) -> List[BaseMessage]:
+    last_human = max((i for i, m in enumerate(messages) if isinstance(m, HumanMessage)), default=0)
+    return messages[last_human:]
+
+
+def partial_answer(messages: List[BaseMessage], limit: str) -> str:
+    turn = current_turn(messages)
+
+    for message in reversed(turn):
+        if isinstance(message, AIMessage) and message.content and not message.tool_calls:
+            return message.content
+
+    notice = f"Не удалось завершить ответ: сработал лимит {limit}."
+    tool_results = [m.content for m in turn if isinstance(m, ToolMessage) and m.content and m.status != "error"]
+    if not tool_results:
+        return notice
+
+    latest = tool_results[-1] if isinstance(tool_results[-1], str) else str(tool_results[-1])
+    return f"{notice}\n\nПоследний полученный результат:\n{latest[:2000]}"
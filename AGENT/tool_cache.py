@@ -0,0 +1,144 @@
+import re
+import threading
+from concurrent.futures import Future
+from collections import defaultdict
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from MONITORING.metrics import record_cache
+
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def normalize_query(query: str) -> Tuple[str, ...]:
+    """Order- and punctuation-insensitive key, so near-identical searches share one entry."""
+    return tuple(sorted(set(_WORD_RE.findall(query.lower()))))
+
+
+def query_similarity(a: Tuple[str, ...], b: Tuple[str, ...]) -> float:
+    """Share of the terms of search `a` that also occur in `b`.
+
+    The model's search is usually the user's question minus the framing
+    ("найди заметки про kafka" -> "kafka"), which Jaccard similarity would
+    penalise for every dropped word.
+    """
+    if not a or not b:
+        return 0.0
+    sa = set(a)
+    return len(sa & set(b)) / len(sa)
+
+
+class ToolResultCache:
+    """Run-scoped memo for read-only tool results.
+
+    Entries are tagged with the note path they depend on; a mutating tool touching
+    that path drops them, together with every directory listing and search result.
+    """
+
+    PATH_INDEPENDENT = ("get_dir_structure", "search_notes")
+
+    def __init__(self, prefetch_similarity: float = 0.6):
+        self.prefetch_similarity = prefetch_similarity
+        self._prefetch: Optional[Tuple[Tuple[str, ...], int, Future]] = None
+        self.prefetch_issued = 0
+        self.prefetch_hits = 0
+        self._entries: Dict[Tuple[str, Hashable], Any] = {}
+        self._by_path: Dict[str, set] = defaultdict(set)
+        self._lock = threading.Lock()
+        self.hits: Dict[str, int] = defaultdict(int)
+        self.misses: Dict[str, int] = defaultdict(int)
+        self.invalidations = 0
+
+    def get_or_compute(self, tool_name: str, key: Hashable, compute: Callable[[], Any], path: Optional[str] = None) -> Any:
+        cache_key = (tool_name, key)
+
+        with self._lock:
+            if cache_key in self._entries:
+                self.hits[tool_name] += 1
+                record_cache("tool_results", True, tool=tool_name)
+                return self._entries[cache_key]
+            self.misses[tool_name] += 1
+        record_cache("tool_results", False, tool=tool_name)
+
+        value = compute()
+
+        with self._lock:
+            self._entries[cache_key] = value
+            if path is not None:
+                self._by_path[path].add(cache_key)
+        return value
+
+    def lookup(self, tool_name: str, predicate: Callable[[Hashable], bool]) -> Tuple[bool, Any]:
+        with self._lock:
+            for (name, key), value in self._entries.items():
+                if name == tool_name and predicate(key):
+                    self.hits[tool_name] += 1
+                    record_cache("tool_results", True, tool=tool_name)
+                    return True, value
+        return False, None
+
+    def add_prefetch(self, query: str, k: int, future: Future):
+        with self._lock:
+            self._prefetch = (normalize_query(query), k, future)
+            self.prefetch_issued += 1
+
+    def take_prefetch(self, normalized: Tuple[str, ...], k: int) -> Tuple[bool, Any]:
+        with self._lock:
+            prefetch = self._prefetch
+        if prefetch is None:
+            return False, None
+
+        prefetched_query, prefetched_k, future = prefetch
+        if k > prefetched_k or query_similarity(normalized, prefetched_query) < self.prefetch_similarity:
+            return False, None
+
+        try:
+            results = future.result()
+        except Exception:
+            return False, None
+
+        with self._lock:
+            self.prefetch_hits += 1
+            self.hits["search_notes"] += 1
+            # Promote to a regular entry so repeats count as plain cache hits
+            self._entries[("search_notes", (prefetched_query, prefetched_k))] = results
+            if self._prefetch is prefetch:
+                self._prefetch = None
+        record_cache("search_prefetch", True)
+        return True, results
+
+    def cancel_prefetch(self):
+        with self._lock:
+            if self._prefetch is not None:
+                self._prefetch[2].cancel()
+
+    def invalidate_path(self, path: str):
+        with self._lock:
+            stale = self._by_path.pop(path, set())
+            stale.update(k for k in self._entries if k[0] in self.PATH_INDEPENDENT)
+            if self._prefetch is not None:
+                self._prefetch[2].cancel()
+            self._prefetch = None
+            for cache_key in stale:
+                self._entries.pop(cache_key, None)
+            self.invalidations += len(stale)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            hits = sum(self.hits.values())
+            misses = sum(self.misses.values())
+            return {
+                "hits": hits,
+                "misses": misses,
+                "hit_rate": round(hits / (hits + misses), 4) if hits + misses else 0.0,
+                "invalidations": self.invalidations,
+                "hits_by_tool": dict(self.hits),
+                "prefetch_issued": self.prefetch_issued,
+                "prefetch_hits": self.prefetch_hits,
+            }
+
+
+# The active cache travels with the context, so graph tasks running tool calls in
+# worker threads see the cache of the agent run that spawned them.
+current_tool_cache: ContextVar[Optional[ToolResultCache]] = ContextVar("current_tool_cache", default=None)
@@ -2,10 +2,12 @@
 import json 
 import os
 import sys
-from langchain.tools import tool
+import threading
+from contextlib import contextmanager
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from AGENT.file_manager.notes_manager import NotesManager
+from AGENT.tool_cache import ToolResultCache, current_tool_cache, normalize_query
 
 
 class FileOperationTools:
@@ -14,35 +16,103 @@ class FileOperationTools:
         self.notes_manager = NotesManager(notes_directory=notes_dir)
         self.rag_assistant = None
 
+        self._path_locks = {}
+        self._path_locks_guard = threading.Lock()
+
+    def _note_path(self, filename: str) -> str:
+        return os.path.normcase(os.path.abspath(os.path.join(str(self.notes_manager.notes_dir), filename)))
+
+    @contextmanager
+    def _locked(self, filename: str):
+        # Mutations are serialised per note file; reads take no lock
+        path = self._note_path(filename)
+        with self._path_locks_guard:
+            lock = self._path_locks.setdefault(path, threading.Lock())
+        with lock:
+            yield
+
+    @contextmanager
+    def run_scope(self):
+        cache = ToolResultCache()
+        token = current_tool_cache.set(cache)
+        try:
+            yield cache
+        finally:
+            current_tool_cache.reset(token)
+
+    def _memo(self, tool_name, key, compute, path=None):
+        cache = current_tool_cache.get()
+        if cache is None:
+            return compute()
+        return cache.get_or_compute(tool_name, key, compute, path=path)
+
+    def _invalidate(self, filename: str):
+        cache = current_tool_cache.get()
+        if cache is not None:
+            cache.invalidate_path(self._note_path(filename))
+
+    def _search(self, query: str, k: int):
+        cache = current_tool_cache.get()
+        normalized = normalize_query(query)
+        compute = lambda: self.rag_assistant.query(query, k=k)
+
+        if cache is None:
+            return compute()
+
+        # A cached search for the same terms with a larger k already holds the answer,
+        # and so may the speculative search started alongside the first model call
+        found, results = cache.lookup("search_notes", lambda key: key[0] == normalized and key[1] >= k)
+        if not found:
+            found, results = cache.take_prefetch(normalized, k)
+        if found:
+            return {"documents": [results.get('documents', [[]])[0][:k]]}
+
+        return cache.get_or_compute("search_notes", (normalized, k), compute)
+
     def create_tools(self):
+        from langchain_core.tools import tool
+
         @tool
         def read_note(filename: str):
             """Read the content of a note file by filename."""
-            result = self.notes_manager.read_note(filename)
+            result = self._memo(
+                "read_note", self._note_path(filename),
+                lambda: self.notes_manager.read_note(filename),
+                path=self._note_path(filename)
+            )
             return json.dumps(result, ensure_ascii=False)
 
         @tool
         def create_note(title: str, content: str):
             """Create a new note with the given title and content."""
-            result = self.notes_manager.create_note(title, content)
+            with self._locked(title + ".md"):
+                result = self.notes_manager.create_note(title, content)
+                self._invalidate(title + ".md")
             return json.dumps(result, ensure_ascii=False)
 
         @tool
         def edit_note(filename: str, content: str, title: str):
             """Edit an existing note by updating its content and title."""
-            result = self.notes_manager.edit_note(filename, content, title)
+            with self._locked(filename):
+                result = self.notes_manager.edit_note(filename, content, title)
+                self._invalidate(filename)
             return json.dumps(result, ensure_ascii=False)
 
         @tool
         def delete_note(filename: str):
             """Delete a note file by filename."""
-            result = self.notes_manager.delete_note(filename)
+            with self._locked(filename):
+                result = self.notes_manager.delete_note(filename)
+                self._invalidate(filename)
             return json.dumps(result, ensure_ascii=False)
 
         @tool
         def get_dir_structure(root_path: str):
             """Get the directory structure starting from the root path."""
-            result = self.notes_manager.get_dir_structure(root_path)
+            result = self._memo(
+                "get_dir_structure", root_path,
+                lambda: self.notes_manager.get_dir_structure(root_path)
+            )
             return json.dumps(result, ensure_ascii=False)
 
         @tool
@@ -52,7 +122,7 @@ class FileOperationTools:
                 return json.dumps({"error": "RAG система не инициализирована"}, ensure_ascii=False)
 
             try:
-                results = self.rag_assistant.query(query, k=k)
+                results = self._search(query, k)
                 documents = results.get('documents', [[]])[0]
                 formatted_results = []
                 for i, doc in enumerate(documents):
@@ -1,5 +1,4 @@
 # base.py
-import openai
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
 from typing import Optional, Dict, Any, List
@@ -10,6 +9,8 @@ from langchain_core.messages import BaseMessage
 from langchain_core.tools import BaseTool
 from pydantic import BaseModel, ConfigDict, Field
 
+from RAG.logging_config import setup_logger
+
 
 class LLMConfig(BaseModel):
     model_name: str = Field(..., description="Name of model")
@@ -18,6 +19,7 @@ class LLMConfig(BaseModel):
     timeout: int = Field(..., description="Timeout of request")
     retry_attempts: int = Field(..., description="Retry attemps")
     api_key: str | None = Field(..., description="Your API key")
+    base_url: str | None = Field(default=None, description="API base URL (provider default when empty)")
 
 
 @dataclass
@@ -72,17 +74,4 @@ class BaseLLM(ABC):
         return response.content
 
     def _set_default_logger(self, logger_path: str = "LLM_debug.log"):
-        console_handler = logging.StreamHandler()
-        console_handler.setLevel(logging.INFO)
-        console_formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
-        console_handler.setFormatter(console_formatter)
-
-        file_handler = logging.FileHandler(logger_path, mode='w', encoding="utf-8")
-        file_handler.setLevel(logging.DEBUG)
-        file_formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-        file_handler.setFormatter(file_formatter)
-
-        self.logger = logging.getLogger(__name__)
-        self.logger.setLevel(logging.DEBUG)
-        self.logger.addHandler(console_handler)
-        self.logger.addHandler(file_handler)
+        self.logger = setup_logger(__name__, logger_path)
@@ -2,15 +2,18 @@ import os
 import sys
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from openai import OpenAI
-from typing import List, Dict, Any
+from typing import List, Dict, Any, ClassVar
 from langchain_core.messages import BaseMessage, SystemMessage, HumanMessage, AIMessage
 from langchain_core.messages.tool import tool_call
 from langchain_core.language_models import BaseChatModel
 from langchain_core.outputs import ChatGeneration, ChatResult
 from langchain_core.tools import BaseTool
 from dotenv import load_dotenv
-from .base import BaseLLM, LLMConfig
+from datetime import datetime
+from .base import BaseLLM, LLMConfig, LLMResponse
+from .tokens import TokenCounter, TokenUsage, ContextBudget
+from MONITORING.metrics import timed, count_items
+from MONITORING.tracing import span
 import json
 
 load_dotenv()
@@ -27,6 +30,9 @@ openrouter_config = LLMConfig(
 
 class OpenRouterLLM(BaseLLM):
     def __init__(self, llm_config: LLMConfig, **kwargs):
+        self.token_counter = TokenCounter()
+        self.usage = TokenUsage()
+        self.last_response: LLMResponse | None = None
         super().__init__(llm_config=llm_config, **kwargs)
 
     def _call_with_tools(
@@ -37,6 +43,9 @@ class OpenRouterLLM(BaseLLM):
         **kwargs
     ) -> BaseMessage:        
         converted_messages = self._convert_messages(messages=messages)
+        # Per-call deadline from LLMRouter; the client-wide timeout and retries apply otherwise
+        client_options = {k: kwargs.pop(k) for k in ("timeout", "max_retries") if kwargs.get(k) is not None}
+        client = self.client.with_options(**client_options) if client_options else self.client
 
         api_params = {
             "messages": converted_messages,
@@ -53,15 +62,25 @@ class OpenRouterLLM(BaseLLM):
             api_params["tools"] = tools_to_use
             api_params["tool_choice"] = "auto"
             if self.logger:
-                self.logger.debug(f"Using {len(tools_to_use)} tools")
+                self.logger.debug("Using %s tools", len(tools_to_use))
 
         try:
-            response = self.client.chat.completions.create(**api_params)
-            message = response.choices[0].message
+            with timed("llm_call", provider="openrouter"), span(
+                "llm.call", provider="openrouter", model=self.llm_config.model_name,
+                messages=len(converted_messages), tools=len(tools_to_use or [])
+            ) as s:
+                response = client.chat.completions.create(**api_params)
+                message = response.choices[0].message
+                usage_metadata = self._record_usage(response, converted_messages, tools_to_use)
+                s.set(
+                    prompt_tokens=usage_metadata["input_tokens"],
+                    completion_tokens=usage_metadata["output_tokens"],
+                    tool_calls=len(getattr(message, "tool_calls", None) or [])
+                )
             
             if hasattr(message, 'tool_calls') and message.tool_calls:
                 if self.logger:
-                    self.logger.debug(f"Tool calls detected: {len(message.tool_calls)}")
+                    self.logger.debug("Tool calls detected: %s", len(message.tool_calls))
                 
                 tool_calls_list = []
                 for tc in message.tool_calls:
@@ -82,25 +101,65 @@ class OpenRouterLLM(BaseLLM):
                 
                 return AIMessage(
                     content=message.content or "",
-                    tool_calls=tool_calls_list
+                    tool_calls=tool_calls_list,
+                    usage_metadata=usage_metadata
                 )
             
-            return AIMessage(content=message.content or "")
+            return AIMessage(content=message.content or "", usage_metadata=usage_metadata)
 
         except Exception as e:
             if self.logger:
-                self.logger.error(f"Error calling LLM: {e}")
+                self.logger.error("Error calling LLM: %s", e)
             raise
 
 
+    def _record_usage(self, response, converted_messages: list, tools: List[Dict[str, Any]] | None) -> Dict[str, int]:
+        usage = getattr(response, "usage", None)
+        message = response.choices[0].message
+
+        if usage is not None and getattr(usage, "prompt_tokens", None) is not None:
+            prompt_tokens = usage.prompt_tokens
+            completion_tokens = usage.completion_tokens or 0
+        else:
+            # Some OpenRouter upstreams omit usage; fall back to a local estimate
+            prompt_text = json.dumps(converted_messages, ensure_ascii=False)
+            if tools:
+                prompt_text += json.dumps(tools, ensure_ascii=False)
+            prompt_tokens = self.token_counter.count(prompt_text)
+            completion_tokens = self.token_counter.count(message.content or "")
+
+        self.usage.add(prompt_tokens, completion_tokens)
+        count_items("llm_call", prompt_tokens, provider="openrouter", kind="prompt_tokens")
+        count_items("llm_call", completion_tokens, provider="openrouter", kind="completion_tokens")
+        self.last_response = LLMResponse(
+            content=message.content or "",
+            model=self.llm_config.model_name,
+            tokens_used=prompt_tokens + completion_tokens,
+            timestamp=datetime.now(),
+            metadata={"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens}
+        )
+
+        if self.logger:
+            self.logger.debug("Tokens used: prompt=%d, completion=%d", prompt_tokens, completion_tokens)
+
+        return {
+            "input_tokens": prompt_tokens,
+            "output_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens
+        }
+
     def _setup_client(self):
         api_key = self.llm_config.api_key or os.getenv("OPENROUTER_API")
         if not api_key:
             raise ValueError("OPENROUTER_API not found in environment or config")
         
+        from openai import OpenAI
+
         self.client = OpenAI(
             api_key=api_key,
-            base_url="https://openrouter.ai/api/v1"
+            base_url=self.llm_config.base_url or os.getenv("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1"),
+            timeout=self.llm_config.timeout,
+            max_retries=self.llm_config.retry_attempts
         )
 
     def _check_connection(self) -> bool:
@@ -108,7 +167,7 @@ class OpenRouterLLM(BaseLLM):
             return self.client is not None
         except Exception as e:
             if self.logger:
-                self.logger.error(f"Connection check failed: {e}")
+                self.logger.error("Connection check failed: %s", e)
             return False
 
     def _convert_messages(self, messages: List[BaseMessage]) -> list:
@@ -130,18 +189,30 @@ class OpenRouterLLM(BaseLLM):
 class OpenRouterAdapter(BaseChatModel):
     llm: OpenRouterLLM | None = None
     tools_list: List[BaseTool] | None = None
+    budget: ContextBudget | None = None
     _tools_dicts: List[Dict[str, Any]] | None = None
+    # Takes timeout/max_retries per call, so LLMRouter can enforce its deadline in the HTTP client
+    supports_deadline: ClassVar[bool] = True
 
     class Config:
         arbitrary_types_allowed = True
 
-    def __init__(self, config: LLMConfig):
+    def __init__(self, config: LLMConfig, budget: ContextBudget | None = None, llm: OpenRouterLLM | None = None):
         super().__init__()
-        self.llm = OpenRouterLLM(llm_config=config)
+        self.llm = llm or OpenRouterLLM(llm_config=config)
         self.tools_list = None
+        self.budget = budget if budget is not None else ContextBudget(
+            max_prompt_tokens=int(os.getenv("LLM_MAX_PROMPT_TOKENS", "12000")),
+            max_tool_result_tokens=int(os.getenv("LLM_MAX_TOOL_RESULT_TOKENS", "2000")),
+            counter=self.llm.token_counter
+        )
         self._tools_dicts = None
 
     def _generate(self, messages, **kwargs):
+        if self.budget is not None:
+            tools_tokens = self.budget.counter.count(json.dumps(self._tools_dicts, ensure_ascii=False)) if self._tools_dicts else 0
+            messages = self.budget.apply(messages, extra_tokens=tools_tokens)
+
         response = self.llm._call_with_tools(
             messages,
             tools=self._tools_dicts,
@@ -149,6 +220,11 @@ class OpenRouterAdapter(BaseChatModel):
         )
         return ChatResult(generations=[ChatGeneration(message=response)])
 
+    @property
+    def usage(self) -> TokenUsage:
+        return self.llm.usage
+
+    @property
     def _llm_type(self) -> str:
         return "openrouter"
     
@@ -183,8 +259,7 @@ class OpenRouterAdapter(BaseChatModel):
             }
             tools_dicts.append(tool_dict)
         
-        new_adapter = OpenRouterAdapter(self.llm.llm_config)
-        new_adapter.llm = self.llm
+        new_adapter = OpenRouterAdapter(self.llm.llm_config, budget=self.budget, llm=self.llm)
         new_adapter.tools_list = tools
         new_adapter._tools_dicts = tools_dicts
         
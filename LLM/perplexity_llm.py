@@ -3,7 +3,7 @@ from datetime import datetime
 import logging
 import os
 from dotenv import load_dotenv
-from typing import Optional, List, Dict, Any
+from typing import ClassVar, Optional, List, Dict, Any
 
 
 from langchain_core.language_models.chat_models import BaseChatModel
@@ -12,6 +12,10 @@ from langchain_core.outputs import ChatResult, ChatGeneration
 from pydantic import BaseModel, Field, ConfigDict
 from openai import OpenAI
 
+from RAG.logging_config import setup_logger
+from MONITORING.metrics import timed
+from MONITORING.tracing import span
+
 
 class LLMConfig(BaseModel):
     model_name: str = "sonar"
@@ -31,6 +35,9 @@ class PerplexityAiLLM(BaseChatModel):
     logger: Optional[logging.Logger] = Field(default=None, exclude=True)
     
     model_config = ConfigDict(arbitrary_types_allowed=True)
+    # No function calling in the Perplexity API; LLMRouter.bind_tools skips it
+    supports_tools: ClassVar[bool] = False
+    supports_deadline: ClassVar[bool] = True
     
     def __init__(self, config: LLMConfig, **kwargs):
         super().__init__(config=config, **kwargs)
@@ -47,7 +54,9 @@ class PerplexityAiLLM(BaseChatModel):
         
         self.client = OpenAI(
             api_key=self.api_key,
-            base_url="https://api.perplexity.ai"
+            base_url="https://api.perplexity.ai",
+            timeout=self.config.timeout,
+            max_retries=self.config.retry_attempts
         )
 
 
@@ -56,13 +65,17 @@ class PerplexityAiLLM(BaseChatModel):
             prompt = message[-1].content
             self.logger.info("Отправка запроса к API Perplexity")
 
-            response = self.client.chat.completions.create(
-                model=self.config.model_name,
-                messages=[
-                    {"role": "system", "content": "Будь точным и кратким."},
-                    {"role": "user", "content": prompt}
-                ]
-            )
+            client_options = {k: kwargs[k] for k in ("timeout", "max_retries") if kwargs.get(k) is not None}
+            client = self.client.with_options(**client_options) if client_options else self.client
+
+            with timed("llm_call", provider="perplexity"), span("llm.call", provider="perplexity", model=self.config.model_name, prompt_chars=len(prompt)):
+                response = client.chat.completions.create(
+                    model=self.config.model_name,
+                    messages=[
+                        {"role": "system", "content": "Будь точным и кратким."},
+                        {"role": "user", "content": prompt}
+                    ]
+                )
 
             message = AIMessage(content=response.choices[0].message.content)
             return ChatResult(generations=[ChatGeneration(message=message)])
@@ -72,7 +85,7 @@ class PerplexityAiLLM(BaseChatModel):
             raise e
         
         except Exception as e:
-            self.logger.error(f"Ошибка при обработке запроса к API: {e}")
+            self.logger.error("Ошибка при обработке запроса к API: %s", e)
             raise e
         
     def _check_connection(self):
@@ -109,17 +122,4 @@ class PerplexityAiLLM(BaseChatModel):
         return self
 
     def _set_default_logger(self, log_path: str = 'LLM_debug.log'):
-        console_handler = logging.StreamHandler()
-        console_handler.setLevel(logging.INFO)
-        console_formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
-        console_handler.setFormatter(console_formatter)
-
-        file_handler = logging.FileHandler(log_path, mode='w', encoding="utf-8")
-        file_handler.setLevel(logging.DEBUG)
-        file_formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-        file_handler.setFormatter(file_formatter)
-
-        self.logger = logging.getLogger(__name__)
-        self.logger.setLevel(logging.DEBUG)
-        self.logger.addHandler(console_handler)
-        self.logger.addHandler(file_handler)
+        self.logger = setup_logger(__name__, log_path)
@@ -0,0 +1,275 @@
+import os
+import sys
+import time
+import logging
+import threading
+import contextvars
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import List, Dict, Any, Optional, Sequence
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.outputs import ChatResult
+from pydantic import ConfigDict, PrivateAttr
+
+from MONITORING.metrics import registry
+
+
+logger = logging.getLogger(__name__)
+
+
+class ProviderStats:
+    """Rolling latency/error window for a single provider."""
+
+    def __init__(self, name: str, window: int = 20, failure_threshold: int = 3, cooldown: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.latencies: deque = deque(maxlen=window)
+        self.outcomes: deque = deque(maxlen=window)
+        self.consecutive_failures = 0
+        self.unavailable_until = 0.0
+        self._lock = threading.Lock()
+
+    def record_success(self, latency: float):
+        with self._lock:
+            self.latencies.append(latency)
+            self.outcomes.append(True)
+            self.consecutive_failures = 0
+            self.unavailable_until = 0.0
+
+    def record_failure(self, latency: float):
+        with self._lock:
+            self.latencies.append(latency)
+            self.outcomes.append(False)
+            self.consecutive_failures += 1
+            if self.consecutive_failures >= self.failure_threshold:
+                self.unavailable_until = time.monotonic() + self.cooldown
+
+    @property
+    def error_rate(self) -> float:
+        if not self.outcomes:
+            return 0.0
+        return self.outcomes.count(False) / len(self.outcomes)
+
+    @property
+    def avg_latency(self) -> float:
+        if not self.latencies:
+            return 0.0
+        return sum(self.latencies) / len(self.latencies)
+
+    @property
+    def healthy(self) -> bool:
+        return time.monotonic() >= self.unavailable_until
+
+    def score(self, error_penalty: float = 5.0) -> float:
+        # Lower is better; providers without samples score 0 so they get probed first.
+        # The penalty is added in seconds: scaling the latency instead let a provider
+        # that fails instantly score ~0 and stay first in line
+        return self.avg_latency + error_penalty * self.error_rate
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "calls": len(self.outcomes),
+            "avg_latency": round(self.avg_latency, 4),
+            "error_rate": round(self.error_rate, 4),
+            "consecutive_failures": self.consecutive_failures,
+            "healthy": self.healthy,
+        }
+
+
+class LLMRouter(BaseChatModel):
+    """Chat model that routes each call to the healthiest, fastest provider and fails over on errors."""
+
+    providers: List[Any]
+    provider_names: List[str] | None = None
+    # Per attempt: passed to providers that enforce it in their HTTP client (supports_deadline);
+    # the router's own wait is only a backstop for providers that cannot
+    timeout: float = 30.0
+    # Client-side retries per attempt; failing over to the next provider is the router's retry
+    provider_retries: int = 0
+    deadline_grace: float = 1.0
+    # In-flight calls per provider; a provider with every slot busy is skipped instead of queued
+    max_concurrency: int = 16
+    error_penalty: float = 5.0
+    window: int = 20
+    failure_threshold: int = 3
+    cooldown: float = 30.0
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    _stats: Dict[str, ProviderStats] = PrivateAttr(default_factory=dict)
+    _executors: Dict[str, ThreadPoolExecutor] = PrivateAttr(default_factory=dict)
+    _slots: Dict[str, threading.BoundedSemaphore] = PrivateAttr(default_factory=dict)
+
+    def __init__(self, providers: Sequence[BaseChatModel], provider_names: Optional[Sequence[str]] = None, **kwargs):
+        if not providers:
+            raise ValueError("LLMRouter requires at least one provider")
+
+        names = list(provider_names) if provider_names else [
+            f"{getattr(p, '_llm_type', type(p).__name__)}-{i}" for i, p in enumerate(providers)
+        ]
+        if len(names) != len(providers):
+            raise ValueError("provider_names must match providers")
+
+        super().__init__(providers=list(providers), provider_names=names, **kwargs)
+        self._stats = {
+            name: ProviderStats(name, self.window, self.failure_threshold, self.cooldown)
+            for name in names
+        }
+        self._executors = {
+            name: ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix=f"llm-{name}")
+            for name in names
+        }
+        self._slots = {name: threading.BoundedSemaphore(self.max_concurrency) for name in names}
+
+    @property
+    def _llm_type(self) -> str:
+        return "router"
+
+    def ranked_providers(self) -> List[tuple]:
+        entries = [
+            (name, provider, self._stats[name])
+            for name, provider in zip(self.provider_names, self.providers)
+        ]
+        healthy = [e for e in entries if e[2].healthy]
+        # When every provider is cooling down, still try them all rather than failing outright
+        candidates = healthy or entries
+        order = {name: i for i, name in enumerate(self.provider_names)}
+        candidates.sort(key=lambda e: (e[2].score(self.error_penalty), order[e[0]]))
+        return [(name, provider) for name, provider, _ in candidates]
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        last_error: Exception | None = None
+
+        for name, provider in self.ranked_providers():
+            stats = self._stats[name]
+            slots = self._slots[name]
+            if not slots.acquire(blocking=False):
+                # Every worker of this provider is busy (possibly hung): waiting in its queue would
+                # count the wait as the provider's latency, so go straight to the next one
+                last_error = RuntimeError(f"Provider {name} is saturated ({self.max_concurrency} calls in flight)")
+                registry.counter("notes_llm_failovers_total", "Router failovers by provider and reason").labels(provider=name, reason="saturated").inc()
+                logger.warning("Provider %s is saturated, failing over", name)
+                continue
+
+            call_kwargs = dict(kwargs)
+            wait = self.timeout * (self.provider_retries + 1)
+            if getattr(provider, "supports_deadline", False):
+                call_kwargs.update(timeout=self.timeout, max_retries=self.provider_retries)
+                wait += self.deadline_grace
+
+            started: List[float] = []
+            # Run in a copy of the caller's context so the provider's spans nest under the current one
+            future = self._executors[name].submit(
+                contextvars.copy_context().run, self._call, provider, slots, started, messages, stop, call_kwargs
+            )
+            submitted = time.perf_counter()
+
+            try:
+                result = future.result(timeout=wait)
+            except FutureTimeoutError:
+                stats.record_failure(time.perf_counter() - (started[0] if started else submitted))
+                last_error = TimeoutError(f"Provider {name} timed out after {wait}s")
+                registry.counter("notes_llm_failovers_total", "Router failovers by provider and reason").labels(provider=name, reason="timeout").inc()
+                logger.warning("Provider %s timed out, failing over", name)
+                continue
+            except Exception as e:
+                stats.record_failure(time.perf_counter() - (started[0] if started else submitted))
+                last_error = e
+                registry.counter("notes_llm_failovers_total", "Router failovers by provider and reason").labels(provider=name, reason="error").inc()
+                logger.warning("Provider %s failed: %s, failing over", name, e)
+                continue
+
+            latency = time.perf_counter() - started[0]
+            stats.record_success(latency)
+            logger.debug("Provider %s answered in %.3fs", name, latency)
+
+            for generation in result.generations:
+                generation.message.response_metadata.setdefault("provider", name)
+            return result
+
+        raise RuntimeError(f"All LLM providers failed: {last_error}") from last_error
+
+    @staticmethod
+    def _call(provider, slots, started: List[float], messages, stop, kwargs) -> ChatResult:
+        # The latency clock starts here, on the worker, and the slot is held until the call really ends
+        started.append(time.perf_counter())
+        try:
+            return provider._generate(messages, stop=stop, **kwargs)
+        finally:
+            slots.release()
+
+    def bind_tools(self, tools, **kwargs) -> "LLMRouter":
+        # A provider that cannot call tools would silently drop the schemas mid-run,
+        # so it is left out of the tool-calling router
+        capable = [(n, p) for n, p in zip(self.provider_names, self.providers) if getattr(p, "supports_tools", True)]
+        if not capable:
+            raise ValueError(f"No LLM provider supports tool calling: {self.provider_names}")
+        skipped = [n for n in self.provider_names if n not in {name for name, _ in capable}]
+        if skipped:
+            logger.info("Providers without tool calling skipped for tool use: %s", skipped)
+
+        bound = LLMRouter(
+            providers=[p.bind_tools(tools, **kwargs) for _, p in capable],
+            provider_names=[name for name, _ in capable],
+            timeout=self.timeout,
+            provider_retries=self.provider_retries,
+            deadline_grace=self.deadline_grace,
+            max_concurrency=self.max_concurrency,
+            error_penalty=self.error_penalty,
+            window=self.window,
+            failure_threshold=self.failure_threshold,
+            cooldown=self.cooldown,
+        )
+        # Bound copies share health data, worker threads and concurrency slots with the parent router
+        for executor in bound._executors.values():
+            executor.shutdown(wait=False)
+        bound._executors = {name: self._executors[name] for name in bound.provider_names}
+        bound._slots = {name: self._slots[name] for name in bound.provider_names}
+        bound._stats = {name: self._stats[name] for name in bound.provider_names}
+        return bound
+
+    def get_stats(self) -> List[Dict[str, Any]]:
+        return [self._stats[name].snapshot() for name in self.provider_names]
+
+
+def create_provider(name: str) -> BaseChatModel:
+    name = name.strip().lower()
+
+    if name == "openrouter":
+        from LLM.openrouter_llm import OpenRouterAdapter, openrouter_config
+        return OpenRouterAdapter(openrouter_config)
+
+    if name == "perplexity":
+        from LLM.perplexity_llm import PerplexityAiLLM, LLMConfig as PerplexityConfig
+        return PerplexityAiLLM(PerplexityConfig())
+
+    if name == "amvera":
+        from LLM.amvera_llm import amvera_llm
+        return amvera_llm
+
+    raise ValueError(f"Unknown LLM provider: {name}")
+
+
+def create_router(provider_names: Sequence[str], **kwargs) -> BaseChatModel:
+    providers, names = [], []
+
+    for name in provider_names:
+        try:
+            providers.append(create_provider(name))
+            names.append(name.strip().lower())
+        except Exception as e:
+            logger.warning("Skipping LLM provider %s: %s", name, e)
+
+    if not providers:
+        raise ValueError(f"No LLM provider could be initialised from {list(provider_names)}")
+
+    if len(providers) == 1:
+        return providers[0]
+
+    kwargs.setdefault("max_concurrency", int(os.getenv("LLM_PROVIDER_CONCURRENCY", "16")))
+    return LLMRouter(providers=providers, provider_names=names, **kwargs)
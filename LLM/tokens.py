@@ -0,0 +1,172 @@
+import json
+import math
+import threading
+from dataclasses import dataclass, field
+from typing import List, Dict, Any, Optional
+
+from langchain_core.messages import BaseMessage, SystemMessage, HumanMessage, AIMessage, ToolMessage
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+
+class TokenCounter:
+    """Counts tokens with tiktoken when available, otherwise by a chars-per-token estimate."""
+
+    MESSAGE_OVERHEAD = 4
+
+    def __init__(self, encoding_name: str = "cl100k_base", chars_per_token: float = 3.0):
+        self.chars_per_token = chars_per_token
+        self._encoding = None
+        if tiktoken is not None:
+            try:
+                self._encoding = tiktoken.get_encoding(encoding_name)
+            except Exception:
+                self._encoding = None
+
+    def count(self, text: str) -> int:
+        if not text:
+            return 0
+        if self._encoding is not None:
+            return len(self._encoding.encode(text, disallowed_special=()))
+        return math.ceil(len(text) / self.chars_per_token)
+
+    def count_message(self, message: BaseMessage) -> int:
+        tokens = self.MESSAGE_OVERHEAD + self.count(_content_text(message))
+        tool_calls = getattr(message, "tool_calls", None)
+        if tool_calls:
+            tokens += self.count(json.dumps(tool_calls, ensure_ascii=False, default=str))
+        return tokens
+
+    def count_messages(self, messages: List[BaseMessage]) -> int:
+        return sum(self.count_message(m) for m in messages)
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        total = self.count(text)
+        if total <= max_tokens:
+            return text
+
+        # Keep the head and the tail: tool outputs usually carry status up front and totals at the end
+        keep_chars = max(int(len(text) * max_tokens / total) - 40, 0)
+        head = text[: keep_chars * 3 // 4]
+        tail = text[len(text) - keep_chars // 4:] if keep_chars // 4 else ""
+        return f"{head}\n... [обрезано ~{total - max_tokens} токенов] ...\n{tail}"
+
+
+def _content_text(message: BaseMessage) -> str:
+    content = message.content
+    if isinstance(content, str):
+        return content
+    return json.dumps(content, ensure_ascii=False, default=str)
+
+
+@dataclass
+class TokenUsage:
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    calls: int = 0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+    def add(self, prompt_tokens: int, completion_tokens: int):
+        with self._lock:
+            self.prompt_tokens += prompt_tokens
+            self.completion_tokens += completion_tokens
+            self.calls += 1
+
+    def as_dict(self) -> Dict[str, int]:
+        return {
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "total_tokens": self.total_tokens,
+            "calls": self.calls,
+        }
+
+
+class ContextBudget:
+    """Fits a message list into a prompt-token budget.
+
+    Oversize tool results are truncated first, then the oldest turns are dropped.
+    The system prompt and the latest user message are never dropped.
+    """
+
+    def __init__(
+        self,
+        max_prompt_tokens: int = 12000,
+        max_tool_result_tokens: int = 2000,
+        reserved_tokens: int = 0,
+        counter: Optional[TokenCounter] = None
+    ):
+        self.max_prompt_tokens = max_prompt_tokens
+        self.max_tool_result_tokens = max_tool_result_tokens
+        self.reserved_tokens = reserved_tokens
+        self.counter = counter or TokenCounter()
+
+    def apply(self, messages: List[BaseMessage], extra_tokens: int = 0) -> List[BaseMessage]:
+        budget = self.max_prompt_tokens - self.reserved_tokens - extra_tokens
+        messages = [self._shrink_tool_result(m) for m in messages]
+
+        if self.counter.count_messages(messages) <= budget:
+            return messages
+
+        system = [m for m in messages if isinstance(m, SystemMessage)]
+        rest = [m for m in messages if not isinstance(m, SystemMessage)]
+        last_human = max((i for i, m in enumerate(rest) if isinstance(m, HumanMessage)), default=0)
+
+        dropped = 0
+        while dropped < last_human and self.counter.count_messages(system + rest[dropped:]) > budget:
+            dropped += 1
+        # Never start the history with tool results whose calling AI message was dropped
+        while dropped < last_human and isinstance(rest[dropped], ToolMessage):
+            dropped += 1
+
+        kept = system + rest[dropped:]
+        overflow = self.counter.count_messages(kept) - budget
+        if overflow > 0:
+            kept = self._shrink_largest(kept, overflow)
+
+        return kept
+
+    def _shrink_tool_result(self, message: BaseMessage) -> BaseMessage:
+        if not isinstance(message, ToolMessage):
+            return message
+
+        text = _content_text(message)
+        if self.counter.count(text) <= self.max_tool_result_tokens:
+            return message
+
+        return message.model_copy(update={"content": self.counter.truncate(text, self.max_tool_result_tokens)})
+
+    def _shrink_largest(self, messages: List[BaseMessage], overflow: int) -> List[BaseMessage]:
+        candidates = [i for i, m in enumerate(messages) if not isinstance(m, SystemMessage)]
+        if not candidates:
+            return messages
+
+        largest = max(candidates, key=lambda i: self.counter.count_message(messages[i]))
+        message = messages[largest]
+        text = _content_text(message)
+        target = max(self.counter.count(text) - overflow, 0)
+
+        shrunk = list(messages)
+        shrunk[largest] = message.model_copy(update={"content": self.counter.truncate(text, target)})
+        return shrunk
+
+
+def usage_from_messages(messages: List[BaseMessage]) -> Dict[str, int]:
+    prompt_tokens = completion_tokens = 0
+    for m in messages:
+        usage = getattr(m, "usage_metadata", None) if isinstance(m, AIMessage) else None
+        if usage:
+            prompt_tokens += usage.get("input_tokens", 0)
+            completion_tokens += usage.get("output_tokens", 0)
+
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+    }
@@ -0,0 +1,244 @@
+import math
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+def _label_key(labels: Dict[str, str]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    escaped = (v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    rank = max(0, math.ceil(q * len(sorted_values)) - 1)
+    return sorted_values[rank]
+
+
+class Counter:
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self.value += amount
+
+
+class Gauge:
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def set(self, value: float):
+        with self._lock:
+            self.value = value
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1.0):
+        self.inc(-amount)
+
+
+class Histogram:
+    """Latency distribution: running count/sum plus a window of recent samples for quantiles."""
+
+    def __init__(self, window: int = 2048):
+        self.count = 0
+        self.sum = 0.0
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        with self._lock:
+            self.count += 1
+            self.sum += value
+            self._samples.append(value)
+
+    def quantiles(self) -> Dict[float, float]:
+        with self._lock:
+            samples = sorted(self._samples)
+        return {q: percentile(samples, q) for q in QUANTILES}
+
+    def snapshot(self) -> Dict[str, float]:
+        quantiles = self.quantiles()
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "p50": round(quantiles[0.5], 6),
+            "p95": round(quantiles[0.95], 6),
+            "p99": round(quantiles[0.99], 6),
+        }
+
+
+class MetricFamily:
+    def __init__(self, name: str, help_text: str, kind: str, factory: Callable):
+        self.name = name
+        self.help = help_text
+        self.kind = kind
+        self._factory = factory
+        self._children: Dict[LabelKey, object] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, **labels):
+        key = _label_key(labels)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._factory())
+        return child
+
+    def items(self):
+        with self._lock:
+            return list(self._children.items())
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._families: Dict[str, MetricFamily] = {}
+        self._lock = threading.Lock()
+
+    def _family(self, name: str, help_text: str, kind: str, factory: Callable) -> MetricFamily:
+        with self._lock:
+            family = self._families.get(name)
+            if family is None:
+                family = self._families[name] = MetricFamily(name, help_text, kind, factory)
+            elif family.kind != kind:
+                raise ValueError(f"Metric {name} already registered as {family.kind}")
+            return family
+
+    def counter(self, name: str, help_text: str = "") -> MetricFamily:
+        return self._family(name, help_text, "counter", Counter)
+
+    def gauge(self, name: str, help_text: str = "") -> MetricFamily:
+        return self._family(name, help_text, "gauge", Gauge)
+
+    def histogram(self, name: str, help_text: str = "") -> MetricFamily:
+        return self._family(name, help_text, "summary", Histogram)
+
+    def reset(self):
+        with self._lock:
+            self._families.clear()
+
+    def snapshot(self) -> Dict[str, Dict[str, object]]:
+        result = {}
+        with self._lock:
+            families = list(self._families.values())
+        for family in families:
+            entries = {}
+            for key, metric in family.items():
+                label = ",".join(f"{k}={v}" for k, v in key) or "_"
+                entries[label] = metric.snapshot() if isinstance(metric, Histogram) else metric.value
+            result[family.name] = entries
+        return result
+
+    def render_prometheus(self) -> str:
+        lines = []
+        with self._lock:
+            families = sorted(self._families.values(), key=lambda f: f.name)
+
+        for family in families:
+            if family.help:
+                lines.append(f"# HELP {family.name} {family.help}")
+            lines.append(f"# TYPE {family.name} {family.kind}")
+            for key, metric in sorted(family.items()):
+                if isinstance(metric, Histogram):
+                    for q, value in metric.quantiles().items():
+                        lines.append(f"{family.name}{_format_labels(key, ('quantile', str(q)))} {value:.6f}")
+                    lines.append(f"{family.name}_sum{_format_labels(key)} {metric.sum:.6f}")
+                    lines.append(f"{family.name}_count{_format_labels(key)} {metric.count}")
+                else:
+                    lines.append(f"{family.name}{_format_labels(key)} {metric.value:g}")
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+
+STAGE_SECONDS = "notes_stage_seconds"
+STAGE_CALLS = "notes_stage_calls_total"
+STAGE_ITEMS = "notes_stage_items_total"
+INFLIGHT = "notes_inflight"
+CACHE_REQUESTS = "notes_cache_requests_total"
+
+
+def observe_stage(stage: str, seconds: float, status: str = "ok", **labels):
+    registry.histogram(STAGE_SECONDS, "Stage latency in seconds").labels(stage=stage, **labels).observe(seconds)
+    registry.counter(STAGE_CALLS, "Stage calls by outcome").labels(stage=stage, status=status, **labels).inc()
+
+
+@contextmanager
+def timed(stage: str, **labels):
+    """Records latency and ok/error outcome of one stage call."""
+    registry.gauge(INFLIGHT, "Calls currently in progress per stage").labels(stage=stage).inc()
+    start = time.perf_counter()
+    status = "ok"
+    try:
+        yield
+    except BaseException:
+        status = "error"
+        raise
+    finally:
+        observe_stage(stage, time.perf_counter() - start, status, **labels)
+        registry.gauge(INFLIGHT, "Calls currently in progress per stage").labels(stage=stage).dec()
+
+
+def count_items(stage: str, amount: float, **labels):
+    registry.counter(STAGE_ITEMS, "Items processed per stage (chunks, texts, tokens)").labels(stage=stage, **labels).inc(amount)
+
+
+def record_cache(cache: str, hit: bool, **labels):
+    registry.counter(CACHE_REQUESTS, "Cache lookups by result").labels(cache=cache, result="hit" if hit else "miss", **labels).inc()
+
+
+def cache_hit_rates(snapshot: Optional[Dict] = None) -> Dict[str, float]:
+    snapshot = snapshot if snapshot is not None else registry.snapshot()
+    totals: Dict[str, List[float]] = {}
+    for label, value in snapshot.get(CACHE_REQUESTS, {}).items():
+        parts = dict(p.split("=", 1) for p in label.split(","))
+        hits_total = totals.setdefault(parts["cache"], [0.0, 0.0])
+        hits_total[0] += value if parts["result"] == "hit" else 0
+        hits_total[1] += value
+    return {cache: round(hits / total, 4) if total else 0.0 for cache, (hits, total) in totals.items()}
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = registry.render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(port: int = 9108, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """Serves the registry in Prometheus text format on http://host:port/metrics from a daemon thread."""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    thread = threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True)
+    thread.start()
+    return server
@@ -0,0 +1,333 @@
+"""Opt-in profiling of named entry points: cProfile, a sampling profiler and tracemalloc.
+
+Profiling is off until it is configured, either explicitly with configure() or
+from the environment on first use:
+
+    NOTES_PROFILE            comma list of modes: cprofile, sample, tracemalloc
+    NOTES_PROFILE_TARGETS    comma list of names or fnmatch patterns (default: every name)
+    NOTES_PROFILE_DIR        output directory (default: ./profiles)
+    NOTES_PROFILE_INTERVAL   sampling interval in seconds (default: 0.005)
+
+Profiled names: rag.initial_indexing, watcher.update, agent.answer and
+streamlit.<page title>. Each profiled call writes <name>-<time>-<pid>-<n> files:
+.prof (cProfile, readable by pstats/snakeviz), .folded (sampled stacks in the
+collapsed format flamegraph.pl and speedscope read) and .tracemalloc.txt plus a
+.snapshot dump.
+
+    NOTES_PROFILE=cprofile NOTES_PROFILE_TARGETS='streamlit.*' streamlit run app.py
+    python -m MONITORING.profiling run --mode sample tracemalloc --targets agent.answer -- script.py args
+    python -m MONITORING.profiling show profiles/agent.answer-20260101-120000-4242-1.prof
+"""
+import argparse
+import cProfile
+import fnmatch
+import itertools
+import os
+import pstats
+import re
+import runpy
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator, List, Optional
+
+
+MODES = ("cprofile", "sample", "tracemalloc")
+
+
+@dataclass(frozen=True)
+class ProfileSettings:
+    modes: frozenset = frozenset()
+    targets: tuple = ()
+    directory: Path = Path("profiles")
+    interval: float = 0.005
+
+    def wants(self, name: str) -> bool:
+        if not self.modes:
+            return False
+        return not self.targets or any(fnmatch.fnmatchcase(name, pattern) for pattern in self.targets)
+
+
+def _split(value: Optional[str]) -> List[str]:
+    return [part.strip() for part in (value or "").split(",") if part.strip()]
+
+
+_settings: Optional[ProfileSettings] = None
+_config_lock = threading.Lock()
+_sequence = itertools.count(1)
+_local = threading.local()
+# tracemalloc is process-wide: overlapping profiles share it, the last one out stops it
+_tracemalloc_lock = threading.Lock()
+_tracemalloc_users = 0
+_tracemalloc_owned = False
+
+
+def configure(modes=None, targets=None, directory=None, interval=None) -> ProfileSettings:
+    """Replaces the active settings; with no modes profiling is switched off."""
+    global _settings
+    unknown = set(modes or ()) - set(MODES)
+    if unknown:
+        raise ValueError(f"Unknown profiling mode(s) {sorted(unknown)}, expected {MODES}")
+    with _config_lock:
+        _settings = ProfileSettings(
+            modes=frozenset(modes or ()),
+            targets=tuple(targets or ()),
+            directory=Path(directory or "profiles"),
+            interval=interval or 0.005,
+        )
+    return _settings
+
+
+def settings() -> ProfileSettings:
+    if _settings is None:
+        configure(
+            _split(os.getenv("NOTES_PROFILE")),
+            _split(os.getenv("NOTES_PROFILE_TARGETS")),
+            os.getenv("NOTES_PROFILE_DIR"),
+            float(os.getenv("NOTES_PROFILE_INTERVAL") or 0),
+        )
+    return _settings
+
+
+def _acquire_tracemalloc():
+    global _tracemalloc_users, _tracemalloc_owned
+    with _tracemalloc_lock:
+        if _tracemalloc_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _tracemalloc_owned = True
+        _tracemalloc_users += 1
+
+
+def _release_tracemalloc():
+    global _tracemalloc_users, _tracemalloc_owned
+    with _tracemalloc_lock:
+        _tracemalloc_users -= 1
+        # Tracing started outside of profiling (python -X tracemalloc) is left running
+        if _tracemalloc_users == 0 and _tracemalloc_owned:
+            tracemalloc.stop()
+            _tracemalloc_owned = False
+
+
+class SamplingProfiler:
+    """Samples the stack of one thread at a fixed interval and counts collapsed stacks."""
+
+    def __init__(self, thread_id: int, interval: float):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({Path(code.co_filename).name}:{frame.f_lineno})")
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def write(self, path: Path):
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+class Profile:
+    def __init__(self, name: str, settings: ProfileSettings):
+        self.name = name
+        self.settings = settings
+        self.files: List[Path] = []
+        self._cprofile: Optional[cProfile.Profile] = None
+        self._sampler: Optional[SamplingProfiler] = None
+        self._snapshot: Optional[tracemalloc.Snapshot] = None
+        self._started = 0.0
+
+    def start(self) -> "Profile":
+        # Streamlit aborts a script run on rerun, which can leave a profile of the
+        # previous run open in this thread: finish it before starting a new one
+        stale = getattr(_local, "streamlit", None)
+        if stale is not None and self.name.startswith("streamlit."):
+            stale.stop()
+
+        modes = self.settings.modes
+        # Only one cProfile can be active per thread; nested targets are sampled only
+        if "cprofile" in modes and getattr(_local, "cprofile", None) is None:
+            self._cprofile = cProfile.Profile()
+            _local.cprofile = self
+            self._cprofile.enable()
+        if "sample" in modes:
+            self._sampler = SamplingProfiler(threading.get_ident(), self.settings.interval)
+            self._sampler.start()
+        if "tracemalloc" in modes:
+            _acquire_tracemalloc()
+            self._snapshot = tracemalloc.take_snapshot()
+
+        if self.name.startswith("streamlit."):
+            _local.streamlit = self
+        self._started = time.perf_counter()
+        return self
+
+    def stop(self) -> List[Path]:
+        elapsed = time.perf_counter() - self._started
+        if getattr(_local, "streamlit", None) is self:
+            _local.streamlit = None
+
+        # Writing results of a nested target must not land in the outer cProfile
+        outer = getattr(_local, "cprofile", None)
+        if outer is not None and outer is not self:
+            outer._cprofile.disable()
+
+        stem = self._stem()
+        if self._cprofile is not None:
+            self._cprofile.disable()
+            _local.cprofile = None
+            self._write(Path(f"{stem}.prof"), lambda path: self._cprofile.dump_stats(str(path)))
+            self._cprofile = None
+        if self._sampler is not None:
+            self._sampler.stop()
+            self._write(Path(f"{stem}.folded"), self._sampler.write)
+            self._sampler = None
+        if self._snapshot is not None:
+            try:
+                self._write_tracemalloc(stem, elapsed)
+            finally:
+                self._snapshot = None
+                _release_tracemalloc()
+
+        if outer is not None and outer is not self:
+            outer._cprofile.enable()
+        return self.files
+
+    def _stem(self) -> Path:
+        directory = self.settings.directory
+        directory.mkdir(parents=True, exist_ok=True)
+        safe = re.sub(r"[^\w.-]+", "_", self.name).strip("_")
+        return directory / f"{safe}-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{next(_sequence)}"
+
+    def _write(self, path: Path, writer):
+        writer(path)
+        self.files.append(path)
+
+    def _write_tracemalloc(self, stem: Path, elapsed: float):
+        # Stopped by someone outside of profiling: there is nothing to compare against
+        if not tracemalloc.is_tracing():
+            return
+        after = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+
+        # Filtering whole snapshots walks every trace in Python; filter the grouped stats instead
+        ignored = (tracemalloc.__file__, __file__, "<frozen importlib._bootstrap>")
+        diff = [stat for stat in after.compare_to(self._snapshot, "lineno") if stat.traceback[0].filename not in ignored]
+
+        lines = [
+            f"{self.name}: {elapsed:.3f} s, traced current {current / 1e6:.2f} MB, peak {peak / 1e6:.2f} MB",
+            "",
+            "Top allocations made during the call:",
+        ]
+        lines += [str(stat) for stat in diff[:30]]
+        self._write(Path(f"{stem}.tracemalloc.txt"), lambda path: path.write_text("\n".join(lines) + "\n", encoding="utf-8"))
+        self._write(Path(f"{stem}.snapshot"), lambda path: after.dump(str(path)))
+
+
+@contextmanager
+def profiled(name: str) -> Iterator[Optional[Profile]]:
+    """Profiles the block when `name` is targeted; otherwise costs one settings lookup."""
+    current = settings()
+    if not current.wants(name):
+        yield None
+        return
+
+    profile = Profile(name, current).start()
+    try:
+        yield profile
+    finally:
+        profile.stop()
+
+
+def start_profile(name: str) -> Optional[Profile]:
+    """Unscoped variant of profiled() for code that cannot be wrapped in a block; call .stop() when done."""
+    current = settings()
+    return Profile(name, current).start() if current.wants(name) else None
+
+
+def render(path: str, limit: int = 25) -> str:
+    if path.endswith(".prof"):
+        import io
+        out = io.StringIO()
+        pstats.Stats(path, stream=out).sort_stats("cumulative").print_stats(limit)
+        return out.getvalue()
+
+    if path.endswith(".folded"):
+        inclusive, leaf, total = Counter(), Counter(), 0
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                stack, _, count = line.rstrip("\n").rpartition(" ")
+                frames = stack.split(";")
+                total += int(count)
+                leaf[frames[-1]] += int(count)
+                for frame in set(frames):
+                    inclusive[frame] += int(count)
+        lines = [f"{total} samples", "", "self    total   frame"]
+        for frame, count in leaf.most_common(limit):
+            lines.append(f"{count / total:6.1%}  {inclusive[frame] / total:6.1%}  {frame}")
+        return "\n".join(lines)
+
+    return Path(path).read_text(encoding="utf-8")
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="run a script or module with profiling switched on")
+    run.add_argument("--mode", nargs="+", choices=MODES, default=["cprofile"])
+    run.add_argument("--targets", nargs="+", default=[])
+    run.add_argument("--dir", default="profiles")
+    run.add_argument("--interval", type=float, default=0.005)
+    run.add_argument("-m", dest="module", default=None, help="run a module instead of a script")
+    run.add_argument("argv", nargs=argparse.REMAINDER, help="script path (unless -m) and its arguments")
+
+    show = commands.add_parser("show", help="print a summary of a .prof, .folded or .tracemalloc.txt file")
+    show.add_argument("path")
+    show.add_argument("--limit", type=int, default=25)
+
+    args = parser.parse_args(argv)
+    if args.command == "show":
+        print(render(args.path, args.limit))
+        return
+
+    target_argv = args.argv[1:] if args.argv[:1] == ["--"] else args.argv
+    # Through the environment rather than configure(): this file runs as __main__,
+    # so the target imports a separate MONITORING.profiling module (and child
+    # processes such as `-m streamlit run` inherit the settings too)
+    os.environ["NOTES_PROFILE"] = ",".join(args.mode)
+    os.environ["NOTES_PROFILE_TARGETS"] = ",".join(args.targets)
+    os.environ["NOTES_PROFILE_DIR"] = args.dir
+    os.environ["NOTES_PROFILE_INTERVAL"] = str(args.interval)
+    if args.module:
+        sys.argv = [args.module] + target_argv
+        runpy.run_module(args.module, run_name="__main__", alter_sys=True)
+    else:
+        if not target_argv:
+            parser.error("run needs a script path or -m module")
+        sys.argv = target_argv
+        runpy.run_path(target_argv[0], run_name="__main__")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,270 @@
+"""Lightweight tracing: nested spans carried in a ContextVar, exported as JSON lines.
+
+Tracing is off until an exporter is configured, either explicitly with
+configure() or from the environment on first use:
+
+    NOTES_TRACE_FILE       JSON-lines file that receives finished spans
+    NOTES_OTLP_ENDPOINT    OTLP/HTTP collector, e.g. http://localhost:4318
+
+Print the waterfall of a recorded trace:
+
+    python -m MONITORING.tracing list --file traces.jsonl
+    python -m MONITORING.tracing show <trace_id> --file traces.jsonl
+"""
+import argparse
+import json
+import os
+import queue
+import sys
+import threading
+import time
+import urllib.request
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field, asdict
+from typing import Any, Dict, Iterator, List, Optional
+
+
+@dataclass
+class Span:
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str] = None
+    start: float = field(default_factory=time.time)
+    duration: float = 0.0
+    status: str = "ok"
+    attributes: Dict[str, Any] = field(default_factory=dict)
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class _NoopSpan:
+    def set(self, **attributes):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+class JsonLinesExporter:
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, span: Span):
+        line = json.dumps(span.as_dict(), ensure_ascii=False, default=str)
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+
+class OtlpHttpExporter:
+    """Ships spans to an OTLP/HTTP collector as JSON from a background thread, in small batches."""
+
+    def __init__(self, endpoint: str, service_name: str = "notes-assistant", batch_size: int = 64, timeout: float = 2.0):
+        self.url = endpoint.rstrip("/") + "/v1/traces"
+        self.service_name = service_name
+        self.batch_size = batch_size
+        self.timeout = timeout
+        self._queue: "queue.Queue[Span]" = queue.Queue(maxsize=10000)
+        self._thread = threading.Thread(target=self._run, name="otlp-exporter", daemon=True)
+        self._thread.start()
+
+    def export(self, span: Span):
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            pass
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get(timeout=0.5))
+                except queue.Empty:
+                    break
+            try:
+                self._post(batch)
+            except Exception:
+                # A missing collector must never affect the traced code
+                pass
+
+    @staticmethod
+    def _value(value: Any) -> Dict[str, Any]:
+        if isinstance(value, bool):
+            return {"boolValue": value}
+        if isinstance(value, int):
+            return {"intValue": str(value)}
+        if isinstance(value, float):
+            return {"doubleValue": value}
+        return {"stringValue": str(value)}
+
+    def _post(self, spans: List[Span]):
+        payload = {"resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": self.service_name}}]},
+            "scopeSpans": [{
+                "scope": {"name": "notes-assistant"},
+                "spans": [{
+                    "traceId": s.trace_id,
+                    "spanId": s.span_id,
+                    "parentSpanId": s.parent_id or "",
+                    "name": s.name,
+                    "kind": 1,
+                    "startTimeUnixNano": str(int(s.start * 1e9)),
+                    "endTimeUnixNano": str(int((s.start + s.duration) * 1e9)),
+                    "attributes": [{"key": k, "value": self._value(v)} for k, v in s.attributes.items()],
+                    "status": {"code": 2 if s.status == "error" else 1},
+                } for s in spans],
+            }],
+        }]}
+        request = urllib.request.Request(
+            self.url,
+            data=json.dumps(payload).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+            method="POST",
+        )
+        urllib.request.urlopen(request, timeout=self.timeout).close()
+
+
+_exporters: List[Any] = []
+_configured = False
+_config_lock = threading.Lock()
+
+
+def configure(trace_file: Optional[str] = None, otlp_endpoint: Optional[str] = None, exporters: Optional[List[Any]] = None):
+    """Replaces the active exporters; with no arguments tracing is switched off."""
+    global _configured
+    with _config_lock:
+        _exporters.clear()
+        if trace_file:
+            _exporters.append(JsonLinesExporter(trace_file))
+        if otlp_endpoint:
+            _exporters.append(OtlpHttpExporter(otlp_endpoint))
+        _exporters.extend(exporters or [])
+        _configured = True
+
+
+def _ensure_configured():
+    if not _configured:
+        configure(os.getenv("NOTES_TRACE_FILE"), os.getenv("NOTES_OTLP_ENDPOINT"))
+
+
+def enabled() -> bool:
+    _ensure_configured()
+    return bool(_exporters)
+
+
+@contextmanager
+def span(name: str, **attributes) -> Iterator[Span]:
+    """Opens a child of the current span, or a new trace when there is none."""
+    if not enabled():
+        yield NOOP_SPAN
+        return
+
+    parent = current_span.get()
+    current = Span(
+        name=name,
+        trace_id=parent.trace_id if parent else uuid.uuid4().hex,
+        span_id=uuid.uuid4().hex[:16],
+        parent_id=parent.span_id if parent else None,
+        attributes=attributes,
+    )
+    token = current_span.set(current)
+    started = time.perf_counter()
+    try:
+        yield current
+    except BaseException as e:
+        current.status = "error"
+        current.attributes["error"] = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        current.duration = time.perf_counter() - started
+        current_span.reset(token)
+        for exporter in list(_exporters):
+            try:
+                exporter.export(current)
+            except Exception:
+                pass
+
+
+def current_trace_id() -> Optional[str]:
+    active = current_span.get()
+    return active.trace_id if active else None
+
+
+def load_spans(path: str, trace_id: Optional[str] = None) -> List[Dict[str, Any]]:
+    spans = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            if trace_id is None or record["trace_id"].startswith(trace_id):
+                spans.append(record)
+    return spans
+
+
+def render_waterfall(spans: List[Dict[str, Any]], width: int = 40) -> str:
+    if not spans:
+        return "no spans"
+
+    by_parent: Dict[Optional[str], List[Dict[str, Any]]] = {}
+    ids = {s["span_id"] for s in spans}
+    for s in spans:
+        parent = s["parent_id"] if s["parent_id"] in ids else None
+        by_parent.setdefault(parent, []).append(s)
+    for children in by_parent.values():
+        children.sort(key=lambda s: s["start"])
+
+    trace_start = min(s["start"] for s in spans)
+    trace_end = max(s["start"] + s["duration"] for s in spans)
+    total = max(trace_end - trace_start, 1e-9)
+
+    lines = [f"trace {spans[0]['trace_id']}  total {total * 1000:.1f} ms"]
+
+    def walk(parent_id, depth):
+        for s in by_parent.get(parent_id, []):
+            offset = int((s["start"] - trace_start) / total * width)
+            length = max(1, int(s["duration"] / total * width))
+            bar = " " * offset + "█" * min(length, width - offset)
+            attrs = " ".join(f"{k}={v}" for k, v in s["attributes"].items() if k != "error")
+            status = " ✗ " + s["attributes"].get("error", "") if s["status"] == "error" else ""
+            label = ("  " * depth + s["name"])[:38]
+            lines.append(f"{label:<38} {s['duration'] * 1000:9.1f} ms |{bar:<{width}}| {attrs}{status}")
+            walk(s["span_id"], depth + 1)
+
+    walk(None, 0)
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["list", "show"])
+    parser.add_argument("trace_id", nargs="?")
+    parser.add_argument("--file", default=os.getenv("NOTES_TRACE_FILE", "traces.jsonl"))
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    if args.command == "show":
+        if not args.trace_id:
+            parser.error("show needs a trace id")
+        print(render_waterfall(load_spans(args.file, args.trace_id)))
+        return
+
+    roots = [s for s in load_spans(args.file) if s["parent_id"] is None]
+    for s in roots[-args.limit:]:
+        started = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(s["start"]))
+        print(f"{s['trace_id']}  {started}  {s['duration'] * 1000:9.1f} ms  {s['name']}  {s['status']}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
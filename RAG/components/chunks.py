@@ -0,0 +1,167 @@
+import sys
+from array import array
+
+
+class _Interned:
+    """Append-only string table: each distinct string is stored once and referenced by index."""
+
+    __slots__ = ("values", "_index")
+
+    def __init__(self):
+        self.values = []
+        self._index = {}
+
+    def id(self, value):
+        value_id = self._index.get(value)
+        if value_id is None:
+            value_id = len(self.values)
+            self.values.append(sys.intern(value))
+            self._index[value] = value_id
+        return value_id
+
+
+class ChunkBatch:
+    """Column-oriented chunks between splitting and storage.
+
+    A LangChain Document with its metadata dict costs about a kilobyte per chunk
+    on top of the text. Here a chunk is a text plus a few integers in typed
+    arrays, and every source path and heading path is stored once, so a whole
+    vault fits in a few lists. Documents and Chroma metadata dicts are built
+    only at the boundaries.
+    """
+
+    __slots__ = (
+        "texts", "_paths", "path_ids", "chunk_ids", "starts", "ends",
+        "byte_starts", "byte_ends", "_headings", "heading_ids",
+    )
+
+    def __init__(self):
+        self.texts = []
+        self._paths = _Interned()
+        self.path_ids = array("I")
+        self.chunk_ids = array("I")
+        # Character offsets into the source text, and the same span in UTF-8 bytes
+        self.starts = array("q")
+        self.ends = array("q")
+        self.byte_starts = array("q")
+        self.byte_ends = array("q")
+        self._headings = _Interned()
+        self.heading_ids = array("I")
+
+    @property
+    def paths(self):
+        return self._paths.values
+
+    def append(self, text, source, chunk_id, start, end, byte_start=-1, byte_end=-1, heading=""):
+        self.texts.append(text)
+        self.path_ids.append(self._paths.id(source))
+        self.chunk_ids.append(chunk_id)
+        self.starts.append(start)
+        self.ends.append(end)
+        self.byte_starts.append(byte_start)
+        self.byte_ends.append(byte_end)
+        self.heading_ids.append(self._headings.id(heading))
+
+    def add_text(self, source, text, pieces, chunk_overlap=0):
+        """Appends the split pieces of one text, locating each piece in it for the offsets."""
+        index = 0
+        previous = 0
+        # Starts never move backwards, so byte offsets are counted incrementally
+        byte_index = 0
+        counted = 0
+        for chunk_id, piece in enumerate(pieces):
+            # Same search as the LangChain splitters' add_start_index
+            offset = index + previous - chunk_overlap
+            found = text.find(piece, max(0, offset))
+            index = found if found >= 0 else max(0, offset)
+            previous = len(piece)
+
+            if index >= counted:
+                byte_index += len(text[counted:index].encode("utf-8"))
+            else:
+                byte_index = len(text[:index].encode("utf-8"))
+            counted = index
+            self.append(piece, source, chunk_id, index, index + len(piece), byte_index, byte_index + len(piece.encode("utf-8")))
+
+    def __len__(self):
+        return len(self.texts)
+
+    def __getitem__(self, positions):
+        # An integer gives a Document, as in the list documents_processor() used to return
+        if not isinstance(positions, slice):
+            return self.document(positions)
+        part = ChunkBatch()
+        part._paths = self._paths
+        part._headings = self._headings
+        for column in ("texts", "path_ids", "chunk_ids", "starts", "ends", "byte_starts", "byte_ends", "heading_ids"):
+            setattr(part, column, getattr(self, column)[positions])
+        return part
+
+    def source(self, position):
+        return self._paths.values[self.path_ids[position]]
+
+    def sources(self):
+        return [self._paths.values[path_id] for path_id in self.path_ids]
+
+    def heading(self, position):
+        return self._headings.values[self.heading_ids[position]]
+
+    def ids(self):
+        paths = self._paths.values
+        return [f"{paths[p]}#{c}" for p, c in zip(self.path_ids, self.chunk_ids)]
+
+    def metadatas(self):
+        paths, headings = self._paths.values, self._headings.values
+        return [
+            self._metadata(paths[p], c, s, e, bs, be, headings[h])
+            for p, c, s, e, bs, be, h in zip(
+                self.path_ids, self.chunk_ids, self.starts, self.ends, self.byte_starts, self.byte_ends, self.heading_ids
+            )
+        ]
+
+    @staticmethod
+    def _metadata(source, chunk_id, start, end, byte_start, byte_end, heading):
+        metadata = {"source": source, "chunk_id": chunk_id, "start_index": start, "end_index": end}
+        if byte_start >= 0:
+            metadata["start_byte"] = byte_start
+            metadata["end_byte"] = byte_end
+        # Chroma rejects None values, so chunks outside any section carry no key
+        if heading:
+            metadata["headings"] = heading
+        return metadata
+
+    def document(self, position):
+        from langchain_core.documents import Document
+
+        metadata = self._metadata(
+            self.source(position), self.chunk_ids[position], self.starts[position], self.ends[position],
+            self.byte_starts[position], self.byte_ends[position], self.heading(position)
+        )
+        return Document(page_content=self.texts[position], metadata=metadata)
+
+    def __iter__(self):
+        from langchain_core.documents import Document
+
+        for text, metadata in zip(self.texts, self.metadatas()):
+            yield Document(page_content=text, metadata=metadata)
+
+    def to_documents(self):
+        return list(self)
+
+    @classmethod
+    def from_documents(cls, documents):
+        batch = cls()
+        for position, document in enumerate(documents):
+            metadata = document.metadata
+            start = metadata.get("start_index", -1)
+            batch.append(
+                document.page_content,
+                metadata.get("source", ""),
+                metadata.get("chunk_id", position),
+                start,
+                metadata.get("end_index", start + len(document.page_content) if start >= 0 else -1),
+                metadata.get("start_byte", -1),
+                metadata.get("end_byte", -1),
+                metadata.get("headings", ""),
+            )
+        return batch
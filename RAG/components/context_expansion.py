@@ -0,0 +1,209 @@
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+from RAG.logging_config import logger
+from MONITORING.tracing import span
+
+
+@dataclass
+class Passage:
+    """A run of consecutive chunks of one file, merged into one piece of context."""
+    source: str
+    chunk_ids: List[int]
+    text: str
+    distance: float
+    headings: str = ""
+    start_index: int = -1
+    end_index: int = -1
+    # Texts of the chunks the search actually returned, the fallback when the
+    # whole passage does not fit into the budget
+    hits: List[str] = field(default_factory=list)
+
+    def metadata(self):
+        metadata = {
+            "source": self.source,
+            "chunk_ids": ",".join(map(str, self.chunk_ids)),
+            "start_index": self.start_index,
+            "end_index": self.end_index,
+        }
+        if self.headings:
+            metadata["headings"] = self.headings
+        return metadata
+
+
+class ContextExpander:
+    """Small-to-big retrieval: widens search hits to their neighbours or their section.
+
+    Small chunks are matched precisely, but an answer often needs the text around
+    them. For every hit the chunks within `window` positions (or, with
+    section=True, all chunks under the same heading path from the markdown
+    chunker) are fetched in one batched get, runs of consecutive chunks of a file
+    are merged with their overlaps removed, and the passages are packed best
+    first into max_tokens.
+    """
+
+    def __init__(self, vectorstorage, window=1, section=False, max_tokens=1500, counter=None):
+        from LLM.tokens import TokenCounter
+
+        self.vectorstorage = vectorstorage
+        self.window = window
+        self.section = section
+        self.max_tokens = max_tokens
+        self.counter = counter or TokenCounter()
+
+    def expand(self, results) -> List[Passage]:
+        hits = self._hits(results)
+        if not hits:
+            return []
+
+        with span("rag.expand", hits=len(hits), window=self.window, section=self.section) as s:
+            chunks = self._fetch(hits)
+            passages = self._merge(hits, chunks)
+            packed = self._pack(passages)
+            s.set(fetched=len(chunks), passages=len(passages), packed=len(packed))
+
+        logger.debug("Расширение контекста: %s совпадений -> %s фрагментов", len(hits), len(packed))
+        return packed
+
+    @staticmethod
+    def _hits(results) -> Dict[str, dict]:
+        ids = (results.get('ids') or [[]])[0]
+        documents = (results.get('documents') or [[]])[0]
+        metadatas = (results.get('metadatas') or [[]])[0]
+        distances = (results.get('distances') or [[]])[0] or [0.0] * len(ids)
+
+        hits = {}
+        for chunk_id, text, metadata, distance in zip(ids, documents, metadatas, distances):
+            if (metadata or {}).get("chunk_id") is None:
+                continue
+            hits[chunk_id] = {"text": text, "metadata": metadata, "distance": distance}
+        return hits
+
+    def _fetch(self, hits) -> Dict[str, dict]:
+        """One get for every neighbour or section of every hit."""
+        chunks = {chunk_id: {"text": hit["text"], "metadata": hit["metadata"]} for chunk_id, hit in hits.items()}
+
+        sections = set()
+        ranges = []
+        wanted = set()
+        for hit in hits.values():
+            metadata = hit["metadata"]
+            source, position = metadata.get("source", ""), metadata["chunk_id"]
+            if self.section and metadata.get("headings"):
+                sections.add((source, metadata["headings"]))
+                continue
+            ranges.append((source, max(0, position - self.window), position + self.window))
+            for neighbour in range(max(0, position - self.window), position + self.window + 1):
+                wanted.add(f"{source}#{neighbour}")
+
+        if sections:
+            # Sections can only be selected by metadata, so the neighbour windows
+            # join them as chunk_id ranges in the same get
+            where = [{"$and": [{"source": source}, {"headings": headings}]} for source, headings in sorted(sections)]
+            where += [
+                {"$and": [{"source": source}, {"chunk_id": {"$gte": low}}, {"chunk_id": {"$lte": high}}]}
+                for source, low, high in ranges
+            ]
+            result = self.vectorstorage.get_chunks(where=where[0] if len(where) == 1 else {"$or": where})
+        else:
+            wanted -= chunks.keys()
+            if not wanted:
+                return chunks
+            # Ids are "<source>#<chunk_id>", so neighbours are looked up directly
+            result = self.vectorstorage.get_chunks(ids=sorted(wanted))
+
+        for chunk_id, text, metadata in zip(result['ids'], result['documents'], result['metadatas']):
+            chunks.setdefault(chunk_id, {"text": text, "metadata": metadata})
+        return chunks
+
+    def _merge(self, hits, chunks) -> List[Passage]:
+        by_source = {}
+        for chunk_id, chunk in chunks.items():
+            metadata = chunk["metadata"] or {}
+            if metadata.get("chunk_id") is None:
+                continue
+            by_source.setdefault(metadata.get("source", ""), []).append((metadata["chunk_id"], chunk_id, chunk))
+
+        passages = []
+        for source, entries in by_source.items():
+            entries.sort(key=lambda entry: entry[0])
+            run = []
+            for entry in entries:
+                if run and entry[0] != run[-1][0] + 1:
+                    passages.append(self._passage(source, run, hits))
+                    run = []
+                run.append(entry)
+            if run:
+                passages.append(self._passage(source, run, hits))
+
+        # Runs without a hit are neighbours of nothing the search returned
+        passages = [p for p in passages if p.hits]
+        passages.sort(key=lambda p: p.distance)
+        return passages
+
+    @staticmethod
+    def _passage(source, run, hits) -> Passage:
+        headings = ""
+        parts = []
+        end = -1
+        for _, _, chunk in run:
+            metadata = chunk["metadata"]
+            text = chunk["text"]
+            # Markdown chunks repeat their heading path in front of the body
+            heading = metadata.get("headings", "")
+            if heading and text.startswith(heading + "\n\n"):
+                text = text[len(heading) + 2:]
+                # A window can cross into the next section: keep its heading path in front of its body
+                if headings and heading != headings:
+                    text = f"{heading}\n\n{text}"
+            headings = headings or heading
+
+            start = metadata.get("start_index", -1)
+            if parts and start >= 0 and end >= 0 and start < end:
+                # Splitter overlap: keep only the part past the previous chunk
+                parts.append(text[end - start:])
+            elif parts:
+                parts.append("\n\n" + text)
+            else:
+                parts.append(text)
+            end = metadata.get("end_index", -1)
+
+        matched = [hits[chunk_id] for _, chunk_id, _ in run if chunk_id in hits]
+        body = "".join(parts)
+        first = run[0][2]["metadata"]
+        return Passage(
+            source=source,
+            chunk_ids=[position for position, _, _ in run],
+            text=f"{headings}\n\n{body}" if headings else body,
+            distance=min(hit["distance"] for hit in matched) if matched else float("inf"),
+            headings=headings,
+            start_index=first.get("start_index", -1),
+            end_index=end,
+            hits=[hit["text"] for hit in matched],
+        )
+
+    def _pack(self, passages) -> List[Passage]:
+        packed = []
+        used = 0
+        for passage in passages:
+            tokens = self.counter.count(passage.text)
+            if used + tokens > self.max_tokens:
+                # Too big with its neighbours: fall back to the matched chunks alone
+                text = "\n\n".join(passage.hits)
+                tokens = self.counter.count(text)
+                if used + tokens > self.max_tokens:
+                    continue
+                passage.text = text
+            packed.append(passage)
+            used += tokens
+        return packed
+
+
+def passages_to_results(passages: List[Passage]) -> dict:
+    """Shapes passages like a single-query search() result, for the existing consumers."""
+    return {
+        "ids": [[f"{p.source}#{p.chunk_ids[0]}" for p in passages]],
+        "documents": [[p.text for p in passages]],
+        "metadatas": [[p.metadata() for p in passages]],
+        "distances": [[p.distance for p in passages]],
+    }
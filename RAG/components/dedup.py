@@ -0,0 +1,323 @@
+import base64
+import hashlib
+import json
+import re
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import numpy as np
+
+from RAG.logging_config import logger
+from RAG.components.chunks import ChunkBatch
+from RAG.components.embedding_model import as_float32
+from MONITORING.metrics import count_items
+from MONITORING.tracing import span
+
+
+_WORD_RE = re.compile(r"\w+")
+# Universal hashing (a * x + b) mod p over 32-bit shingle hashes; the product fits in uint64
+_PRIME = np.uint64(4294967311)
+_PERMUTATIONS = 64
+_A, _B = (np.random.default_rng(0x5EED).integers(low, 2 ** 32, _PERMUTATIONS, dtype=np.uint64) for low in (1, 0))
+
+
+def minhash(text, shingle=3):
+    """MinHash signature (64 x uint32) of the word shingles of a text, case- and whitespace-insensitive.
+
+    The share of equal positions in two signatures estimates the Jaccard
+    similarity of their shingle sets.
+    """
+    words = _WORD_RE.findall(text.lower())
+    shingles = {" ".join(words[i:i + shingle]) for i in range(max(1, len(words) - shingle + 1))}
+    hashes = np.fromiter(
+        (int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=4).digest(), "little") for s in shingles),
+        dtype=np.uint64, count=len(shingles)
+    )
+    return ((hashes[:, None] * _A + _B) % _PRIME).min(axis=0).astype(np.uint32)
+
+
+def _source(chunk_id):
+    return chunk_id.rpartition("#")[0]
+
+
+class _SignatureIndex:
+    """Signatures by chunk id, with an LSH index over bands of each signature."""
+
+    def __init__(self, bands):
+        self.bands = bands
+        self.signatures = {}
+        self._buckets = [{} for _ in range(bands)]
+
+    def _keys(self, signature):
+        return [band.tobytes() for band in signature.reshape(self.bands, -1)]
+
+    def add(self, chunk_id, signature):
+        self.signatures[chunk_id] = signature
+        for band, key in enumerate(self._keys(signature)):
+            self._buckets[band].setdefault(key, set()).add(chunk_id)
+
+    def discard(self, chunk_id):
+        signature = self.signatures.pop(chunk_id, None)
+        if signature is None:
+            return
+        for band, key in enumerate(self._keys(signature)):
+            members = self._buckets[band].get(key)
+            if members is not None:
+                members.discard(chunk_id)
+                if not members:
+                    del self._buckets[band][key]
+
+    def candidates(self, signature):
+        found = set()
+        for band, key in enumerate(self._keys(signature)):
+            found |= self._buckets[band].get(key, set())
+        return found
+
+
+@dataclass
+class _Plan:
+    """What a batch would change, applied only once its chunks are stored."""
+    unique: ChunkBatch
+    canonical: _SignatureIndex
+    references: dict = field(default_factory=dict)
+    skipped_chars: int = 0
+
+
+class ChunkDeduplicator:
+    """Near-duplicate chunks are embedded and stored once.
+
+    Every stored ("canonical") chunk has a MinHash signature. A new chunk whose
+    estimated Jaccard similarity (word 3-shingles) to a canonical one is at least
+    `threshold` is not embedded; it is recorded as a reference to that chunk
+    instead, and search hits on the canonical chunk list the referencing sources
+    in "also_in". Candidates come from LSH over 16 bands of 4 signature values:
+    a pair at similarity 0.7 shares a band with probability ~0.99, one at 0.3
+    with ~0.12, and every candidate is verified on the full signature. Only
+    chunks of other files are matched: a passage repeated within one note
+    stays part of that note.
+
+    Signatures and references live in a JSON file next to the Chroma
+    directory. Chunks stored before deduplication was enabled have no
+    signature and are only matched after a reindex.
+    """
+
+    BANDS = 16
+
+    def __init__(self, vectorstorage, path, threshold=0.7):
+        self.vectorstorage = vectorstorage
+        self.path = Path(path)
+        self.threshold = threshold
+        self._lock = threading.Lock()
+
+        self._index = _SignatureIndex(self.BANDS)
+        self.signatures = self._index.signatures
+        # duplicate id -> {"canonical": id, "metadata": {...}, "chars": n}
+        self.references = {}
+        self._referrers = {}
+        self._load()
+
+    def _load(self):
+        if not self.path.exists():
+            return
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except Exception as e:
+            logger.warning("⚠ Индекс дубликатов %s не прочитан, начинаю заново: %s", self.path, e)
+            return
+        for chunk_id, signature in data.get("signatures", {}).items():
+            self._add_canonical(chunk_id, np.frombuffer(base64.b64decode(signature), dtype=np.uint32))
+        for chunk_id, reference in data.get("references", {}).items():
+            self._add_reference(chunk_id, reference)
+        logger.info("✓ Индекс дубликатов загружен: %s чанков, %s ссылок", len(self.signatures), len(self.references))
+
+    def save(self):
+        with self._lock:
+            signatures = {c: base64.b64encode(s.tobytes()).decode("ascii") for c, s in self.signatures.items()}
+            data = {"signatures": signatures, "references": self.references}
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_name(self.path.name + ".tmp")
+            tmp.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+            tmp.replace(self.path)
+
+    def _add_canonical(self, chunk_id, signature):
+        self._index.add(chunk_id, signature)
+
+    def _drop_canonical(self, chunk_id):
+        self._index.discard(chunk_id)
+
+    def _add_reference(self, chunk_id, reference):
+        self.references[chunk_id] = reference
+        self._referrers.setdefault(reference["canonical"], set()).add(chunk_id)
+
+    def _drop_reference(self, chunk_id):
+        reference = self.references.pop(chunk_id, None)
+        if reference is None:
+            return None
+        referrers = self._referrers.get(reference["canonical"])
+        if referrers is not None:
+            referrers.discard(chunk_id)
+            if not referrers:
+                del self._referrers[reference["canonical"]]
+        return reference
+
+    def match(self, signature, source, staged=None):
+        """Best canonical chunk of another source at least `threshold` similar, or None."""
+        candidates = {}
+        for index in (self._index, staged) if staged is not None else (self._index,):
+            for chunk_id in index.candidates(signature):
+                if _source(chunk_id) != source:
+                    candidates[chunk_id] = index.signatures[chunk_id]
+        if not candidates:
+            return None
+        ids = sorted(candidates)
+        similarity = (np.stack([candidates[c] for c in ids]) == signature).mean(axis=1)
+        best = int(np.argmax(similarity))
+        return ids[best] if similarity[best] >= self.threshold else None
+
+    @contextmanager
+    def staged(self, chunks):
+        """Yields the chunks that need embedding; the rest become references.
+
+        The signatures and references of the batch are recorded only when the
+        block completes, i.e. once the yielded chunks are in the store. If it
+        raises, the index is left as it was.
+        """
+        plan = self._plan(chunks)
+        try:
+            yield plan.unique
+        except BaseException:
+            logger.warning("⚠ Чанки не записаны в хранилище, индекс дубликатов не изменён")
+            raise
+        self._commit(plan)
+
+    def _plan(self, chunks):
+        if not chunks:
+            return _Plan(chunks, _SignatureIndex(self.BANDS))
+
+        with self._lock, span("dedup.filter", chunks=len(chunks)) as s:
+            # Canonical chunks of this batch, visible to its later chunks but not to other batches yet
+            plan = _Plan(chunks, _SignatureIndex(self.BANDS))
+            ids = chunks.ids()
+            metadatas = None
+            keep = []
+            for position, (chunk_id, text) in enumerate(zip(ids, chunks.texts)):
+                signature = minhash(text)
+                # A chunk others already point to stays canonical
+                canonical = None if chunk_id in self._referrers else self.match(signature, _source(chunk_id), plan.canonical)
+                if canonical is None:
+                    plan.canonical.add(chunk_id, signature)
+                    keep.append(position)
+                    continue
+                if metadatas is None:
+                    metadatas = chunks.metadatas()
+                plan.references[chunk_id] = {"canonical": canonical, "metadata": metadatas[position], "chars": len(text)}
+                plan.skipped_chars += len(text)
+            s.set(kept=len(keep), skipped=len(chunks) - len(keep))
+
+        if plan.references:
+            plan.unique = self._select(chunks, keep)
+        return plan
+
+    def _commit(self, plan):
+        with self._lock:
+            for chunk_id, signature in plan.canonical.signatures.items():
+                self._drop_reference(chunk_id)
+                self._add_canonical(chunk_id, signature)
+            for chunk_id, reference in plan.references.items():
+                self._drop_canonical(chunk_id)
+                self._drop_reference(chunk_id)
+                if reference["canonical"] not in self.signatures:
+                    # Released by another update while this batch was being embedded
+                    logger.warning("⚠ Дубликат %s потерял исходный чанк, нужна переиндексация", chunk_id)
+                    continue
+                self._add_reference(chunk_id, reference)
+
+        skipped = len(plan.references)
+        if skipped:
+            count_items("dedup_skipped", skipped)
+            logger.info(
+                "✓ Почти-дубликатов: %s из %s чанков (%s символов не эмбеддятся)",
+                skipped, skipped + len(plan.unique), plan.skipped_chars
+            )
+
+    @staticmethod
+    def _select(chunks, positions):
+        unique = ChunkBatch()
+        for position in positions:
+            unique.append(
+                chunks.texts[position], chunks.source(position), chunks.chunk_ids[position],
+                chunks.starts[position], chunks.ends[position],
+                chunks.byte_starts[position], chunks.byte_ends[position], chunks.heading(position),
+            )
+        return unique
+
+    def release(self, filepath):
+        """Forgets the chunks of a file before it is removed from the store.
+
+        Its references are dropped. A canonical chunk still referenced from
+        other files is promoted: its vector and text are stored again under
+        the first referencing chunk's id and metadata, which are near-identical
+        by construction, and the other references move to it.
+        """
+        prefix = f"{filepath}#"
+        with self._lock:
+            for chunk_id in [c for c in self.references if c.startswith(prefix)]:
+                self._drop_reference(chunk_id)
+
+            orphaned = [c for c in self.signatures if c.startswith(prefix) and c in self._referrers]
+            for chunk_id in [c for c in self.signatures if c.startswith(prefix) and c not in self._referrers]:
+                self._drop_canonical(chunk_id)
+            if not orphaned:
+                return
+
+            from langchain_core.documents import Document
+
+            stored = self.vectorstorage.get_chunks(ids=orphaned, include_embeddings=True)
+            promoted, embeddings = [], []
+            for chunk_id, document, embedding in zip(stored['ids'], stored['documents'], stored['embeddings']):
+                referrers = sorted(self._referrers.get(chunk_id, ()))
+                heir = referrers[0]
+                reference = self._drop_reference(heir)
+                for other in referrers[1:]:
+                    moved = self._drop_reference(other)
+                    moved["canonical"] = heir
+                    self._add_reference(other, moved)
+                self._add_canonical(heir, self.signatures[chunk_id])
+                promoted.append(Document(page_content=document, metadata=reference["metadata"]))
+                embeddings.append(embedding)
+
+            for chunk_id in orphaned:
+                # Not in the store any more: its references have nothing to point to
+                for lost in list(self._referrers.get(chunk_id, ())):
+                    self._drop_reference(lost)
+                    logger.warning("⚠ Дубликат %s потерял исходный чанк, нужна переиндексация", lost)
+                self._drop_canonical(chunk_id)
+
+        if promoted:
+            self.vectorstorage.add_documents(ChunkBatch.from_documents(promoted), as_float32(embeddings))
+            logger.info("✓ %s чанков из %s остались в индексе под id дубликатов", len(promoted), filepath)
+
+    def annotate(self, results):
+        """Adds "also_in" (sources of the references) to the metadata of search hits."""
+        for ids, metadatas in zip(results.get('ids') or [], results.get('metadatas') or []):
+            for chunk_id, metadata in zip(ids, metadatas or []):
+                referrers = self._referrers.get(chunk_id)
+                if referrers and metadata is not None:
+                    sources = {self.references[r]["metadata"].get("source", "") for r in referrers}
+                    metadata["also_in"] = ", ".join(sorted(sources))
+        return results
+
+    def report(self, dim=None):
+        saved_chars = sum(reference.get("chars", 0) for reference in self.references.values())
+        stored = len(self.signatures)
+        report = {
+            "stored_chunks": stored,
+            "duplicate_chunks": len(self.references),
+            "saved_share": round(len(self.references) / max(1, stored + len(self.references)), 4),
+            "saved_chars": saved_chars,
+        }
+        if dim:
+            report["saved_vector_bytes"] = len(self.references) * dim * 4
+        return report
@@ -1,129 +1,173 @@
-from langchain_community.document_loaders import DirectoryLoader, UnstructuredMarkdownLoader, TextLoader
-from langchain_text_splitters import RecursiveCharacterTextSplitter
+import logging
+import os
 from pathlib import Path
 from RAG.logging_config import logger
+from RAG.components.chunks import ChunkBatch
+from RAG.components.markdown_chunker import MarkdownChunker
+from MONITORING.metrics import timed, count_items
+from MONITORING.tracing import span
+
+
+CHUNKERS = ("recursive", "markdown")
 
 
 class DocumentsProcessor:
-    def __init__(self, chunk_size=1000, chunk_overlap=200):
-        logger.debug(f"Инициализация DocumentsProcessor с chunk_size={chunk_size}, chunk_overlap={chunk_overlap}")
-        
-        self.text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=chunk_size,
-            chunk_overlap=chunk_overlap,
-            length_function=len,
-            separators=["\n\n", "\n", " ", ""]
-        )
-        
-        self.LOADERS = {
-            '.md': (UnstructuredMarkdownLoader, {'mode': 'single'}),
-            '.txt': (TextLoader, {'encoding': 'utf-8'})
-        }
+    def __init__(self, chunk_size=1000, chunk_overlap=200, chunker=None):
+        # "recursive": RecursiveCharacterTextSplitter over the Unstructured text;
+        # "markdown": MarkdownChunker over the raw file, by sections
+        chunker = chunker or os.getenv("NOTES_CHUNKER", "recursive")
+        logger.debug("Инициализация DocumentsProcessor с chunk_size=%s, chunk_overlap=%s, chunker=%s", chunk_size, chunk_overlap, chunker)
+        if chunker not in CHUNKERS:
+            raise ValueError(f"Unknown chunker: {chunker}, expected one of {CHUNKERS}")
+
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.chunker = chunker
+        self.markdown_chunker = MarkdownChunker(chunk_size=chunk_size)
+        self._text_splitter = None
+        self._loaders = None
         
         logger.info("DocumentsProcessor успешно инициализирован")
+
+    # Splitter and loaders pull in langchain_text_splitters / unstructured,
+    # so they are only imported when the first document is processed
+    @property
+    def text_splitter(self):
+        if self._text_splitter is None:
+            from langchain_text_splitters import RecursiveCharacterTextSplitter
+            self._text_splitter = RecursiveCharacterTextSplitter(
+                chunk_size=self.chunk_size,
+                chunk_overlap=self.chunk_overlap,
+                length_function=len,
+                separators=["\n\n", "\n", " ", ""]
+            )
+        return self._text_splitter
+
+    @property
+    def LOADERS(self):
+        if self._loaders is None:
+            from langchain_community.document_loaders import UnstructuredMarkdownLoader, TextLoader
+            self._loaders = {
+                '.md': (UnstructuredMarkdownLoader, {'mode': 'single'}),
+                '.txt': (TextLoader, {'encoding': 'utf-8'})
+            }
+            # MarkdownChunker needs the markup, so .md is read as plain text
+            if self.chunker == "markdown":
+                self._loaders['.md'] = (TextLoader, {'encoding': 'utf-8'})
+        return self._loaders
     
     def get_loader(self, filepath):
         ext = Path(filepath).suffix.lower()
-        logger.debug(f"Определение загрузчика для расширения: {ext}")
+        logger.debug("Определение загрузчика для расширения: %s", ext)
         
         if ext not in self.LOADERS:
-            logger.error(f"Данный формат файла не поддерживается: {filepath}")
+            logger.error("Данный формат файла не поддерживается: %s", filepath)
             raise ValueError(f"Unsupported file format: {ext}")
         
         loader_class, kwargs = self.LOADERS[ext]
-        logger.debug(f"Загрузчик найден: {loader_class.__name__}")
+        logger.debug("Загрузчик найден: %s", loader_class.__name__)
         
         return loader_class(filepath, **kwargs)
     
     def load_documents(self, notes_path):
-        logger.info(f"Начало загрузки документов из директории: {notes_path}")
+        logger.info("Начало загрузки документов из директории: %s", notes_path)
         
         try:
+            from langchain_community.document_loaders import DirectoryLoader
+
+            loader_cls, loader_kwargs = self.LOADERS['.md']
             loader = DirectoryLoader(
                 notes_path,
                 glob="**/*.md",
-                loader_cls=UnstructuredMarkdownLoader,
+                loader_cls=loader_cls,
+                loader_kwargs=loader_kwargs,
                 show_progress=True
             )
             
-            documents = loader.load()
-            logger.info(f"✓ Успешно загружено {len(documents)} документов из {notes_path}")
-            logger.debug(f"Загруженные документы: {[doc.metadata.get('source', 'unknown') for doc in documents]}")
+            with timed("load_directory"):
+                documents = loader.load()
+            logger.info("✓ Успешно загружено %s документов из %s", len(documents), notes_path)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Загруженные документы: %s", [doc.metadata.get('source', 'unknown') for doc in documents])
             
             return documents
         
         except FileNotFoundError:
-            logger.error(f"Директория не найдена: {notes_path}")
+            logger.error("Директория не найдена: %s", notes_path)
             raise
         except Exception as e:
-            logger.error(f"Ошибка при загрузке документов из {notes_path}: {str(e)}")
+            logger.error("Ошибка при загрузке документов из %s: %s", notes_path, e)
             raise
     
     def load_document(self, filepath):
-        logger.info(f"Начало загрузки документа: {filepath}")
+        logger.info("Начало загрузки документа: %s", filepath)
         
         try:
             loader = self.get_loader(filepath)
-            documents = loader.load()
+            with timed("load_document"):
+                documents = loader.load()
             
-            logger.info(f"✓ Документ успешно загружен: {filepath}")
-            logger.debug(f"Количество документов: {len(documents)}")
+            logger.info("✓ Документ успешно загружен: %s", filepath)
+            logger.debug("Количество документов: %s", len(documents))
             
             return documents
         
         except FileNotFoundError:
-            logger.error(f"Файл не найден: {filepath}")
+            logger.error("Файл не найден: %s", filepath)
             raise
         except Exception as e:
-            logger.error(f"Ошибка при загрузке документа {filepath}: {str(e)}")
+            logger.error("Ошибка при загрузке документа %s: %s", filepath, e)
             raise
     
-    def processing_chunks_metadata(self, chunks):
-        logger.debug(f"Начало обогащения метаданных для {len(chunks)} чанков")
-        
-        for idx, chunk in enumerate(chunks):
-            chunk.metadata["chunk_id"] = idx
-            chunk.metadata["file_path"] = chunk.metadata.get("source", "")
-            chunk.metadata["paragraph_number"] = idx
-        
-        logger.debug(f"✓ Метаданные добавлены ко всем {len(chunks)} чанкам")
-        
-        return chunks
+    def split(self, documents):
+        """Splits loaded documents into a ChunkBatch with per-file chunk ids and character offsets."""
+        batch = ChunkBatch()
+        for document in documents:
+            text = document.page_content
+            source = document.metadata.get("source", "")
+            if self.chunker == "markdown":
+                self.markdown_chunker.split(text, source, batch)
+            else:
+                batch.add_text(source, text, self.text_splitter.split_text(text), self.chunk_overlap)
+        return batch
     
     def documents_processor(self, notes_path):
-        logger.info(f"Начало обработки документов из директории: {notes_path}")
+        logger.info("Начало обработки документов из директории: %s", notes_path)
         
         try:
             documents = self.load_documents(notes_path)
-            logger.debug(f"Количество загруженных документов: {len(documents)}")
-            
-            chunks = self.text_splitter.split_documents(documents)
-            logger.info(f"✓ Документы разбиты на {len(chunks)} чанков")
+            logger.debug("Количество загруженных документов: %s", len(documents))
             
-            processed_chunks = self.processing_chunks_metadata(chunks)
-            logger.info(f"✓ Обработка директории {notes_path} завершена успешно")
+            with timed("split"):
+                chunks = self.split(documents)
+            count_items("split", len(chunks))
+            logger.info("✓ Документы разбиты на %s чанков", len(chunks))
+            logger.info("✓ Обработка директории %s завершена успешно", notes_path)
             
-            return processed_chunks
+            return chunks
         
         except Exception as e:
-            logger.error(f"Ошибка при обработке директории {notes_path}: {str(e)}")
+            logger.error("Ошибка при обработке директории %s: %s", notes_path, e)
             raise
     
     def document_processor(self, filepath):
-        logger.info(f"Начало обработки документа: {filepath}")
+        logger.info("Начало обработки документа: %s", filepath)
         
         try:
-            documents = self.load_document(filepath)
-            logger.debug(f"Количество загруженных документов: {len(documents)}")
-            
-            chunks = self.text_splitter.split_documents(documents)
-            logger.info(f"✓ Документ разбит на {len(chunks)} чанков")
+            with span("document.load", path=str(filepath)) as s:
+                documents = self.load_document(filepath)
+                s.set(chars=sum(len(d.page_content) for d in documents))
+            logger.debug("Количество загруженных документов: %s", len(documents))
             
-            processed_chunks = self.processing_chunks_metadata(chunks)
-            logger.info(f"✓ Обработка документа {filepath} завершена успешно")
+            with timed("split"), span("document.split") as s:
+                chunks = self.split(documents)
+                s.set(chunks=len(chunks))
+            count_items("split", len(chunks))
+            logger.info("✓ Документ разбит на %s чанков", len(chunks))
+            logger.info("✓ Обработка документа %s завершена успешно", filepath)
             
-            return processed_chunks
+            return chunks
         
         except Exception as e:
-            logger.error(f"Ошибка при обработке документа {filepath}: {str(e)}")
+            logger.error("Ошибка при обработке документа %s: %s", filepath, e)
             raise
@@ -1,16 +1,51 @@
-from langchain_community.embeddings import OllamaEmbeddings
+import threading
+
+import numpy as np
+
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from MONITORING.metrics import timed, count_items
+from MONITORING.tracing import span
+
+
+def as_float32(vectors):
+    """Packs client output into one contiguous float32 array; no copy if it already is one."""
+    return np.asarray(vectors, dtype=np.float32)
 
 
 class EmbeddingModel():
-    def __init__(self, model="evilfreelancer/enbeddrus"):
+    def __init__(self, model="evilfreelancer/enbeddrus", base_url=None):
         self.model = model
-        self.embedding_model = OllamaEmbeddings(
-            model=self.model,
-            show_progress=True
-        )
+        self.base_url = base_url or os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
+        self._embedding_model = None
+        self._init_lock = threading.Lock()
+
+    @property
+    def embedding_model(self):
+        # The langchain Ollama client is created on first use to keep imports cheap
+        if self._embedding_model is None:
+            with self._init_lock:
+                if self._embedding_model is None:
+                    from langchain_community.embeddings import OllamaEmbeddings
+                    self._embedding_model = OllamaEmbeddings(
+                        model=self.model,
+                        base_url=self.base_url,
+                        show_progress=True
+                    )
+        return self._embedding_model
 
-    def embed_documents(self, documents):   
-        return self.embedding_model.embed_documents(documents)
+    def embed_documents(self, documents):
+        count_items("embed_documents", len(documents))
+        with timed("embed_documents"), span("embed.documents", texts=len(documents), chars=sum(len(d) for d in documents)):
+            # The Ollama client hands back lists of boxed floats; from here on
+            # vectors stay 4 bytes per value and Chroma takes the rows as views
+            return as_float32(self.embedding_model.embed_documents(documents))
     
+    def embed_queries(self, queries):
+        with timed("embed_queries"), span("embed.queries", queries=len(queries)):
+            return as_float32([self.embedding_model.embed_query(query) for query in queries])
+
     def embed_query(self, query):
-        return self.embedding_model.embed_query(query)
\ No newline at end of file
+        with timed("embed_query"), span("embed.query", chars=len(query)):
+            return as_float32(self.embedding_model.embed_query(query))
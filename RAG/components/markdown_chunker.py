@@ -0,0 +1,152 @@
+import re
+
+from RAG.components.chunks import ChunkBatch
+
+
+_HEADING_RE = re.compile(r"(#{1,6})[ \t]+(.*?)[ \t]*#*[ \t]*$")
+_FENCE_RE = re.compile(r"[ \t]{0,3}(```|~~~)")
+
+
+class MarkdownChunker:
+    """Splits raw Markdown by sections first, then packs paragraphs up to chunk_size.
+
+    One linear pass over the lines: ATX headings (outside code fences) close the
+    current section and update the heading path, blank lines close a paragraph,
+    and paragraphs are packed greedily into chunks that never cross a heading.
+    A paragraph longer than chunk_size is cut at line, then word boundaries.
+
+    Each chunk records the heading path ("Title > Section") and the character
+    and UTF-8 byte span of its body in the file. Heading lines are not part of
+    any body: the stored text is the body prefixed with the heading path, so
+    that every chunk carries the context it was written under into the
+    embedding and the prompt without repeating its own heading.
+    """
+
+    def __init__(self, chunk_size=1000, separator=" > "):
+        self.chunk_size = chunk_size
+        self.separator = separator
+
+    def split(self, text, source, batch=None):
+        batch = batch if batch is not None else ChunkBatch()
+        state = _SplitState(self, text, source, batch)
+
+        in_fence = None
+        char_pos = byte_pos = 0
+        for line in text.splitlines(keepends=True):
+            line_bytes = len(line.encode("utf-8"))
+            fence = _FENCE_RE.match(line)
+            if fence and (in_fence is None or fence.group(1) == in_fence):
+                in_fence = None if in_fence else fence.group(1)
+                state.add_line(char_pos, byte_pos, line, line_bytes)
+            elif in_fence is None and (heading := _HEADING_RE.match(line)):
+                state.start_section(len(heading.group(1)), heading.group(2))
+            elif in_fence is None and not line.strip():
+                state.end_paragraph()
+            else:
+                state.add_line(char_pos, byte_pos, line, line_bytes)
+            char_pos += len(line)
+            byte_pos += line_bytes
+
+        state.end_section()
+        return batch
+
+
+class _SplitState:
+    """Mutable state of one MarkdownChunker.split pass."""
+
+    def __init__(self, chunker, text, source, batch):
+        self.chunk_size = chunker.chunk_size
+        self.separator = chunker.separator
+        self.text = text
+        self.source = source
+        self.batch = batch
+        self.chunk_id = 0
+        self.headings = []
+        # Current chunk: [start, end) in characters and bytes
+        self.chunk = None
+        # Current paragraph, same shape; appended to the chunk when it ends
+        self.paragraph = None
+
+    def heading_path(self):
+        return self.separator.join(h for h in self.headings if h)
+
+    def start_section(self, level, title):
+        self.end_section()
+        del self.headings[level - 1:]
+        self.headings.extend([""] * (level - 1 - len(self.headings)))
+        self.headings.append(title)
+
+    def add_line(self, char_pos, byte_pos, line, line_bytes):
+        if self.paragraph is not None and self.paragraph[1] - self.paragraph[0] + len(line) > self.chunk_size:
+            self.end_paragraph()
+        if self.paragraph is None:
+            self.paragraph = [char_pos, char_pos + len(line), byte_pos, byte_pos + line_bytes]
+        else:
+            self.paragraph[1] += len(line)
+            self.paragraph[3] += line_bytes
+
+    def end_paragraph(self):
+        paragraph, self.paragraph = self.paragraph, None
+        if paragraph is None:
+            return
+        if paragraph[1] - paragraph[0] <= self.chunk_size:
+            if self.chunk is not None and paragraph[1] - self.chunk[0] > self.chunk_size:
+                self.emit()
+            self._extend(paragraph)
+            return
+
+        # An oversized paragraph first fills the pending chunk; its last piece stays
+        # open so that the following short paragraphs can join it
+        room = self.chunk_size - (paragraph[0] - self.chunk[0]) if self.chunk is not None else self.chunk_size
+        if room < self.chunk_size // 4:
+            self.emit()
+            room = self.chunk_size
+        for piece in self._cut(paragraph, room):
+            self._extend(piece)
+            if piece[1] < paragraph[1]:
+                self.emit()
+
+    def _extend(self, span):
+        if self.chunk is None:
+            self.chunk = list(span)
+        else:
+            self.chunk[1], self.chunk[3] = span[1], span[3]
+
+    def end_section(self):
+        self.end_paragraph()
+        self.emit()
+
+    def emit(self):
+        chunk, self.chunk = self.chunk, None
+        if chunk is None:
+            return
+        start, end, byte_start, byte_end = chunk
+        raw = self.text[start:end]
+        body = raw.strip()
+        if not body:
+            return
+        # Offsets describe the stripped body
+        lead = raw[:len(raw) - len(raw.lstrip())]
+        trail = raw[len(raw.rstrip()):]
+        start, end = start + len(lead), end - len(trail)
+        byte_start, byte_end = byte_start + len(lead.encode("utf-8")), byte_end - len(trail.encode("utf-8"))
+
+        heading = self.heading_path()
+        text = f"{heading}\n\n{body}" if heading else body
+        self.batch.append(text, self.source, self.chunk_id, start, end, byte_start, byte_end, heading)
+        self.chunk_id += 1
+
+    def _cut(self, span, first_limit):
+        """Cuts an oversized paragraph at the last whitespace before each size boundary."""
+        start, end, byte_start, _ = span
+        limit = first_limit
+        while start < end:
+            stop = min(end, start + limit)
+            if stop < end:
+                space = max(self.text.rfind("\n", start, stop), self.text.rfind(" ", start, stop))
+                if space > start:
+                    stop = space + 1
+            byte_stop = byte_start + len(self.text[start:stop].encode("utf-8"))
+            yield [start, stop, byte_start, byte_stop]
+            start, byte_start = stop, byte_stop
+            limit = self.chunk_size
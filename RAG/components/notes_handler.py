@@ -3,7 +3,6 @@ import hashlib
 from pathlib import Path
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
-import logging 
 
 import os
 import sys
@@ -19,7 +18,7 @@ class NotesHandler(FileSystemEventHandler):
      
     def on_any_event(self, event):
         if not event.is_directory:
-            logging.info(f"Событие: {event.event_type}, Файл: {event.src_path}")
+            logger.debug("Событие: %s, Файл: %s", event.event_type, event.src_path)
 
     def on_modified(self, event):
         if event.is_directory or not event.src_path.endswith(('.md', '.txt')):
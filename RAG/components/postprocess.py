@@ -0,0 +1,145 @@
+import re
+from dataclasses import dataclass
+from typing import List, Optional
+
+import numpy as np
+
+
+_SENTENCE_RE = re.compile(r"[^.!?…\n]+(?:[.!?…]+|\n+|$)")
+_WORD_RE = re.compile(r"\w{3,}")
+
+
+def relevance_mask(distances, max_distance=None, margin=None):
+    """Keeps hits closer than max_distance and within margin of the best hit.
+
+    Absolute distances depend on the embedding model, the margin does not:
+    with cosine distance a hit 0.2 behind the best one is rarely about the
+    same thing.
+    """
+    distances = np.asarray(distances, dtype=np.float32)
+    keep = np.ones(len(distances), dtype=bool)
+    if not len(distances):
+        return keep
+    if max_distance is not None:
+        keep &= distances <= max_distance
+    if margin is not None:
+        keep &= distances <= distances.min() + margin
+    return keep
+
+
+def mmr(query_embedding, embeddings, k, diversity=0.3, duplicate_similarity=0.95) -> List[int]:
+    """Maximal marginal relevance over candidate embeddings; returns positions in pick order.
+
+    Each step picks the candidate maximising
+    (1 - diversity) * sim(query) - diversity * max sim(already picked);
+    candidates closer than duplicate_similarity to a picked one are dropped.
+    """
+    vectors = np.asarray(embeddings, dtype=np.float32)
+    if not len(vectors):
+        return []
+    vectors = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+    query = np.asarray(query_embedding, dtype=np.float32)
+    query = query / max(float(np.linalg.norm(query)), 1e-12)
+
+    relevance = vectors @ query
+    similarity = vectors @ vectors.T
+    # Highest similarity of every candidate to anything picked so far
+    redundancy = np.full(len(vectors), -np.inf, dtype=np.float32)
+    available = np.ones(len(vectors), dtype=bool)
+
+    picked = []
+    while len(picked) < k and available.any():
+        penalty = np.where(np.isfinite(redundancy), redundancy, 0.0)
+        scores = np.where(available, (1 - diversity) * relevance - diversity * penalty, -np.inf)
+        best = int(np.argmax(scores))
+        picked.append(best)
+        available[best] = False
+        redundancy = np.maximum(redundancy, similarity[best])
+        available &= similarity[best] < duplicate_similarity
+    return picked
+
+
+def split_sentences(text) -> List[str]:
+    return [s for s in _SENTENCE_RE.findall(text) if s.strip()]
+
+
+def _stems(text):
+    # Five leading letters roughly conflate Russian and English word forms
+    return {word[:5] for word in _WORD_RE.findall(text.lower())}
+
+
+def trim_sentences(text, query, max_sentences=4, context=0) -> str:
+    """Keeps the max_sentences sentences sharing most words with the query, in text order.
+
+    `context` adds that many neighbours on each side of a kept sentence. A
+    passage with no overlap at all is cut to its first max_sentences sentences.
+    """
+    sentences = split_sentences(text)
+    if len(sentences) <= max_sentences:
+        return text
+
+    terms = _stems(query)
+    scores = np.array([len(terms & _stems(sentence)) for sentence in sentences])
+    if not scores.any():
+        return " ".join(sentence.strip() for sentence in sentences[:max_sentences])
+
+    # Best sentences first (stable, so earlier ones win ties), then widened by their neighbours
+    keep = np.zeros(len(sentences), dtype=bool)
+    for position in np.argsort(-scores, kind="stable")[:max_sentences]:
+        if scores[position]:
+            keep[max(0, position - context):position + context + 1] = True
+
+    parts = []
+    for position in np.flatnonzero(keep):
+        if parts and not keep[position - 1]:
+            parts.append("…")
+        parts.append(sentences[position].strip())
+    return " ".join(parts)
+
+
+@dataclass
+class PostProcessor:
+    """Score cut-off, MMR de-duplication and sentence trimming for one search result.
+
+    Works on a search() result fetched with embeddings, usually for more
+    candidates than k, and returns a result of the same shape with at most k
+    documents and no embeddings.
+    """
+    k: int = 5
+    max_distance: Optional[float] = None
+    # Off by default: a relative cut-off can drop context the answer needs
+    margin: Optional[float] = None
+    diversity: float = 0.3
+    duplicate_similarity: float = 0.95
+    max_sentences: Optional[int] = 4
+
+    def apply(self, results, query, query_embedding):
+        documents = (results.get('documents') or [[]])[0]
+        if not documents:
+            return {"ids": [[]], "documents": [[]], "metadatas": [[]], "distances": [[]]}
+        ids = (results.get('ids') or [[]])[0]
+        metadatas = (results.get('metadatas') or [[]])[0] or [{}] * len(documents)
+        distances = np.asarray((results.get('distances') or [[]])[0] or [0.0] * len(documents), dtype=np.float32)
+        embeddings = results.get('embeddings')
+        embeddings = embeddings[0] if embeddings is not None else None
+
+        candidates = np.flatnonzero(relevance_mask(distances, self.max_distance, self.margin))
+        if embeddings is not None and len(candidates):
+            picked = mmr(
+                query_embedding, np.asarray(embeddings)[candidates], self.k,
+                diversity=self.diversity, duplicate_similarity=self.duplicate_similarity
+            )
+            order = candidates[picked]
+        else:
+            order = candidates[:self.k]
+
+        texts = [documents[i] for i in order]
+        if self.max_sentences:
+            texts = [trim_sentences(text, query, self.max_sentences) for text in texts]
+
+        return {
+            "ids": [[ids[i] for i in order]],
+            "documents": [texts],
+            "metadatas": [[metadatas[i] for i in order]],
+            "distances": [[float(distances[i]) for i in order]],
+        }
@@ -1,20 +1,36 @@
 import os
 import sys
+from contextlib import nullcontext
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from RAG.components.documents_processor import DocumentsProcessor
 from RAG.components.vectorstorage import ChromaVectorStorage
 from RAG.components.embedding_model import EmbeddingModel
 from RAG.logging_config import logger
+from MONITORING.metrics import registry, timed
+from MONITORING.tracing import span
+from MONITORING.profiling import profiled
 
 
 class IncrementalHandler():
-    def __init__(self, vectorstorage: ChromaVectorStorage, embedding_model: EmbeddingModel, processor: DocumentsProcessor):
+    def __init__(self, vectorstorage: ChromaVectorStorage, embedding_model: EmbeddingModel, processor: DocumentsProcessor,
+                 deduplicator=None):
         self.vectorstorage = vectorstorage
         self.embedding_model = embedding_model
         self.processor = processor
+        # Optional ChunkDeduplicator: near-duplicate chunks are referenced instead of embedded
+        self.deduplicator = deduplicator
 
     def update_handler(self, filepath, event_type):
-        if event_type == "delete":
+        registry.counter("notes_watcher_events_total", "File events handled by the watcher").labels(event=event_type).inc()
+        with timed("watcher_update", event=event_type), span("watcher.update", event=event_type, path=filepath), \
+                profiled("watcher.update"):
+            self._apply_update(filepath, event_type)
+
+    def _apply_update(self, filepath, event_type):
+        if event_type in ["deleted", "created", "modified"] and self.deduplicator is not None:
+            self.deduplicator.release(filepath)
+
+        if event_type == "deleted":
             self.vectorstorage.delete_by_source(filepath)
 
         elif event_type in ["created", "modified"]:
@@ -22,10 +38,16 @@ class IncrementalHandler():
             chunks = self.processor.document_processor(filepath)
 
             if not chunks:
-                logger.warning(f"Файл не обработан: {filepath}")
+                logger.warning("Файл не обработан: %s", filepath)
                 return
 
-            texts = [chunk.page_content for chunk in chunks]
-            embeddings = self.embedding_model.embed_documents(texts)
+            # Duplicates are recorded only once the unique chunks are stored
+            staged = self.deduplicator.staged(chunks) if self.deduplicator is not None else nullcontext(chunks)
+            with staged as chunks:
+                if chunks:
+                    embeddings = self.embedding_model.embed_documents(chunks.texts)
+
+                    self.vectorstorage.add_documents(chunks, embeddings)
 
-            self.vectorstorage.add_documents(chunks, embeddings)
+        if self.deduplicator is not None:
+            self.deduplicator.save()
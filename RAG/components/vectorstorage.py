@@ -1,87 +1,228 @@
-import chromadb
-from chromadb.config import Settings
+from dataclasses import dataclass
 from pathlib import Path
+import logging
+import threading
 
 import sys
 import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from RAG.logging_config import logger
+from RAG.components.chunks import ChunkBatch
+from MONITORING.metrics import timed, count_items
+from MONITORING.tracing import span
+
+
+@dataclass(frozen=True)
+class HnswParams:
+    """HNSW index settings; None leaves the Chroma default in place.
+
+    m and construction_ef are fixed when the collection is created, search_ef
+    can be changed on an existing collection. benchmarks/retrieval_eval.py
+    measures recall and latency for a grid of these values.
+    """
+    space: str = "cosine"
+    m: int | None = None
+    construction_ef: int | None = None
+    search_ef: int | None = None
+
+    @classmethod
+    def from_env(cls):
+        def read(name):
+            value = os.getenv(name)
+            return int(value) if value else None
+
+        return cls(
+            m=read("NOTES_HNSW_M"),
+            construction_ef=read("NOTES_HNSW_CONSTRUCTION_EF"),
+            search_ef=read("NOTES_HNSW_SEARCH_EF"),
+        )
+
+    def metadata(self):
+        metadata = {"hnsw:space": self.space}
+        for key, value in (("hnsw:M", self.m), ("hnsw:construction_ef", self.construction_ef), ("hnsw:search_ef", self.search_ef)):
+            if value is not None:
+                metadata[key] = value
+        return metadata
 
 
 class ChromaVectorStorage:
-    def __init__(self, persist_directory="./vectorstorage"):
+    def __init__(self, persist_directory="./vectorstorage", hnsw=None):
         self.persist_directory = Path(persist_directory)
-        
+        self.hnsw = hnsw or HnswParams.from_env()
+        self._client = None
+        self._collection = None
+        self._connect_lock = threading.Lock()
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._connect()
+        return self._client
+
+    @property
+    def collection(self):
+        if self._collection is None:
+            self._connect()
+        return self._collection
+
+    def _connect(self):
+        # chromadb is slow to import and open, so both happen on first use
+        with self._connect_lock:
+            if self._collection is not None:
+                return
+            self._open_collection()
+
+    def _open_collection(self):
+        import chromadb
+
         self.persist_directory.mkdir(parents=True, exist_ok=True)
-        logger.info(f"Инициализация Chroma в директории: {self.persist_directory}")
+        logger.info("Инициализация Chroma в директории: %s", self.persist_directory)
         
         try:
-            self.client = chromadb.PersistentClient(path=str(self.persist_directory))
+            self._client = chromadb.PersistentClient(path=str(self.persist_directory))
             logger.info("✓ Chroma client успешно инициализирован")
         except Exception as e:
-            logger.error(f"✗ Ошибка при инициализации Chroma: {e}")
+            logger.error("✗ Ошибка при инициализации Chroma: %s", e)
             raise
         
         try:
-            self.collection = self.client.get_or_create_collection(
+            self._collection = self._client.get_or_create_collection(
                 name="documents",
-                metadata={"hnsw:space": "cosine"}
+                metadata=self.hnsw.metadata()
             )
-            logger.info(f"✓ Коллекция получена/создана. Документов в базе: {self.collection.count()}")
+            logger.info("✓ Коллекция получена/создана")
         except Exception as e:
-            logger.error(f"✗ Ошибка при создании коллекции: {e}")
+            logger.error("✗ Ошибка при создании коллекции: %s", e)
             raise
+
+        self._apply_hnsw()
+
+    def _apply_hnsw(self):
+        # An existing collection keeps the parameters it was built with
+        current = (self._collection.configuration_json or {}).get("hnsw") or {}
+        built = {"m": current.get("max_neighbors"), "construction_ef": current.get("ef_construction")}
+        for name, value in built.items():
+            wanted = getattr(self.hnsw, name)
+            if wanted is not None and value is not None and wanted != value:
+                logger.warning("⚠ HNSW %s=%s задан, но коллекция построена с %s; нужна переиндексация", name, wanted, value)
+
+        if self.hnsw.search_ef is not None and current.get("ef_search") != self.hnsw.search_ef:
+            try:
+                self._collection.modify(configuration={"hnsw": {"ef_search": self.hnsw.search_ef}})
+                logger.info("✓ HNSW search_ef изменён на %s", self.hnsw.search_ef)
+            except Exception as e:
+                logger.warning("⚠ Не удалось изменить HNSW search_ef: %s", e)
     
     def add_documents(self, chunks, embeddings):
-        logger.info(f"Начало добавления {len(chunks)} документов")
+        logger.info("Начало добавления %s документов", len(chunks))
+        if not chunks:
+            logger.info("⚠ Нет документов для добавления")
+            return
         
         try:
-            ids = [f"doc_{i}" for i in range(len(chunks))]
-            texts = [chunk.page_content for chunk in chunks]
-            metadatas = [chunk.metadata for chunk in chunks]
+            if not isinstance(chunks, ChunkBatch):
+                chunks = ChunkBatch.from_documents(chunks)
             
-            self.collection.add(
-                ids=ids,
-                embeddings=embeddings,
-                documents=texts,
-                metadatas=metadatas
-            )
+            # Chroma caps the upsert size; per-slice ids and metadata dicts also
+            # keep the Chroma-side copies of a large batch from existing all at once
+            step = self.client.get_max_batch_size()
+            with timed("vector_add"), span("vector.add", chunks=len(chunks)):
+                for offset in range(0, len(chunks), step):
+                    part = chunks[offset:offset + step]
+                    self.collection.upsert(
+                        ids=part.ids(),
+                        embeddings=embeddings[offset:offset + step],
+                        documents=part.texts,
+                        metadatas=part.metadatas()
+                    )
+            count_items("vector_add", len(chunks))
             
-            logger.info(f"✓ Успешно добавлено {len(chunks)} документов")
-            logger.info(f"✓ Всего документов в базе: {self.collection.count()}")
+            logger.info("✓ Успешно добавлено %s документов", len(chunks))
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("✓ Всего документов в базе: %s", self.collection.count())
             
         except Exception as e:
-            logger.error(f"✗ Ошибка при добавлении документов: {e}")
+            logger.error("✗ Ошибка при добавлении документов: %s", e)
             raise
     
-    def search(self, query_embedding, k=5):
-        logger.debug(f"Поиск {k} релевантных документов")
+    @staticmethod
+    def chunk_id(chunk, position):
+        # Ids are scoped by source file: positional ids restarted at doc_0 on every
+        # call, so each incremental update collided with chunks of other files
+        source = chunk.metadata.get("source", "")
+        return f"{source}#{chunk.metadata.get('chunk_id', position)}"
+
+    def search(self, query_embedding, k=5, include_embeddings=False):
+        logger.debug("Поиск %s релевантных документов", k)
+        include = ["documents", "metadatas", "distances"] + (["embeddings"] if include_embeddings else [])
         
         try:
-            results = self.collection.query(
-                query_embeddings=[query_embedding],
-                n_results=k
-            )
-            logger.debug(f"✓ Найдено {len(results['documents'][0])} результатов")
+            with timed("vector_search"), span("vector.search", k=k) as s:
+                results = self.collection.query(
+                    query_embeddings=[query_embedding],
+                    n_results=k,
+                    include=include
+                )
+                s.set(results=len(results['documents'][0]))
+            logger.debug("✓ Найдено %s результатов", len(results['documents'][0]))
             return results
         except Exception as e:
-            logger.error(f"✗ Ошибка при поиске: {e}")
+            logger.error("✗ Ошибка при поиске: %s", e)
             raise
     
+    def search_many(self, query_embeddings, k=5):
+        logger.debug("Пакетный поиск %s релевантных документов для %s запросов", k, len(query_embeddings))
+        
+        try:
+            with timed("vector_search_many"), span("vector.search_many", k=k, queries=len(query_embeddings)):
+                results = self.collection.query(
+                    query_embeddings=list(query_embeddings),
+                    n_results=k
+                )
+        except Exception as e:
+            logger.error("✗ Ошибка при пакетном поиске: %s", e)
+            raise
+        
+        # One Chroma round-trip, split back into per-query results shaped like search()
+        return [
+            {key: [value[i]] if value is not None and key != "included" else value for key, value in results.items()}
+            for i in range(len(query_embeddings))
+        ]
+
+    def get_chunks(self, ids=None, where=None, include_embeddings=False):
+        logger.debug("Получение чанков: ids=%s, where=%s", len(ids) if ids else None, bool(where))
+        include = ["documents", "metadatas"] + (["embeddings"] if include_embeddings else [])
+        
+        try:
+            with timed("vector_get"), span("vector.get", ids=len(ids) if ids else 0) as s:
+                results = self.collection.get(
+                    ids=ids,
+                    where=where,
+                    include=include
+                )
+                s.set(results=len(results['ids']))
+            return results
+        except Exception as e:
+            logger.error("✗ Ошибка при получении чанков: %s", e)
+            raise
+
     def delete_by_source(self, filepath):
-        logger.info(f"Удаление документов из файла: {filepath}")
+        logger.info("Удаление документов из файла: %s", filepath)
         
         try:
-            results = self.collection.get(
-                where={"file_path": filepath}
-            )
-            
-            if results['ids']:
-                self.collection.delete(ids=results['ids'])
-                logger.info(f"✓ Удалено {len(results['ids'])} документов")
-            else:
-                logger.info(f"⚠ Документы из {filepath} не найдены")
+            with timed("vector_delete"), span("vector.delete") as s:
+                results = self.collection.get(
+                    where={"source": filepath},
+                    include=[]
+                )
+                
+                if results['ids']:
+                    self.collection.delete(ids=results['ids'])
+                    s.set(deleted=len(results['ids']))
+                    logger.info("✓ Удалено %s документов", len(results['ids']))
+                else:
+                    logger.info("⚠ Документы из %s не найдены", filepath)
                 
         except Exception as e:
-            logger.error(f"✗ Ошибка при удалении: {e}")
+            logger.error("✗ Ошибка при удалении: %s", e)
             raise
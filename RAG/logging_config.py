@@ -1,20 +1,106 @@
+import atexit
+import copy
 import logging
+import logging.handlers
+import os
+import queue
+import threading
 
 
-# Конфигурация логирования в консоль
-console_handler = logging.StreamHandler()
-console_handler.setLevel(logging.INFO)
-console_formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
-console_handler.setFormatter(console_formatter)
+# Уровни и вывод настраиваются через окружение:
+#   NOTES_LOG_LEVEL       - уровень консоли (по умолчанию INFO)
+#   NOTES_FILE_LOG_LEVEL  - уровень файла (по умолчанию DEBUG)
+#   NOTES_LOG_DIR         - каталог для файлов логов (по умолчанию текущий)
+#   NOTES_LOG_ASYNC       - 0, чтобы писать синхронно, без очереди
+CONSOLE_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+FILE_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 
-# Конфигурация логирования в файл
-file_handler = logging.FileHandler('RAG_debug.log', mode='w', encoding="utf-8")
-file_handler.setLevel(logging.DEBUG)
-file_formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-file_handler.setFormatter(file_formatter)
+_setup_lock = threading.Lock()
+_configured = {}
+_sinks = {}
+_listeners = []
 
-# Получение логгера
-logger = logging.getLogger(__name__)
-logger.setLevel(logging.DEBUG)
-logger.addHandler(console_handler)
-logger.addHandler(file_handler)
+
+def _env_level(var_name, default):
+    value = os.getenv(var_name, default).upper()
+    level = logging.getLevelName(value)
+    return level if isinstance(level, int) else logging.getLevelName(default)
+
+
+def _build_handlers(log_file):
+    console_handler = logging.StreamHandler()
+    console_handler.setLevel(_env_level("NOTES_LOG_LEVEL", "INFO"))
+    console_handler.setFormatter(logging.Formatter(CONSOLE_FORMAT))
+
+    log_path = os.path.join(os.getenv("NOTES_LOG_DIR", "."), log_file)
+    file_handler = logging.FileHandler(log_path, mode='w', encoding="utf-8", delay=True)
+    file_handler.setLevel(_env_level("NOTES_FILE_LOG_LEVEL", "DEBUG"))
+    file_handler.setFormatter(logging.Formatter(FILE_FORMAT))
+
+    return [console_handler, file_handler]
+
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    # The stock prepare() runs the full handler format in the calling thread.
+    # Only the cheap snapshot happens here: the message is interpolated while
+    # its arguments still hold the logged values, and the traceback is
+    # rendered while its frames exist. Timestamps and the layout are left to
+    # the handlers on the listener thread.
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def _sink(log_file):
+    # One set of handlers per file: loggers sharing a file share its listener
+    if log_file not in _sinks:
+        handlers = _build_handlers(log_file)
+        level = min(h.level for h in handlers)
+
+        if os.getenv("NOTES_LOG_ASYNC", "1") != "0":
+            log_queue = queue.SimpleQueue()
+            listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+            listener.start()
+            _listeners.append(listener)
+            handlers = [_DeferredQueueHandler(log_queue)]
+
+        _sinks[log_file] = (level, handlers)
+    return _sinks[log_file]
+
+
+def setup_logger(name, log_file):
+    """Возвращает логгер с обработчиками, подключёнными ровно один раз на имя.
+
+    Записи уходят в очередь, а форматирование и запись в файл выполняет
+    фоновый QueueListener, так что горячие пути не ждут диск.
+    """
+    with _setup_lock:
+        if name in _configured:
+            return _configured[name]
+
+        level, handlers = _sink(log_file)
+        logger = logging.getLogger(name)
+        logger.setLevel(level)
+        logger.propagate = False
+        for handler in handlers:
+            logger.addHandler(handler)
+
+        _configured[name] = logger
+        return logger
+
+
+@atexit.register
+def _stop_listeners():
+    # Flush whatever is still queued before the interpreter exits
+    for listener in _listeners:
+        listener.stop()
+    _listeners.clear()
+
+
+logger = setup_logger(__name__, 'RAG_debug.log')
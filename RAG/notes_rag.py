@@ -1,4 +1,5 @@
 import os
+from contextlib import nullcontext
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -11,49 +12,114 @@ from RAG.components.vectorstorage import ChromaVectorStorage
 from RAG.components.embedding_model import EmbeddingModel
 from RAG.components.notes_handler import start_monitoring
 from RAG.components.updater import IncrementalHandler
+from RAG.components.context_expansion import ContextExpander, passages_to_results
+from RAG.components.postprocess import PostProcessor
+from RAG.components.dedup import ChunkDeduplicator
 from RAG.logging_config import logger
+from MONITORING.metrics import timed
+from MONITORING.tracing import span
+from MONITORING.profiling import profiled
 
 
 class RAGAssistant():
-    def __init__(self, notes_dir, persist_dir="./vectorstorage"):
+    def __init__(self, notes_dir, persist_dir="./vectorstorage", hnsw=None, dedup=None):
         self.notes_dir = notes_dir
 
         self.documents_processor = DocumentsProcessor()
-        self.vectorstorage = ChromaVectorStorage(persist_directory=persist_dir)
+        self.vectorstorage = ChromaVectorStorage(persist_directory=persist_dir, hnsw=hnsw)
         self.embedding_model = EmbeddingModel()
 
+        if dedup is None:
+            dedup = os.getenv("NOTES_DEDUP", "").lower() in ("1", "true", "yes")
+        self.deduplicator = ChunkDeduplicator(
+            self.vectorstorage, Path(persist_dir) / "duplicates.json"
+        ) if dedup else None
+
         self.updater = IncrementalHandler(
             vectorstorage=self.vectorstorage,
             embedding_model=self.embedding_model,
-            processor=self.documents_processor
+            processor=self.documents_processor,
+            deduplicator=self.deduplicator
         )
 
     def initial_indexing(self):
-        logger.info(f"Начало индексации директории...")
+        logger.info("Начало индексации директории...")
 
         try:
-            chunks = self.documents_processor.documents_processor(self.notes_dir)
-            texts = [chunk.page_content for chunk in chunks]
-
-            embeddings = self.embedding_model.embed_documents(texts)
+            with timed("initial_indexing"), span("rag.initial_indexing"), profiled("rag.initial_indexing"):
+                chunks = self.documents_processor.documents_processor(self.notes_dir)
+                staged = self.deduplicator.staged(chunks) if self.deduplicator is not None else nullcontext(chunks)
+                with staged as chunks:
+                    embeddings = self.embedding_model.embed_documents(chunks.texts)
 
-            self.vectorstorage.add_documents(chunks=chunks, embeddings=embeddings)
+                    self.vectorstorage.add_documents(chunks=chunks, embeddings=embeddings)
 
-            logger.info(f"Индексация выполнена успешно...")
+            if self.deduplicator is not None:
+                self.deduplicator.save()
+                logger.info("✓ Дедупликация: %s", self.deduplicator.report(dim=embeddings.shape[-1] if len(chunks) else None))
+            logger.info("Индексация выполнена успешно...")
 
         except Exception as e:
-            logger.error(f"Ошибка при индексации директории {self.notes_dir}: {str(e)}")
+            logger.error("Ошибка при индексации директории %s: %s", self.notes_dir, e)
             raise
     
     def query(self, query, k=5):
-        embedding = self.embedding_model.embed_query(query)
+        with timed("rag_query"), span("rag.query", k=k, query_chars=len(query)) as s:
+            embedding = self.embedding_model.embed_query(query)
 
-        results = self.vectorstorage.search(embedding, k=k)
+            results = self.vectorstorage.search(embedding, k=k)
+            s.set(results=len((results.get('documents') or [[]])[0]))
 
+        if self.deduplicator is not None:
+            self.deduplicator.annotate(results)
         return results
+
+    def query_refined(self, query, k=5, fetch_factor=3, postprocessor=None):
+        """Fetches k * fetch_factor candidates and keeps at most k relevant, distinct, trimmed ones.
+
+        See RAG.components.postprocess.PostProcessor; the result has the shape of query().
+        """
+        postprocessor = postprocessor or PostProcessor(k=k)
+        with timed("rag_query_refined"), span("rag.query_refined", k=k, query_chars=len(query)) as s:
+            embedding = self.embedding_model.embed_query(query)
+            results = self.vectorstorage.search(embedding, k=k * fetch_factor, include_embeddings=True)
+            refined = postprocessor.apply(results, query, embedding)
+            if self.deduplicator is not None:
+                self.deduplicator.annotate(refined)
+            s.set(
+                candidates=len(results['documents'][0]),
+                results=len(refined['documents'][0]),
+                chars_before=sum(len(d) for d in results['documents'][0][:k]),
+                chars_after=sum(len(d) for d in refined['documents'][0]),
+            )
+
+        return refined
+
+    def query_context(self, query, k=5, window=1, section=False, max_tokens=1500):
+        """Search small chunks, then return their neighbourhoods merged into passages.
+
+        The result has the shape of query(); each document is a passage of
+        consecutive chunks of one note, best first, all within max_tokens.
+        """
+        with timed("rag_query_context"), span("rag.query_context", k=k, window=window, section=section) as s:
+            results = self.query(query, k=k)
+            passages = ContextExpander(
+                self.vectorstorage, window=window, section=section, max_tokens=max_tokens
+            ).expand(results)
+            s.set(passages=len(passages))
+
+        return passages_to_results(passages)
+
+    def query_many(self, queries, k=5):
+        with timed("rag_query_many"), span("rag.query_many", k=k, queries=len(queries)):
+            if not queries:
+                return []
+            embeddings = self.embedding_model.embed_queries(list(queries))
+
+            return self.vectorstorage.search_many(embeddings, k=k)
     
     def start_monitoring(self):
-        logger.info(f"Начало мониторинга директории с заметками: {self.notes_dir}")
+        logger.info("Начало мониторинга директории с заметками: %s", self.notes_dir)
         
         try:
             def update_callback(filepath, event): 
@@ -62,11 +128,11 @@ class RAGAssistant():
             start_monitoring(str(self.notes_dir), update_callback)
 
         except KeyboardInterrupt:
-            logger.debug(f"Завершение мониторинга директории: {self.notes_dir}")
+            logger.debug("Завершение мониторинга директории: %s", self.notes_dir)
             raise
 
         except Exception as e:
-            logger.error(f"Ошибка при мониторинге директории: {e}")
+            logger.error("Ошибка при мониторинге директории: %s", e)
             raise
 
 
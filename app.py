@@ -11,9 +11,13 @@ load_dotenv()
 # Добавить пути для импортов
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
+from MONITORING.metrics import registry, cache_hit_rates, start_metrics_server, STAGE_SECONDS, INFLIGHT
+from MONITORING.profiling import start_profile
+
 # Импорт ваших модулей
 try:
     from RAG.notes_rag import RAGAssistant
+    from RAG.components.postprocess import PostProcessor
     from AGENT.react_agent import ReActAgent
     RAG_AVAILABLE = True
 except Exception as e:
@@ -70,6 +74,37 @@ st.markdown("""
 # ИНИЦИАЛИЗАЦИЯ SESSION STATE
 # ============================================================================
 
+# Тяжёлые ресурсы (Chroma, клиенты эмбеддингов и LLM, граф агента) создаются
+# один раз на процесс и разделяются всеми вкладками; в session state хранится
+# только состояние диалога конкретного пользователя.
+
+@st.cache_resource(show_spinner=False)
+def get_shared_rag_assistant(notes_path, vector_store_path):
+    return RAGAssistant(notes_path, vector_store_path)
+
+
+@st.cache_resource(show_spinner=False)
+def get_shared_agent(notes_path, vector_store_path):
+    return ReActAgent(
+        notes_dir=notes_path,
+        persist_dir=vector_store_path,
+        rag_assistant=get_shared_rag_assistant(notes_path, vector_store_path)
+    )
+
+
+@st.cache_resource(show_spinner=False)
+def get_metrics_server(port):
+    # Один HTTP-эндпоинт /metrics на процесс; NOTES_METRICS_PORT=0 отключает его
+    if port <= 0:
+        return None
+    try:
+        return start_metrics_server(port)
+    except OSError:
+        return None
+
+
+get_metrics_server(int(os.getenv("NOTES_METRICS_PORT", "9108")))
+
 if "notes" not in st.session_state:
     st.session_state.notes = {}
 
@@ -77,7 +112,7 @@ if "rag_assistant" not in st.session_state and RAG_AVAILABLE:
     try:
         notes_path = os.getenv("NOTES_PATH", "./notes")
         vector_store_path = os.getenv("VECTOR_STORE_PATH", "./vectorstorage")
-        st.session_state.rag_assistant = RAGAssistant(notes_path, vector_store_path)
+        st.session_state.rag_assistant = get_shared_rag_assistant(notes_path, vector_store_path)
     except Exception as e:
         st.session_state.rag_assistant = None
 
@@ -85,15 +120,17 @@ if "llm_assistant" not in st.session_state:
     try:
         api_key = os.getenv("OPENROUTER_API")
         notes_path = os.getenv("NOTES_PATH", "./notes")
-        if api_key:
-            st.session_state.llm_assistant = ReActAgent(
-                notes_dir=notes_path
-            )
+        vector_store_path = os.getenv("VECTOR_STORE_PATH", "./vectorstorage")
+        if api_key and RAG_AVAILABLE:
+            st.session_state.llm_assistant = get_shared_agent(notes_path, vector_store_path)
         else:
             st.session_state.llm_assistant = None
     except Exception as e:
         st.session_state.llm_assistant = None
 
+if "agent_session" not in st.session_state and st.session_state.llm_assistant:
+    st.session_state.agent_session = st.session_state.llm_assistant.new_session()
+
 # ============================================================================
 # ВСПОМОГАТЕЛЬНЫЕ ФУНКЦИИ
 # ============================================================================
@@ -128,6 +165,13 @@ def save_note(note_id, content):
         st.error(f"Ошибка при сохранении: {e}")
         return False
 
+def ask_assistant(question):
+    """Задать вопрос общему агенту в рамках диалога текущего пользователя"""
+    return st.session_state.llm_assistant.answer(
+        question,
+        session=st.session_state.agent_session
+    )
+
 def delete_note(note_id):
     """Удалить заметку"""
     notes_path = Path(os.getenv("NOTES_PATH", "./notes"))
@@ -151,109 +195,113 @@ st.sidebar.markdown("---")
 # Навигация
 page = st.sidebar.radio(
     "Меню",
-    ["📄 Мои заметки", "➕ Создать заметку", "🔍 Поиск", "🤖 AI Assistant", "ℹ️ О приложении"]
+    ["📄 Мои заметки", "➕ Создать заметку", "🔍 Поиск", "🤖 AI Assistant", "🩺 Диагностика", "ℹ️ О приложении"]
 )
 
 st.sidebar.markdown("---")
 
-# Информация о системе
-st.sidebar.subheader("⚙️ Система")
-col1, col2 = st.sidebar.columns(2)
-with col1:
-    st.metric("RAG", "✅" if RAG_AVAILABLE else "❌")
-with col2:
-    st.metric("LLM", "✅" if st.session_state.llm_assistant else "❌")
+# Профиль одного прогона скрипта для выбранной страницы (NOTES_PROFILE / NOTES_PROFILE_TARGETS)
+page_profile = start_profile("streamlit." + page.split(" ", 1)[1])
 
-# ============================================================================
-# СТРАНИЦА 1: МОИ ЗАМЕТКИ
-# ============================================================================
+try:
+    # Информация о системе
+    st.sidebar.subheader("⚙️ Система")
+    col1, col2 = st.sidebar.columns(2)
+    with col1:
+        st.metric("RAG", "✅" if RAG_AVAILABLE else "❌")
+    with col2:
+        st.metric("LLM", "✅" if st.session_state.llm_assistant else "❌")
 
-if page == "📄 Мои заметки":
-    st.title("📝 Мои заметки")
-    
-    # Загрузить заметки
-    notes = load_notes_from_file()
-    
-    if notes:
-        st.success(f"✅ Загружено {len(notes)} заметок")
-        
-        # Выбрать заметку
-        note_id = st.selectbox(
-            "Выберите заметку для редактирования:",
-            list(notes.keys()),
-            key="note_select"
-        )
-        
-        if note_id:
-            st.subheader(f"📄 {note_id}")
-            
-            # Редактор
-            updated_content = st.text_area(
-                "Содержание заметки:",
-                value=notes[note_id],
-                height=300,
-                key=f"edit_{note_id}"
+    # ============================================================================
+    # СТРАНИЦА 1: МОИ ЗАМЕТКИ
+    # ============================================================================
+
+    if page == "📄 Мои заметки":
+        st.title("📝 Мои заметки")
+
+        # Загрузить заметки
+        notes = load_notes_from_file()
+
+        if notes:
+            st.success(f"✅ Загружено {len(notes)} заметок")
+
+            # Выбрать заметку
+            note_id = st.selectbox(
+                "Выберите заметку для редактирования:",
+                list(notes.keys()),
+                key="note_select"
             )
-            
-            col1, col2, col3 = st.columns(3)
-            
-            with col1:
-                if st.button("💾 Сохранить", key=f"save_{note_id}"):
-                    if save_note(note_id, updated_content):
-                        st.success("✅ Заметка сохранена!")
-                        st.rerun()
-            
-            with col2:
-                if st.button("📋 Копировать", key=f"copy_{note_id}"):
-                    st.code(updated_content)
-            
-            with col3:
-                if st.button("🗑️ Удалить", key=f"delete_{note_id}"):
-                    if delete_note(note_id):
-                        st.success("✅ Заметка удалена!")
-                        st.rerun()
-            
-            # Информация о заметке
-            st.divider()
-            st.markdown(f"""
+
+            if note_id:
+                st.subheader(f"📄 {note_id}")
+
+                # Редактор
+                updated_content = st.text_area(
+                    "Содержание заметки:",
+                    value=notes[note_id],
+                    height=300,
+                    key=f"edit_{note_id}"
+                )
+
+                col1, col2, col3 = st.columns(3)
+
+                with col1:
+                    if st.button("💾 Сохранить", key=f"save_{note_id}"):
+                        if save_note(note_id, updated_content):
+                            st.success("✅ Заметка сохранена!")
+                            st.rerun()
+
+                with col2:
+                    if st.button("📋 Копировать", key=f"copy_{note_id}"):
+                        st.code(updated_content)
+
+                with col3:
+                    if st.button("🗑️ Удалить", key=f"delete_{note_id}"):
+                        if delete_note(note_id):
+                            st.success("✅ Заметка удалена!")
+                            st.rerun()
+
+                # Информация о заметке
+                st.divider()
+                st.markdown(f"""
             **Информация:**
             - 📏 Размер: {len(updated_content)} символов
             - 📊 Слов: {len(updated_content.split())}
             - 📅 Обновлена: {datetime.now().strftime('%Y-%m-%d %H:%M')}
             """)
-    else:
-        st.info("📭 Нет заметок. Создайте первую!")
+        else:
+            st.info("📭 Нет заметок. Создайте первую!")
 
-# ============================================================================
-# СТРАНИЦА 2: СОЗДАТЬ ЗАМЕТКУ
-# ============================================================================
+    # ============================================================================
+    # СТРАНИЦА 2: СОЗДАТЬ ЗАМЕТКУ
+    # ============================================================================
 
-elif page == "➕ Создать заметку":
-    st.title("➕ Создать новую заметку")
-    
-    col1, col2 = st.columns([2, 1])
-    
-    with col1:
-        title = st.text_input("Название заметки:", placeholder="Моя первая заметка")
-    
-    with col2:
-        tags = st.text_input("Теги (через запятую):", placeholder="tag1, tag2")
-    
-    content = st.text_area(
-        "Содержание:",
-        placeholder="Введите содержание заметки...",
-        height=300
-    )
-    
-    col1, col2 = st.columns(2)
-    
-    with col1:
-        if st.button("✅ Создать заметку", type="primary"):
-            if title and content:
-                note_id = f"{title.lower().replace(' ', '-')}-{datetime.now().strftime('%Y%m%d%H%M%S')}"
-                
-                # Добавить метаданные
-                full_content = f"""# {title}
+    elif page == "➕ Создать заметку":
+        st.title("➕ Создать новую заметку")
+
+        col1, col2 = st.columns([2, 1])
+
+        with col1:
+            title = st.text_input("Название заметки:", placeholder="Моя первая заметка")
+
+        with col2:
+            tags = st.text_input("Теги (через запятую):", placeholder="tag1, tag2")
+
+        content = st.text_area(
+            "Содержание:",
+            placeholder="Введите содержание заметки...",
+            height=300
+        )
+
+        col1, col2 = st.columns(2)
+
+        with col1:
+            if st.button("✅ Создать заметку", type="primary"):
+                if title and content:
+                    note_id = f"{title.lower().replace(' ', '-')}-{datetime.now().strftime('%Y%m%d%H%M%S')}"
+
+                    # Добавить метаданные
+                    full_content = f"""# {title}
 
 **Теги:** {tags}  
 **Создана:** {datetime.now().isoformat()}
@@ -262,198 +310,251 @@ elif page == "➕ Создать заметку":
 
 {content}
 """
-                
-                if save_note(note_id, full_content):
-                    st.success("✅ Заметка создана!")
-                    st.balloons()
-            else:
-                st.error("❌ Заполните название и содержание!")
-    
-    with col2:
-        if st.button("🔄 Очистить форму"):
-            st.rerun()
 
-# ============================================================================
-# СТРАНИЦА 3: ПОИСК
-# ============================================================================
-
-elif page == "🔍 Поиск":
-    st.title("🔍 Поиск по заметкам")
-    
-    search_type = st.radio("Тип поиска:", ["Обычный поиск", "Семантический поиск (RAG)"])
-    
-    query = st.text_input(
-        "Введите запрос:",
-        placeholder="Что вы ищете?"
-    )
-    
-    if st.button("🔎 Искать", type="primary"):
-        if query:
-            if search_type == "Обычный поиск":
-                # Простой текстовый поиск
-                notes = load_notes_from_file()
-                results = []
-                
-                for note_id, content in notes.items():
-                    if query.lower() in content.lower():
-                        results.append({
-                            "id": note_id,
-                            "content": content,
-                            "relevance": content.lower().count(query.lower())
-                        })
-                
-                # Отсортировать по релевантности
-                results.sort(key=lambda x: x['relevance'], reverse=True)
-                
-                if results:
-                    st.success(f"✅ Найдено {len(results)} заметок")
-                    
-                    for i, result in enumerate(results, 1):
-                        with st.expander(f"📄 {i}. {result['id']}"):
-                            st.markdown(result['content'][:500] + "...")
-                            st.caption(f"Релевантность: {result['relevance']}")
+                    if save_note(note_id, full_content):
+                        st.success("✅ Заметка создана!")
+                        st.balloons()
                 else:
-                    st.info("📭 Ничего не найдено")
-            
-            elif search_type == "Семантический поиск (RAG)" and RAG_AVAILABLE:
-                # RAG поиск
-                if st.session_state.rag_assistant:
-                    try:
-                        with st.spinner("🔍 Ищу похожие заметки..."):
-                            results = st.session_state.rag_assistant.query(query, k=5)
-                            
-                            if results and results.get('documents'):
-                                docs = results['documents'][0]
-                                st.success(f"✅ Найдено {len(docs)} релевантных документов")
-                                
-                                for i, doc in enumerate(docs, 1):
-                                    with st.expander(f"📄 Результат {i}"):
-                                        st.markdown(doc)
-                            else:
-                                st.info("📭 Ничего не найдено")
-                    except Exception as e:
-                        st.error(f"❌ Ошибка поиска: {e}")
-                else:
-                    st.warning("⚠️ RAG система недоступна")
-        else:
-            st.warning("⚠️ Введите запрос для поиска")
+                    st.error("❌ Заполните название и содержание!")
 
-# ============================================================================
-# СТРАНИЦА 4: AI ASSISTANT
-# ============================================================================
+        with col2:
+            if st.button("🔄 Очистить форму"):
+                st.rerun()
 
-elif page == "🤖 AI Assistant":
-    st.title("🤖 AI Assistant")
-    
-    if st.session_state.llm_assistant:
-        assistant_mode = st.radio(
-            "Режим работы:",
-            ["💬 Обычный вопрос", "📚 С контекстом из заметок", "📝 Анализ заметки"]
+    # ============================================================================
+    # СТРАНИЦА 3: ПОИСК
+    # ============================================================================
+
+    elif page == "🔍 Поиск":
+        st.title("🔍 Поиск по заметкам")
+
+        search_type = st.radio("Тип поиска:", ["Обычный поиск", "Семантический поиск (RAG)"])
+
+        query = st.text_input(
+            "Введите запрос:",
+            placeholder="Что вы ищете?"
         )
-        
-        if assistant_mode == "💬 Обычный вопрос":
-            question = st.text_area(
-                "Ваш вопрос:",
-                placeholder="Спросите что-нибудь...",
-                height=100
-            )
-            
-            if st.button("🚀 Получить ответ", type="primary"):
-                if question:
-                    with st.spinner("🤔 Думаю..."):
+
+        if st.button("🔎 Искать", type="primary"):
+            if query:
+                if search_type == "Обычный поиск":
+                    # Простой текстовый поиск
+                    notes = load_notes_from_file()
+                    results = []
+
+                    for note_id, content in notes.items():
+                        if query.lower() in content.lower():
+                            results.append({
+                                "id": note_id,
+                                "content": content,
+                                "relevance": content.lower().count(query.lower())
+                            })
+
+                    # Отсортировать по релевантности
+                    results.sort(key=lambda x: x['relevance'], reverse=True)
+
+                    if results:
+                        st.success(f"✅ Найдено {len(results)} заметок")
+
+                        for i, result in enumerate(results, 1):
+                            with st.expander(f"📄 {i}. {result['id']}"):
+                                st.markdown(result['content'][:500] + "...")
+                                st.caption(f"Релевантность: {result['relevance']}")
+                    else:
+                        st.info("📭 Ничего не найдено")
+
+                elif search_type == "Семантический поиск (RAG)" and RAG_AVAILABLE:
+                    # RAG поиск
+                    if st.session_state.rag_assistant:
                         try:
-                            response = st.session_state.llm_assistant.answer(question)
-                            st.success("✅ Ответ готов!")
-                            st.markdown(f"""
+                            with st.spinner("🔍 Ищу похожие заметки..."):
+                                results = st.session_state.rag_assistant.query(query, k=5)
+
+                                if results and results.get('documents'):
+                                    docs = results['documents'][0]
+                                    st.success(f"✅ Найдено {len(docs)} релевантных документов")
+
+                                    for i, doc in enumerate(docs, 1):
+                                        with st.expander(f"📄 Результат {i}"):
+                                            st.markdown(doc)
+                                else:
+                                    st.info("📭 Ничего не найдено")
+                        except Exception as e:
+                            st.error(f"❌ Ошибка поиска: {e}")
+                    else:
+                        st.warning("⚠️ RAG система недоступна")
+            else:
+                st.warning("⚠️ Введите запрос для поиска")
+
+    # ============================================================================
+    # СТРАНИЦА 4: AI ASSISTANT
+    # ============================================================================
+
+    elif page == "🤖 AI Assistant":
+        st.title("🤖 AI Assistant")
+
+        if st.session_state.llm_assistant:
+            assistant_mode = st.radio(
+                "Режим работы:",
+                ["💬 Обычный вопрос", "📚 С контекстом из заметок", "📝 Анализ заметки"]
+            )
+
+            if assistant_mode == "💬 Обычный вопрос":
+                question = st.text_area(
+                    "Ваш вопрос:",
+                    placeholder="Спросите что-нибудь...",
+                    height=100
+                )
+
+                if st.button("🚀 Получить ответ", type="primary"):
+                    if question:
+                        with st.spinner("🤔 Думаю..."):
+                            try:
+                                response = ask_assistant(question)
+                                st.success("✅ Ответ готов!")
+                                st.markdown(f"""
                             ### Ответ:
                             {response}
                             """)
-                        except Exception as e:
-                            st.error(f"❌ Ошибка: {e}")
-        
-        elif assistant_mode == "📚 С контекстом из заметок":
-            question = st.text_area(
-                "Ваш вопрос:",
-                placeholder="Спросите что-нибудь про ваши заметки...",
-                height=100
-            )
-            
-            context_size = st.slider("Сколько заметок использовать как контекст:", 1, 10, 3)
-            
-            if st.button("🚀 Получить ответ", type="primary"):
-                if question and RAG_AVAILABLE and st.session_state.rag_assistant:
-                    with st.spinner("🔍 Ищу контекст..."):
-                        try:
-                            # Получить контекст
-                            search_results = st.session_state.rag_assistant.query(question, k=context_size)
-                            context = ""
-                            
-                            if search_results and search_results.get('documents'):
-                                docs = search_results['documents'][0]
-                                context = "\n\n".join([f"[Контекст {i+1}]: {doc}" for i, doc in enumerate(docs)])
-                            
-                            # Составить промпт с контекстом
-                            full_prompt = f"""{context}
+                            except Exception as e:
+                                st.error(f"❌ Ошибка: {e}")
+
+            elif assistant_mode == "📚 С контекстом из заметок":
+                question = st.text_area(
+                    "Ваш вопрос:",
+                    placeholder="Спросите что-нибудь про ваши заметки...",
+                    height=100
+                )
+
+                context_size = st.slider("Сколько заметок использовать как контекст:", 1, 10, 3)
+                # Отсечение по отрыву от лучшего совпадения может убрать полезный контекст, поэтому выключено по умолчанию
+                margin = None
+                if st.checkbox("Отсекать фрагменты, заметно менее похожие на вопрос, чем лучший"):
+                    margin = st.slider("Допустимый отрыв по расстоянию:", 0.05, 0.5, 0.2, step=0.05)
+
+                if st.button("🚀 Получить ответ", type="primary"):
+                    if question and RAG_AVAILABLE and st.session_state.rag_assistant:
+                        with st.spinner("🔍 Ищу контекст..."):
+                            try:
+                                # Получить контекст
+                                # Кандидатов берётся больше, затем отсекаются нерелевантные
+                                # и почти одинаковые, а длинные фрагменты сокращаются
+                                search_results = st.session_state.rag_assistant.query_refined(
+                                    question, k=context_size, postprocessor=PostProcessor(k=context_size, margin=margin)
+                                )
+                                context = ""
+                                docs = []
+
+                                if search_results and search_results.get('documents'):
+                                    docs = search_results['documents'][0]
+                                    context = "\n\n".join([f"[Контекст {i+1}]: {doc}" for i, doc in enumerate(docs)])
+
+                                # Составить промпт с контекстом
+                                full_prompt = f"""{context}
 
 Вопрос: {question}
 
 Ответ:"""
-                            
-                            response = st.session_state.llm_assistant.answer(full_prompt)
-                            st.success("✅ Ответ готов!")
-                            st.markdown(f"""
+
+                                response = ask_assistant(full_prompt)
+                                st.success("✅ Ответ готов!")
+                                st.markdown(f"""
                             ### Ответ:
                             {response}
                             
                             ---
                             **Использован контекст из {len(docs)} документов**
                             """)
-                        except Exception as e:
-                            st.error(f"❌ Ошибка: {e}")
+                            except Exception as e:
+                                st.error(f"❌ Ошибка: {e}")
+                    else:
+                        st.warning("⚠️ RAG система недоступна или контекст не найден")
+
+            elif assistant_mode == "📝 Анализ заметки":
+                notes = load_notes_from_file()
+
+                if notes:
+                    note_id = st.selectbox("Выберите заметку для анализа:", list(notes.keys()))
+
+                    analysis_type = st.radio(
+                        "Тип анализа:",
+                        ["📌 Резюме", "🏷️ Ключевые слова", "❓ Вопросы", "📊 Структура"]
+                    )
+
+                    if st.button("🔍 Анализировать", type="primary"):
+                        content = notes[note_id]
+
+                        prompts = {
+                            "📌 Резюме": f"Сделай краткое резюме этого текста:\n\n{content}",
+                            "🏷️ Ключевые слова": f"Извлеки ключевые слова из этого текста:\n\n{content}",
+                            "❓ Вопросы": f"Сгенерируй 5 важных вопросов по этому тексту:\n\n{content}",
+                            "📊 Структура": f"Создай структуру/план этого текста:\n\n{content}"
+                        }
+
+                        with st.spinner("🤔 Анализирую..."):
+                            try:
+                                response = ask_assistant(prompts[analysis_type])
+                                st.success("✅ Анализ готов!")
+                                st.markdown(response)
+                            except Exception as e:
+                                st.error(f"❌ Ошибка: {e}")
                 else:
-                    st.warning("⚠️ RAG система недоступна или контекст не найден")
-        
-        elif assistant_mode == "📝 Анализ заметки":
-            notes = load_notes_from_file()
-            
-            if notes:
-                note_id = st.selectbox("Выберите заметку для анализа:", list(notes.keys()))
-                
-                analysis_type = st.radio(
-                    "Тип анализа:",
-                    ["📌 Резюме", "🏷️ Ключевые слова", "❓ Вопросы", "📊 Структура"]
-                )
-                
-                if st.button("🔍 Анализировать", type="primary"):
-                    content = notes[note_id]
-                    
-                    prompts = {
-                        "📌 Резюме": f"Сделай краткое резюме этого текста:\n\n{content}",
-                        "🏷️ Ключевые слова": f"Извлеки ключевые слова из этого текста:\n\n{content}",
-                        "❓ Вопросы": f"Сгенерируй 5 важных вопросов по этому тексту:\n\n{content}",
-                        "📊 Структура": f"Создай структуру/план этого текста:\n\n{content}"
-                    }
-                    
-                    with st.spinner("🤔 Анализирую..."):
-                        try:
-                            response = st.session_state.llm_assistant.answer(prompts[analysis_type])
-                            st.success("✅ Анализ готов!")
-                            st.markdown(response)
-                        except Exception as e:
-                            st.error(f"❌ Ошибка: {e}")
-            else:
-                st.info("📭 Нет заметок для анализа")
-    else:
-        st.error("❌ AI Assistant недоступен. Проверьте API ключи в .env")
+                    st.info("📭 Нет заметок для анализа")
+        else:
+            st.error("❌ AI Assistant недоступен. Проверьте API ключи в .env")
 
-# ============================================================================
-# СТРАНИЦА 5: О ПРИЛОЖЕНИИ
-# ============================================================================
+    # ============================================================================
+    # СТРАНИЦА 5: ДИАГНОСТИКА
+    # ============================================================================
 
-elif page == "ℹ️ О приложении":
-    st.title("ℹ️ О приложении")
-    
-    st.markdown("""
+    elif page == "🩺 Диагностика":
+        st.title("🩺 Диагностика")
+
+        snapshot = registry.snapshot()
+
+        st.subheader("⏱️ Задержки по этапам")
+        stage_rows = [
+            {"этап": label, **stats}
+            for label, stats in sorted(snapshot.get(STAGE_SECONDS, {}).items())
+        ]
+        if stage_rows:
+            st.dataframe(stage_rows, use_container_width=True)
+        else:
+            st.info("📭 Пока нет измерений. Выполните поиск или задайте вопрос.")
+
+        col1, col2 = st.columns(2)
+
+        with col1:
+            st.subheader("📥 В работе")
+            for label, value in sorted(snapshot.get(INFLIGHT, {}).items()):
+                st.metric(label, int(value))
+
+        with col2:
+            st.subheader("🎯 Попадания в кэш")
+            for cache, rate in cache_hit_rates(snapshot).items():
+                st.metric(cache, f"{rate:.0%}")
+
+        if st.session_state.llm_assistant:
+            st.subheader("🤖 Агент")
+            st.json(st.session_state.llm_assistant.get_path_stats())
+            if hasattr(st.session_state.llm_assistant.llm, "get_stats"):
+                st.json(st.session_state.llm_assistant.llm.get_stats())
+
+        metrics_server = get_metrics_server(int(os.getenv("NOTES_METRICS_PORT", "9108")))
+        if metrics_server:
+            st.caption(f"Prometheus: http://{metrics_server.server_address[0]}:{metrics_server.server_address[1]}/metrics")
+
+        with st.expander("Все метрики (Prometheus)"):
+            st.code(registry.render_prometheus(), language="text")
+
+    # ============================================================================
+    # СТРАНИЦА 6: О ПРИЛОЖЕНИИ
+    # ============================================================================
+
+    elif page == "ℹ️ О приложении":
+        st.title("ℹ️ О приложении")
+
+        st.markdown("""
     # Note Assistant
     
     ## 📝 Описание
@@ -488,36 +589,36 @@ elif page == "ℹ️ О приложении":
     
     ## 📊 Статистика
     """)
-    
-    notes = load_notes_from_file()
-    total_chars = sum(len(content) for content in notes.values())
-    total_words = sum(len(content.split()) for content in notes.values())
-    
-    col1, col2, col3 = st.columns(3)
-    with col1:
-        st.metric("📝 Заметок", len(notes))
-    with col2:
-        st.metric("📝 Символов", total_chars)
-    with col3:
-        st.metric("📝 Слов", total_words)
-    
-    st.markdown("""
+
+        notes = load_notes_from_file()
+        total_chars = sum(len(content) for content in notes.values())
+        total_words = sum(len(content.split()) for content in notes.values())
+
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("📝 Заметок", len(notes))
+        with col2:
+            st.metric("📝 Символов", total_chars)
+        with col3:
+            st.metric("📝 Слов", total_words)
+
+        st.markdown("""
     ## 🔧 Конфигурация
     """)
-    
-    col1, col2 = st.columns(2)
-    
-    with col1:
-        st.write("**LLM Provider:**", os.getenv("LLM_PROVIDER", "не указан"))
-        st.write("**Model:**", os.getenv("MODEL_NAME", "не указан"))
-        st.write("**Temperature:**", os.getenv("TEMPERATURE", "0.7"))
-    
-    with col2:
-        st.write("**Notes Path:**", os.getenv("NOTES_PATH", "./notes"))
-        st.write("**Vector Store:**", os.getenv("VECTOR_STORE_PATH", "./vectorstorage"))
-        st.write("**Max Tokens:**", os.getenv("MAX_TOKENS", "2000"))
-    
-    st.markdown("""
+
+        col1, col2 = st.columns(2)
+
+        with col1:
+            st.write("**LLM Provider:**", os.getenv("LLM_PROVIDER", "не указан"))
+            st.write("**Model:**", os.getenv("MODEL_NAME", "не указан"))
+            st.write("**Temperature:**", os.getenv("TEMPERATURE", "0.7"))
+
+        with col2:
+            st.write("**Notes Path:**", os.getenv("NOTES_PATH", "./notes"))
+            st.write("**Vector Store:**", os.getenv("VECTOR_STORE_PATH", "./vectorstorage"))
+            st.write("**Max Tokens:**", os.getenv("MAX_TOKENS", "2000"))
+
+        st.markdown("""
     ## 📚 Документация
     - [GitHub](https://github.com/yourusername/note-assistant)
     - [API Docs](http://localhost:8000/docs)
@@ -531,14 +632,17 @@ elif page == "ℹ️ О приложении":
     **Made with ❤️ for note management**
     """)
 
-# ============================================================================
-# FOOTER
-# ============================================================================
+    # ============================================================================
+    # FOOTER
+    # ============================================================================
 
-st.divider()
-st.markdown("""
+    st.divider()
+    st.markdown("""
 <div style="text-align: center; color: gray; font-size: 12px;">
     <p>📝 Note Assistant v1.0.0 | Powered by Streamlit</p>
     <p>Made with ❤️ for better note management</p>
 </div>
 """, unsafe_allow_html=True)
+finally:
+    if page_profile is not None:
+        page_profile.stop()
@@ -0,0 +1,118 @@
+"""Peak RSS of the chunk representation between splitting and the vector store.
+
+Each variant runs in a fresh interpreter on the same synthetic vault. The texts
+are read before the baseline is taken. split_rss_delta_mb is the peak growth
+while holding the split output; rss_delta_mb adds what add_documents builds from
+it for Chroma (ids, texts, metadatas; per 5000-chunk upsert slice for the batch):
+
+    documents  LangChain Documents with metadata dicts, as before ChunkBatch
+               (split_documents, chunk_id / file_path / paragraph_number per chunk)
+    batch      DocumentsProcessor.split -> ChunkBatch
+
+    python -m benchmarks.chunk_memory_bench --notes 3000 --chunk-size 300 --output chunks_rss.json
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+SNIPPET = """
+import gc, json, resource, sys, time
+sys.path.insert(0, {root!r})
+from pathlib import Path
+from langchain_core.documents import Document
+from RAG.components.documents_processor import DocumentsProcessor
+
+processor = DocumentsProcessor(chunk_size={chunk_size}, chunk_overlap={chunk_overlap})
+documents = [
+    Document(page_content=path.read_text(encoding="utf-8"), metadata={{"source": str(path)}})
+    for path in sorted(Path({vault!r}).rglob("*.md"))
+]
+processor.text_splitter
+gc.collect()
+before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+start = time.perf_counter()
+if {variant!r} == "documents":
+    chunks = processor.text_splitter.split_documents(documents)
+    for idx, chunk in enumerate(chunks):
+        chunk.metadata["chunk_id"] = idx
+        chunk.metadata["file_path"] = chunk.metadata.get("source", "")
+        chunk.metadata["paragraph_number"] = idx
+    split = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    ids = [f"{{c.metadata['source']}}#{{c.metadata['chunk_id']}}" for c in chunks]
+    texts = [c.page_content for c in chunks]
+    metadatas = [c.metadata for c in chunks]
+else:
+    chunks = processor.split(documents)
+    split = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    texts = chunks.texts
+    # add_documents builds ids and metadata dicts per upsert slice
+    for offset in range(0, len(chunks), 5000):
+        part = chunks[offset:offset + 5000]
+        ids, metadatas = part.ids(), part.metadatas()
+seconds = time.perf_counter() - start
+
+after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({{
+    "chunks": len(texts),
+    "seconds": seconds,
+    "split_rss_delta_mb": (split - before) / 1024,
+    "rss_delta_mb": (after - before) / 1024,
+    "peak_rss_mb": after / 1024,
+}}))
+"""
+
+
+def run_variant(variant: str, vault: Path, args) -> dict:
+    code = SNIPPET.format(
+        root=str(ROOT), vault=str(vault), variant=variant,
+        chunk_size=args.chunk_size, chunk_overlap=args.chunk_overlap,
+    )
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="1", NOTES_LOG_LEVEL="WARNING")
+    env.setdefault("NOTES_LOG_DIR", tempfile.gettempdir())
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, env=env, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--notes", type=int, default=2000)
+    parser.add_argument("--median-words", type=int, default=400)
+    parser.add_argument("--chunk-size", type=int, default=300)
+    parser.add_argument("--chunk-overlap", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args(argv)
+
+    sys.path.append(str(ROOT))
+    from benchmarks.vault import VaultSpec, generate_vault
+
+    with tempfile.TemporaryDirectory(prefix="notes-chunks-") as workdir:
+        vault = generate_vault(Path(workdir), VaultSpec(notes=args.notes, median_words=args.median_words, seed=args.seed))
+        results = {
+            "params": vars(args),
+            "vault_mb": round(vault.total_bytes / 1e6, 2),
+            "variants": {variant: run_variant(variant, vault.root, args) for variant in ("documents", "batch")},
+        }
+
+    documents, batch = results["variants"]["documents"], results["variants"]["batch"]
+    if documents["chunks"]:
+        results["bytes_per_chunk"] = {
+            name: round(v["rss_delta_mb"] * 1024 * 1024 / v["chunks"]) for name, v in results["variants"].items()
+        }
+        results["rss_saved_mb"] = round(documents["rss_delta_mb"] - batch["rss_delta_mb"], 1)
+
+    report = json.dumps(results, indent=2)
+    if args.output:
+        Path(args.output).write_text(report, encoding="utf-8")
+    print(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+"""Regression gate: compares benchmark results against a stored JSON baseline.
+
+    python -m benchmarks.compare save benchmarks/baselines/main.json --notes 200 --repeat 5
+    python -m benchmarks.compare check benchmarks/baselines/main.json
+    python -m benchmarks.compare diff old.json new.json
+
+`check` re-runs the suite with the parameters recorded in the baseline and exits
+with status 1 when a watched metric regresses beyond tolerance. Run-to-run noise
+is taken from the spread of seconds_samples in both runs: the allowed change of a
+timing metric is max(--tolerance, --noise-factor * spread), so a noisy machine
+widens the gate instead of producing false alarms. Memory is measured once under
+tracemalloc and only gets --memory-tolerance. Latency changes smaller than
+--min-ms are never flagged: tail percentiles of sub-millisecond stages jitter by
+more than any relative tolerance.
+"""
+import argparse
+import json
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT))
+
+
+HIGHER = "higher"
+LOWER = "lower"
+
+# Metrics watched per scenario and which direction is better
+WATCHED = {
+    "initial_indexing": {"notes_per_second": HIGHER, "mb_per_second": HIGHER, "peak_mb": LOWER},
+    "watcher_burst": {"events_per_second": HIGHER, "p95_ms": LOWER, "peak_mb": LOWER},
+    "query": {"queries_per_second": HIGHER, "p50_ms": LOWER, "p95_ms": LOWER, "peak_mb": LOWER},
+    "query_many": {"queries_per_second": HIGHER, "batch_p95_ms": LOWER, "peak_mb": LOWER},
+}
+
+
+@dataclass
+class Tolerance:
+    timing: float = 0.10
+    memory: float = 0.10
+    noise_factor: float = 2.0
+    min_ms: float = 2.0
+
+
+@dataclass
+class Delta:
+    scenario: str
+    metric: str
+    baseline: float
+    current: float
+    change: float
+    allowed: float
+    status: str
+
+
+def noise(result: Dict) -> float:
+    """Relative spread (max - min) / median of the repeated timings of one scenario run."""
+    samples = sorted(result.get("seconds_samples") or [])
+    if len(samples) < 2:
+        return 0.0
+    median = samples[len(samples) // 2]
+    return (samples[-1] - samples[0]) / median if median else 0.0
+
+
+def compare(baseline: Dict, current: Dict, tolerance: Tolerance | None = None) -> List[Delta]:
+    tolerance = tolerance or Tolerance()
+    deltas = []
+    for scenario, metrics in WATCHED.items():
+        old = baseline.get("scenarios", {}).get(scenario)
+        new = current.get("scenarios", {}).get(scenario)
+        if old is None or "error" in old:
+            continue
+        if new is None or "error" in new:
+            reason = new["error"] if new else "scenario missing"
+            deltas.append(Delta(scenario, reason, 0.0, 0.0, 0.0, 0.0, "failed"))
+            continue
+
+        spread = max(noise(old), noise(new))
+        for metric, better in metrics.items():
+            if metric not in old or metric not in new or not old[metric]:
+                continue
+            if metric == "peak_mb":
+                allowed = tolerance.memory
+            else:
+                allowed = max(tolerance.timing, tolerance.noise_factor * spread)
+
+            change = (new[metric] - old[metric]) / old[metric]
+            worse = -change if better == HIGHER else change
+            if metric.endswith("_ms") and abs(new[metric] - old[metric]) < tolerance.min_ms:
+                status = "ok"
+            elif worse > allowed:
+                status = "regression"
+            elif -worse > allowed:
+                status = "improvement"
+            else:
+                status = "ok"
+            deltas.append(Delta(scenario, metric, old[metric], new[metric], change, allowed, status))
+    return deltas
+
+
+def render(deltas: List[Delta]) -> str:
+    marks = {"ok": " ", "improvement": "+", "regression": "!", "failed": "x"}
+    rows = [("", "scenario", "metric", "baseline", "current", "change", "allowed")]
+    for d in deltas:
+        if d.status == "failed":
+            rows.append((marks[d.status], d.scenario, d.metric, "", "", "", ""))
+            continue
+        rows.append((
+            marks[d.status], d.scenario, d.metric,
+            f"{d.baseline:.4g}", f"{d.current:.4g}", f"{d.change:+.1%}", f"±{d.allowed:.1%}",
+        ))
+
+    widths = [max(len(row[i]) for row in rows) for i in range(len(rows[0]))]
+    lines = ["  ".join(cell.ljust(w) for cell, w in zip(row, widths)).rstrip() for row in rows]
+
+    regressions = [d for d in deltas if d.status in ("regression", "failed")]
+    lines.append("")
+    lines.append(f"{len(regressions)} regression(s)" if regressions else "No regressions")
+    return "\n".join(lines)
+
+
+def failed(deltas: List[Delta]) -> bool:
+    return any(d.status in ("regression", "failed") for d in deltas)
+
+
+def _load(path) -> Dict:
+    return json.loads(Path(path).read_text(encoding="utf-8"))
+
+
+def _rerun(baseline: Dict) -> Dict:
+    from benchmarks.suite import build_parser, run_suite
+
+    args = build_parser().parse_args([])
+    for key, value in baseline["meta"]["params"].items():
+        setattr(args, key, value)
+    # Only scenarios present in the baseline can be compared
+    args.scenarios = [s for s in args.scenarios if s in baseline["scenarios"]]
+    return run_suite(args)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tolerance", type=float, default=0.10, help="allowed relative change of timing metrics")
+    parser.add_argument("--memory-tolerance", type=float, default=0.10, help="allowed relative change of peak_mb")
+    parser.add_argument("--noise-factor", type=float, default=2.0, help="multiplier on the measured run-to-run spread")
+    parser.add_argument("--min-ms", type=float, default=2.0, help="ignore latency changes smaller than this")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    save = commands.add_parser("save", help="run the suite and store the result as a baseline")
+    save.add_argument("baseline")
+
+    check = commands.add_parser("check", help="re-run the suite and compare against a baseline")
+    check.add_argument("baseline")
+    check.add_argument("--output", default=None, help="also store the new results here")
+
+    diff = commands.add_parser("diff", help="compare two stored result files")
+    diff.add_argument("baseline")
+    diff.add_argument("current")
+    return parser
+
+
+def main(argv=None) -> int:
+    parser = build_parser()
+    args, suite_argv = parser.parse_known_args(argv)
+
+    if args.command == "save":
+        from benchmarks.suite import build_parser as suite_parser, run_suite
+
+        results = run_suite(suite_parser().parse_args(suite_argv))
+        path = Path(args.baseline)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(results, indent=2, ensure_ascii=False), encoding="utf-8")
+        print(f"Baseline saved to {path} ({results['meta']['commit']})")
+        return 0
+
+    if suite_argv:
+        parser.error(f"unrecognized arguments: {' '.join(suite_argv)}")
+
+    baseline = _load(args.baseline)
+    if args.command == "check":
+        current = _rerun(baseline)
+        if args.output:
+            Path(args.output).write_text(json.dumps(current, indent=2, ensure_ascii=False), encoding="utf-8")
+    else:
+        current = _load(args.current)
+
+    deltas = compare(baseline, current, Tolerance(args.tolerance, args.memory_tolerance, args.noise_factor, args.min_ms))
+    print(f"baseline {baseline['meta']['commit']} -> current {current['meta']['commit']}")
+    print(render(deltas))
+    return 1 if failed(deltas) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
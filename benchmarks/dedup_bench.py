@@ -0,0 +1,150 @@
+"""Index size and embedding work saved by near-duplicate detection at ingestion.
+
+A synthetic vault gets a meeting template and a pasted log appended to a share
+of its notes, with small per-note differences (dates, a changed line, log
+timestamps), as in a vault of copied templates. The same chunks are then
+indexed twice, into fresh Chroma directories:
+
+    off  every chunk is embedded and stored, as without a ChunkDeduplicator
+    on   through ChunkDeduplicator.staged; duplicates become references
+
+filter_s is the MinHash pass, embed_s the stand-in embedding (HashingEmbeddings,
+plus --per-text-ms of simulated model time per chunk), index_mb the size of
+the Chroma directory and the duplicates sidecar on disk.
+
+    python -m benchmarks.dedup_bench --notes 500 --copy-share 0.4 --per-text-ms 20
+"""
+import argparse
+import json
+import random
+import shutil
+import sys
+import tempfile
+import time
+from contextlib import nullcontext
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT))
+
+from benchmarks.vault import VaultSpec, generate_vault
+from benchmarks.standins import HashingEmbeddings
+
+TEMPLATE = [
+    "## Встреча {date}\n\nУчастники: команда проекта, продукт, аналитика. Ведущий: дежурный по неделе.",
+    "### Повестка\n\n- статус задач спринта и блокеры\n- метрики качества поиска за неделю\n"
+    "- инциденты и разбор дежурства\n- планы на следующую неделю и риски",
+    "### Решения\n\n- обновить индекс после изменения чанкинга\n- проверить регрессию по бенчмаркам\n"
+    "- согласовать формат заметок для новых участников\n- назначить ответственного за релиз",
+]
+LOG_LINE = "2024-05-{day:02d} 12:{minute:02d}:{second:02d} INFO indexer processed batch {batch} in {ms}ms (chunks=128)"
+
+
+def add_copies(vault, share: float, seed: int) -> int:
+    rng = random.Random(seed)
+    copied = 0
+    for path in vault.files:
+        if rng.random() >= share:
+            continue
+        date = f"2024-05-{rng.randint(1, 28):02d}"
+        blocks = [block.format(date=date) for block in TEMPLATE]
+        if rng.random() < 0.5:
+            blocks[2] = blocks[2].replace("назначить ответственного за релиз", "перенести релиз на пятницу")
+        day, start = rng.randint(1, 28), rng.randint(0, 20)
+        log = "\n".join(
+            LOG_LINE.format(day=day, minute=start + i // 60, second=i % 60, batch=i, ms=rng.randint(80, 95))
+            for i in range(12)
+        )
+        with path.open("a", encoding="utf-8") as f:
+            f.write("\n\n" + "\n\n".join(blocks) + "\n\n```\n" + log + "\n```\n")
+        copied += 1
+    return copied
+
+
+def directory_mb(path: Path) -> float:
+    return sum(p.stat().st_size for p in path.rglob("*") if p.is_file()) / 1e6
+
+
+def run_variant(dedup: bool, chunks, args, workdir: Path) -> dict:
+    from RAG.components.dedup import ChunkDeduplicator
+    from RAG.components.vectorstorage import ChromaVectorStorage
+
+    store_dir = workdir / ("on" if dedup else "off")
+    storage = ChromaVectorStorage(persist_directory=store_dir)
+    embedder = HashingEmbeddings(dim=args.dim, per_text_latency=args.per_text_ms / 1000)
+
+    start = time.perf_counter()
+    deduplicator = ChunkDeduplicator(storage, store_dir / "duplicates.json", threshold=args.threshold) if dedup else None
+    staged = deduplicator.staged(chunks) if deduplicator is not None else nullcontext(chunks)
+    with staged as chunks:
+        filter_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        embeddings = embedder.embed_documents(chunks.texts)
+        embed_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        storage.add_documents(chunks, embeddings)
+    if deduplicator is not None:
+        deduplicator.save()
+    store_s = time.perf_counter() - start
+
+    return {
+        "embedded": len(chunks),
+        "filter_s": round(filter_s, 3),
+        "embed_s": round(embed_s, 3),
+        "store_s": round(store_s, 3),
+        "index_mb": round(directory_mb(store_dir), 2),
+        **({"dedup": deduplicator.report(dim=args.dim)} if deduplicator is not None else {}),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--notes", type=int, default=300)
+    parser.add_argument("--copy-share", type=float, default=0.4, help="share of notes with a template and a log pasted in")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--per-text-ms", type=float, default=0.0, help="simulated embedding model time per chunk")
+    parser.add_argument("--threshold", type=float, default=0.7)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args(argv)
+
+    from langchain_core.documents import Document
+    from RAG.components.documents_processor import DocumentsProcessor
+
+    workdir = Path(tempfile.mkdtemp(prefix="notes-dedup-"))
+    try:
+        vault = generate_vault(workdir / "vault", VaultSpec(notes=args.notes, seed=args.seed))
+        copied = add_copies(vault, args.copy_share, args.seed)
+        processor = DocumentsProcessor(chunk_size=args.chunk_size, chunk_overlap=args.chunk_size // 5)
+        chunks = processor.split([
+            Document(page_content=path.read_text(encoding="utf-8"), metadata={"source": str(path)})
+            for path in vault.files
+        ])
+
+        variants = {name: run_variant(name == "on", chunks, args, workdir) for name in ("off", "on")}
+        off, on = variants["off"], variants["on"]
+        results = {
+            "params": vars(args),
+            "notes_with_copies": copied,
+            "chunks": len(chunks),
+            "variants": variants,
+            "saved": {
+                "embedded_chunks": off["embedded"] - on["embedded"],
+                "index_mb": round(off["index_mb"] - on["index_mb"], 2),
+                "ingest_s": round(off["embed_s"] + off["store_s"] - on["filter_s"] - on["embed_s"] - on["store_s"], 3),
+            },
+        }
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = json.dumps(results, indent=2, ensure_ascii=False)
+    if args.output:
+        Path(args.output).write_text(report, encoding="utf-8")
+    print(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Memory and time of embeddings between the embedder and Chroma, per 10k chunks.
+
+The client output is simulated as the Ollama client delivers it: a list of
+Python float lists parsed from JSON. Each variant runs in a fresh interpreter:
+
+    lists    the list of lists goes to Chroma as is (before float32 arrays)
+    float32  EmbeddingModel's as_float32 packs it into one (n, dim) array first
+
+held_mb is what the embeddings occupy while they wait for the upsert (lists,
+rows and float objects, or the array buffer once the lists are dropped);
+upsert_s is the Chroma upsert of all chunks, including its own conversion of
+the input.
+
+    python -m benchmarks.embedding_memory_bench --chunks 10000 --dim 768
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+SNIPPET = """
+import json, random, sys, tempfile, time
+sys.path.insert(0, {root!r})
+import chromadb
+from RAG.components.embedding_model import as_float32
+
+rng = random.Random(0)
+client = chromadb.PersistentClient(path=tempfile.mkdtemp())
+collection = client.get_or_create_collection("documents", metadata={{"hnsw:space": "cosine"}})
+ids = [f"note.md#{{i}}" for i in range({chunks})]
+
+# json.loads yields one boxed float per value, like the Ollama client's response
+vectors = json.loads(json.dumps([[rng.uniform(-1, 1) for _ in range({dim})] for _ in range({chunks})]))
+start = time.perf_counter()
+if {variant!r} == "float32":
+    vectors = as_float32(vectors)
+    held = vectors.nbytes
+else:
+    held = sys.getsizeof(vectors) + sum(sys.getsizeof(row) + sum(map(sys.getsizeof, row)) for row in vectors)
+convert = time.perf_counter() - start if {variant!r} == "float32" else 0.0
+
+start = time.perf_counter()
+step = client.get_max_batch_size()
+for offset in range(0, {chunks}, step):
+    collection.upsert(ids=ids[offset:offset + step], embeddings=vectors[offset:offset + step])
+upsert = time.perf_counter() - start
+
+print(json.dumps({{"held_mb": held / 1e6, "convert_s": convert, "upsert_s": upsert}}))
+"""
+
+
+def run_variant(variant: str, args) -> dict:
+    code = SNIPPET.format(root=str(ROOT), variant=variant, chunks=args.chunks, dim=args.dim)
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="1", NOTES_LOG_LEVEL="WARNING")
+    env.setdefault("NOTES_LOG_DIR", tempfile.gettempdir())
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, env=env, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=10000)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--output", default=None)
+    args = parser.parse_args(argv)
+
+    variants = {variant: run_variant(variant, args) for variant in ("lists", "float32")}
+    per_10k = 10000 / args.chunks
+    results = {
+        "params": vars(args),
+        "variants": {name: {k: round(v, 4) for k, v in values.items()} for name, values in variants.items()},
+        "per_10k_chunks": {
+            "held_mb_saved": round((variants["lists"]["held_mb"] - variants["float32"]["held_mb"]) * per_10k, 1),
+            "upsert_s_saved": round((variants["lists"]["upsert_s"] - variants["float32"]["upsert_s"]) * per_10k, 3),
+            "convert_s_added": round(variants["float32"]["convert_s"] * per_10k, 3),
+        },
+    }
+
+    report = json.dumps(results, indent=2)
+    if args.output:
+        Path(args.output).write_text(report, encoding="utf-8")
+    print(report)
+
+
+if __name__ == "__main__":
+    main()
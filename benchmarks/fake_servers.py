@@ -0,0 +1,319 @@
+"""Local stand-ins for the Ollama embeddings API and the OpenAI-compatible chat API.
+
+Both servers answer deterministically: the same request always gets the same
+embedding or reply. Latency, jitter and injected errors are drawn from a
+seeded generator, so a load test is repeatable.
+
+Point the app at them through the environment:
+
+    python -m benchmarks.fake_servers --ollama-port 11500 --openai-port 11501 --latency 0.05 --error-rate 0.01
+    OLLAMA_BASE_URL=http://127.0.0.1:11500 OPENROUTER_BASE_URL=http://127.0.0.1:11501/api/v1 OPENROUTER_API=fake ...
+
+Implemented endpoints:
+    Ollama:  POST /api/embeddings {"model", "prompt"}     -> {"embedding": [...]}
+             POST /api/embed      {"model", "input"}      -> {"embeddings": [[...]]}
+             GET  /api/tags
+    OpenAI:  POST .../chat/completions (tools, tool_choice, stream=true as SSE)
+             GET  .../models
+"""
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+from benchmarks.standins import HashingEmbeddings
+
+
+@dataclass
+class FakeServerConfig:
+    latency: float = 0.0
+    jitter: float = 0.0
+    error_rate: float = 0.0
+    error_status: int = 500
+    seed: int = 0
+    dim: int = 256
+    # Simulated generation speed for chat replies; 0 means instant
+    tokens_per_second: float = 0.0
+
+
+class _Behaviour:
+    def __init__(self, config: FakeServerConfig):
+        self.config = config
+        self._rng = random.Random(config.seed)
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+
+    def before_request(self) -> Optional[int]:
+        with self._lock:
+            self.requests += 1
+            delay = self.config.latency + self._rng.uniform(-1, 1) * self.config.jitter
+            failed = self._rng.random() < self.config.error_rate
+            if failed:
+                self.errors += 1
+        if delay > 0:
+            time.sleep(delay)
+        return self.config.error_status if failed else None
+
+
+class _JsonHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    behaviour: _Behaviour
+
+    def log_message(self, format, *args):
+        pass
+
+    def _read_json(self) -> Dict[str, Any]:
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def _send_json(self, payload: Dict[str, Any], status: int = 200):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _maybe_fail(self) -> bool:
+        status = self.behaviour.before_request()
+        if status is None:
+            return False
+        self._send_json({"error": {"message": "injected failure", "code": status}}, status=status)
+        return True
+
+
+class OllamaHandler(_JsonHandler):
+    embeddings: HashingEmbeddings
+
+    def do_GET(self):
+        if self.path.startswith("/api/tags"):
+            self._send_json({"models": [{"name": "fake-embeddings"}]})
+        else:
+            self._send_json({"error": "not found"}, status=404)
+
+    def do_POST(self):
+        payload = self._read_json()
+        if self._maybe_fail():
+            return
+
+        if self.path.startswith("/api/embeddings"):
+            self._send_json({"embedding": self.embeddings._embed(payload.get("prompt", ""))})
+        elif self.path.startswith("/api/embed"):
+            inputs = payload.get("input", "")
+            inputs = [inputs] if isinstance(inputs, str) else inputs
+            self._send_json({"model": payload.get("model"), "embeddings": [self.embeddings._embed(t) for t in inputs]})
+        else:
+            self._send_json({"error": "not found"}, status=404)
+
+
+def _tool_arguments(tool: Dict[str, Any], question: str) -> Dict[str, Any]:
+    properties = tool.get("function", {}).get("parameters", {}).get("properties", {})
+    arguments = {}
+    for name, schema in properties.items():
+        if name in ("query", "question", "text"):
+            arguments[name] = question[:200]
+        elif schema.get("type") == "integer":
+            arguments[name] = 3
+    return arguments
+
+
+def _needs_tool_call(messages: List[Dict[str, Any]], tools: List[Dict[str, Any]]) -> bool:
+    if not tools or not messages:
+        return False
+    last = messages[-1]
+    if last.get("role") == "tool":
+        return False
+    # OpenRouterLLM sends tool results back as a user message right after an
+    # empty assistant turn; treat that shape as "results already delivered"
+    if len(messages) >= 2 and messages[-2].get("role") == "assistant" and not messages[-2].get("content"):
+        return False
+    return last.get("role") == "user"
+
+
+def chat_reply(request: Dict[str, Any]) -> Dict[str, Any]:
+    """Deterministic assistant message for a chat/completions request."""
+    messages = request.get("messages", [])
+    tools = request.get("tools") or []
+    question = next((m.get("content") or "" for m in reversed(messages) if m.get("role") == "user"), "")
+    digest = hashlib.sha256(json.dumps(messages, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+    if _needs_tool_call(messages, tools) and request.get("tool_choice") != "none":
+        tool = next(
+            (t for t in tools if t["function"]["name"] == "search_notes"),
+            tools[int(digest[:8], 16) % len(tools)]
+        )
+        return {
+            "role": "assistant",
+            "content": None,
+            "tool_calls": [{
+                "id": f"call_{digest[:12]}",
+                "type": "function",
+                "function": {"name": tool["function"]["name"], "arguments": json.dumps(_tool_arguments(tool, question), ensure_ascii=False)},
+            }],
+        }
+
+    words = question.split()[:12]
+    content = f"[{digest[:6]}] " + ("Ответ по заметкам: " + " ".join(words) if words else "Готово.")
+    return {"role": "assistant", "content": content}
+
+
+def _estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 3)
+
+
+class OpenAIHandler(_JsonHandler):
+    def do_GET(self):
+        if self.path.rstrip("/").endswith("/models"):
+            self._send_json({"object": "list", "data": [{"id": "fake-chat", "object": "model"}]})
+        else:
+            self._send_json({"error": "not found"}, status=404)
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json({"error": "not found"}, status=404)
+            return
+
+        request = self._read_json()
+        if self._maybe_fail():
+            return
+
+        message = chat_reply(request)
+        prompt_tokens = _estimate_tokens(json.dumps(request.get("messages", []), ensure_ascii=False))
+        completion_tokens = _estimate_tokens(message.get("content") or json.dumps(message.get("tool_calls")))
+        completion_id = "chatcmpl-" + hashlib.md5(json.dumps(request, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+        model = request.get("model", "fake-chat")
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens, "total_tokens": prompt_tokens + completion_tokens}
+
+        tps = self.behaviour.config.tokens_per_second
+        if request.get("stream"):
+            self._stream(completion_id, model, message, usage, tps)
+            return
+
+        if tps:
+            time.sleep(completion_tokens / tps)
+        self._send_json({
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": 0,
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": message,
+                "finish_reason": "tool_calls" if message.get("tool_calls") else "stop",
+            }],
+            "usage": usage,
+        })
+
+    def _stream(self, completion_id: str, model: str, message: Dict[str, Any], usage: Dict[str, int], tps: float):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        def emit(delta: Dict[str, Any], finish_reason: Optional[str] = None, with_usage: bool = False):
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": 0,
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            }
+            if with_usage:
+                chunk["usage"] = usage
+            self.wfile.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+
+        emit({"role": "assistant", "content": ""})
+        if message.get("tool_calls"):
+            for index, call in enumerate(message["tool_calls"]):
+                emit({"tool_calls": [{"index": index, **call}]})
+            emit({}, finish_reason="tool_calls", with_usage=True)
+        else:
+            for word in message["content"].split(" "):
+                if tps:
+                    time.sleep(1 / tps)
+                emit({"content": word + " "})
+            emit({}, finish_reason="stop", with_usage=True)
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+
+class FakeServer:
+    def __init__(self, handler_cls, config: FakeServerConfig, host: str = "127.0.0.1", port: int = 0, **attrs):
+        self.config = config
+        self.behaviour = _Behaviour(config)
+        handler = type(handler_cls.__name__, (handler_cls,), {"behaviour": self.behaviour, **attrs})
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name=f"fake-{handler_cls.__name__}", daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeServer":
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def stats(self) -> Dict[str, int]:
+        return {"requests": self.behaviour.requests, "errors": self.behaviour.errors}
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def fake_ollama(config: FakeServerConfig | None = None, port: int = 0) -> FakeServer:
+    config = config or FakeServerConfig()
+    return FakeServer(OllamaHandler, config, port=port, embeddings=HashingEmbeddings(dim=config.dim))
+
+
+def fake_openai(config: FakeServerConfig | None = None, port: int = 0) -> FakeServer:
+    return FakeServer(OpenAIHandler, config or FakeServerConfig(), port=port)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ollama-port", type=int, default=11500)
+    parser.add_argument("--openai-port", type=int, default=11501)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=500)
+    parser.add_argument("--tokens-per-second", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--dim", type=int, default=256)
+    args = parser.parse_args()
+
+    config = FakeServerConfig(
+        latency=args.latency, jitter=args.jitter, error_rate=args.error_rate, error_status=args.error_status,
+        seed=args.seed, dim=args.dim, tokens_per_second=args.tokens_per_second,
+    )
+    servers = [fake_ollama(config, args.ollama_port).start(), fake_openai(config, args.openai_port).start()]
+    print(f"Ollama embeddings: {servers[0].url}\nOpenAI chat:       {servers[1].url}/api/v1")
+
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        for server in servers:
+            server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,266 @@
+"""Concurrent load test: N simulated users against one shared RAGAssistant and ReActAgent.
+
+Runs fully offline: the embedding model and the chat LLM talk HTTP to the local
+fake servers from benchmarks.fake_servers, so client, serialisation and
+connection costs are part of the measurement. Every user has its own agent
+session and picks operations from a weighted mix, pausing for an exponential
+think time between them.
+
+    python -m benchmarks.loadtest --users 8 --duration 30 --think 0.5 \\
+        --mix rag_query=0.5,agent_answer=0.3,crud=0.2 --llm-latency 0.2 --output load.json
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from contextlib import ExitStack
+from pathlib import Path
+from typing import Dict, List
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT))
+
+from benchmarks.fake_servers import FakeServerConfig, fake_ollama, fake_openai
+from benchmarks.vault import VaultSpec, generate_vault, sample_queries
+from MONITORING.metrics import percentile
+
+
+OPERATIONS = ("rag_query", "agent_answer", "crud")
+ENV_OVERRIDES = ("OLLAMA_BASE_URL", "OPENROUTER_BASE_URL", "OPENROUTER_API")
+
+
+def parse_mix(text: str) -> Dict[str, float]:
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise ValueError(f"Unknown operation {name!r}, expected one of {OPERATIONS}")
+        mix[name] = float(weight)
+    if sum(mix.values()) <= 0:
+        raise ValueError("Operation mix needs a positive total weight")
+    return mix
+
+
+class Recorder:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.error_samples: Dict[str, str] = {}
+
+    def record(self, operation: str, seconds: float, error: str | None = None):
+        with self._lock:
+            self.latencies[operation].append(seconds)
+            if error:
+                self.errors[operation] += 1
+                self.error_samples.setdefault(operation, error[:200])
+
+    def summary(self, elapsed: float) -> Dict[str, Dict]:
+        def describe(samples: List[float], errors: int) -> Dict:
+            ordered = sorted(samples)
+            return {
+                "requests": len(samples),
+                "errors": errors,
+                "error_rate": round(errors / len(samples), 4) if samples else 0.0,
+                "throughput_rps": round(len(samples) / elapsed, 3),
+                "p50_ms": round(percentile(ordered, 0.5) * 1000, 2),
+                "p95_ms": round(percentile(ordered, 0.95) * 1000, 2),
+                "p99_ms": round(percentile(ordered, 0.99) * 1000, 2),
+            }
+
+        with self._lock:
+            per_operation = {op: describe(s, self.errors[op]) for op, s in self.latencies.items()}
+            everything = [v for s in self.latencies.values() for v in s]
+            per_operation["total"] = describe(everything, sum(self.errors.values()))
+            per_operation["error_samples"] = dict(self.error_samples)
+        return per_operation
+
+
+class SimulatedUser(threading.Thread):
+    def __init__(self, user_id: int, env: "LoadEnvironment", recorder: Recorder, deadline: float, args):
+        super().__init__(name=f"user-{user_id}", daemon=True)
+        self.user_id = user_id
+        self.env = env
+        self.recorder = recorder
+        self.deadline = deadline
+        self.args = args
+        self.rng = random.Random(args.seed * 1000 + user_id)
+        self.session = env.agent.new_session()
+        self.created: List[str] = []
+        self.counter = 0
+
+    def run(self):
+        operations, weights = zip(*self.env.mix.items())
+        while time.monotonic() < self.deadline:
+            operation = self.rng.choices(operations, weights)[0]
+            start = time.perf_counter()
+            try:
+                error = getattr(self, operation)()
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+            self.recorder.record(operation, time.perf_counter() - start, error)
+
+            if self.args.think > 0:
+                time.sleep(min(self.rng.expovariate(1 / self.args.think), max(0.0, self.deadline - time.monotonic())))
+
+    def rag_query(self):
+        self.env.rag.query(self.rng.choice(self.env.queries), k=self.args.k)
+
+    def agent_answer(self):
+        question = self.rng.choice(self.env.questions)
+        answer = self.env.agent.answer(question, session=self.session)
+        # ReActAgent.answer reports failures as text instead of raising
+        return answer if answer.startswith("Ошибка:") else None
+
+    def crud(self):
+        tools = self.env.tools
+        if not self.created or self.rng.random() < 0.4:
+            self.counter += 1
+            title = f"load_u{self.user_id}_{self.counter}"
+            result = tools["create_note"].invoke({"title": title, "content": f"Нагрузочный тест {self.counter}"})
+            self.created.append(f"{title}.md")
+        else:
+            filename = self.rng.choice(self.created)
+            action = self.rng.choice(["read", "edit", "delete"])
+            if action == "read":
+                result = tools["read_note"].invoke({"filename": filename})
+            elif action == "edit":
+                result = tools["edit_note"].invoke({"filename": filename, "content": "Обновлено", "title": filename[:-3]})
+            else:
+                result = tools["delete_note"].invoke({"filename": filename})
+                self.created.remove(filename)
+
+        payload = json.loads(result) if isinstance(result, str) else result
+        return payload.get("message", "error") if payload.get("status") == "error" else None
+
+
+class LoadEnvironment:
+    def __init__(self, args):
+        self.args = args
+        self.mix = parse_mix(args.mix)
+        # Everything started is registered here, so a failure part-way through is undone as well
+        self._resources = ExitStack()
+        try:
+            self._start(args)
+        except BaseException:
+            self._resources.close()
+            raise
+
+    def _start(self, args):
+        self.workdir = tempfile.TemporaryDirectory(prefix="notes-load-")
+        self._resources.callback(self.workdir.cleanup)
+        base = Path(self.workdir.name)
+
+        self.ollama = fake_ollama(FakeServerConfig(
+            latency=args.embed_latency, jitter=args.embed_latency / 2, seed=args.seed
+        )).start()
+        self._resources.callback(self.ollama.stop)
+        self.llm_server = fake_openai(FakeServerConfig(
+            latency=args.llm_latency, jitter=args.llm_latency / 2, seed=args.seed + 1
+        )).start()
+        self._resources.callback(self.llm_server.stop)
+
+        # The clients read their endpoints from the environment; close() puts it back
+        self._resources.callback(self._restore_env, {name: os.environ.get(name) for name in ENV_OVERRIDES})
+        os.environ["OLLAMA_BASE_URL"] = self.ollama.url
+        os.environ["OPENROUTER_BASE_URL"] = f"{self.llm_server.url}/api/v1"
+        os.environ.setdefault("OPENROUTER_API", "offline-load-test")
+
+        vault = generate_vault(base / "vault", VaultSpec(notes=args.notes, seed=args.seed, extension=args.extension))
+        self.queries = sample_queries(200, seed=args.seed)
+        self.questions = [f"Найди в заметках: {q}" for q in self.queries[:50]] + [f"Explain {q}" for q in self.queries[50:100]]
+
+        from RAG.notes_rag import RAGAssistant
+        from AGENT.react_agent import ReActAgent
+
+        self.rag = RAGAssistant(str(vault.root), persist_dir=str(base / "store"))
+        for path in vault.files:
+            self.rag.updater.update_handler(str(path), "created")
+
+        self.agent = ReActAgent(
+            notes_dir=str(vault.root),
+            persist_dir=str(base / "store"),
+            rag_assistant=self.rag,
+            checkpoint_path=str(base / "checkpoints.sqlite"),
+        )
+        self.tools = {t.name: t for t in self.agent.tools_functions}
+
+        # Failures are injected only once the vault is indexed
+        self.ollama.config.error_rate = args.error_rate
+        self.llm_server.config.error_rate = args.error_rate
+
+    @staticmethod
+    def _restore_env(saved: Dict[str, str | None]):
+        for name, value in saved.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+    def server_stats(self) -> Dict[str, Dict[str, int]]:
+        return {"ollama": self.ollama.stats(), "llm": self.llm_server.stats()}
+
+    def close(self):
+        self._resources.close()
+
+
+def run_load(args) -> Dict:
+    env = LoadEnvironment(args)
+    try:
+        recorder = Recorder()
+        deadline = time.monotonic() + args.duration
+        users = [SimulatedUser(i, env, recorder, deadline, args) for i in range(args.users)]
+
+        started = time.perf_counter()
+        for user in users:
+            user.start()
+            if args.ramp_up:
+                time.sleep(args.ramp_up / args.users)
+        for user in users:
+            user.join()
+        elapsed = time.perf_counter() - started
+
+        return {
+            "params": {k: v for k, v in vars(args).items() if k != "output"},
+            "elapsed_s": round(elapsed, 3),
+            "operations": recorder.summary(elapsed),
+            "servers": env.server_stats(),
+        }
+    finally:
+        env.close()
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=4)
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds of load")
+    parser.add_argument("--ramp-up", type=float, default=0.0, help="seconds to spread user start over")
+    parser.add_argument("--think", type=float, default=0.5, help="mean think time between operations, seconds")
+    parser.add_argument("--mix", default="rag_query=0.5,agent_answer=0.3,crud=0.2")
+    parser.add_argument("--notes", type=int, default=100)
+    parser.add_argument("--extension", default=".md", choices=[".md", ".txt"])
+    parser.add_argument("-k", type=int, default=5)
+    parser.add_argument("--embed-latency", type=float, default=0.01)
+    parser.add_argument("--llm-latency", type=float, default=0.2)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="injected error rate on both fake servers")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=str, default=None)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    report = json.dumps(run_load(args), indent=2, ensure_ascii=False)
+    if args.output:
+        Path(args.output).write_text(report, encoding="utf-8")
+    print(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""Indexing benchmark for the logging setup: synchronous handlers vs the queue listener.
+
+Each configuration indexes the same synthetic notes one file at a time through
+IncrementalHandler, the path the watcher takes, in a fresh interpreter with
+NOTES_LOG_ASYNC and the log levels set from the environment. Embeddings come
+from a local hashing stand-in, so no Ollama is needed.
+
+    python -m benchmarks.logging_bench --files 200 --repeat 3 --output logging.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+CONFIGURATIONS = {
+    "sync_debug": {"NOTES_LOG_ASYNC": "0", "NOTES_FILE_LOG_LEVEL": "DEBUG"},
+    "queue_debug": {"NOTES_LOG_ASYNC": "1", "NOTES_FILE_LOG_LEVEL": "DEBUG"},
+    "queue_info": {"NOTES_LOG_ASYNC": "1", "NOTES_FILE_LOG_LEVEL": "INFO"},
+}
+
+INDEXING_SNIPPET = """
+import hashlib, json, sys, time
+from pathlib import Path
+sys.path.insert(0, {root!r})
+from RAG.components.documents_processor import DocumentsProcessor
+from RAG.components.vectorstorage import ChromaVectorStorage
+from RAG.components.updater import IncrementalHandler
+
+
+class HashEmbeddingModel:
+    def _embed(self, text):
+        digest = hashlib.sha256(text.encode("utf-8")).digest()
+        return [b / 255.0 for b in digest]
+
+    def embed_documents(self, texts):
+        return [self._embed(t) for t in texts]
+
+    def embed_query(self, text):
+        return self._embed(text)
+
+
+storage = ChromaVectorStorage({persist!r})
+storage.collection
+handler = IncrementalHandler(storage, HashEmbeddingModel(), DocumentsProcessor(chunk_size=300, chunk_overlap=50))
+files = sorted(str(p) for p in Path({notes!r}).glob("*.txt"))
+
+start = time.perf_counter()
+for filepath in files:
+    handler.update_handler(filepath, "created")
+elapsed = time.perf_counter() - start
+
+print(json.dumps({{"seconds": elapsed, "files": len(files)}}))
+"""
+
+
+def write_notes(notes_dir: Path, count: int):
+    paragraph = "Заметка о векторном поиске и индексации. Notes about retrieval and chunking. "
+    for i in range(count):
+        body = "\n\n".join(f"{i}-{j}: " + paragraph * 4 for j in range(6))
+        (notes_dir / f"note_{i:04d}.txt").write_text(body, encoding="utf-8")
+
+
+def run_configuration(env_overrides: dict, notes: str) -> dict:
+    with tempfile.TemporaryDirectory() as persist, tempfile.TemporaryDirectory() as log_dir:
+        env = dict(os.environ, PYTHONDONTWRITEBYTECODE="1", NOTES_LOG_DIR=log_dir, **env_overrides)
+        result = subprocess.run(
+            [sys.executable, "-c", INDEXING_SNIPPET.format(root=str(ROOT), notes=notes, persist=persist)],
+            cwd=tempfile.gettempdir(),
+            capture_output=True,
+            text=True,
+            env=env,
+            check=True,
+        )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", type=str, default=None)
+    args = parser.parse_args()
+
+    results = {"files": args.files, "configurations": {}}
+
+    with tempfile.TemporaryDirectory() as notes:
+        write_notes(Path(notes), args.files)
+
+        for name, env_overrides in CONFIGURATIONS.items():
+            samples = [run_configuration(env_overrides, notes)["seconds"] for _ in range(args.repeat)]
+            results["configurations"][name] = {
+                "median": round(statistics.median(samples), 4),
+                "min": round(min(samples), 4),
+                "files_per_second": round(args.files / statistics.median(samples), 1),
+            }
+
+    baseline = results["configurations"]["sync_debug"]["median"]
+    for name, stats in results["configurations"].items():
+        stats["speedup_vs_sync"] = round(baseline / stats["median"], 3)
+
+    report = json.dumps(results, indent=2, ensure_ascii=False)
+    if args.output:
+        Path(args.output).write_text(report, encoding="utf-8")
+    print(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,298 @@
+"""Retrieval quality vs. latency: recall@k, MRR and query latency over a parameter grid.
+
+Every combination of chunker, chunk size, backend and HNSW setting is indexed from
+scratch and queried with the same golden query -> note pairs. Relevance is
+judged per note: a hit is any chunk whose source is one of the expected notes.
+The "numpy" backend is exact brute-force cosine search, so it gives the quality
+ceiling for the embeddings; the "chroma" rows also report ann_recall, the overlap
+of their top-k chunks with the exact top-k.
+
+By default the vault is synthetic and each golden query is a shuffled, shortened
+sentence taken from its note. A real vault can be evaluated with a golden file
+holding [{"query": "...", "relevant": ["folder/note.md", ...]}, ...], paths
+relative to --vault:
+
+    python -m benchmarks.retrieval_eval --notes 300 --chunk-sizes 500 1000 \\
+        --m 16 32 --construction-ef 100 200 --search-ef 10 50 100 --output eval.json
+    python -m benchmarks.retrieval_eval --vault ~/notes --golden golden.json --ollama
+    python -m benchmarks.retrieval_eval --chunkers recursive markdown --chunk-sizes 300 1000 --backends numpy
+
+The chosen values go into ChromaVectorStorage(hnsw=HnswParams(...)) or the
+NOTES_HNSW_M / NOTES_HNSW_CONSTRUCTION_EF / NOTES_HNSW_SEARCH_EF variables, and
+the chunker into DocumentsProcessor(chunker=...) or NOTES_CHUNKER. split_s is the
+splitting time alone, without loading; "recursive" rows split what the .md loader
+returns (Unstructured text), "markdown" rows split the raw file, as
+DocumentsProcessor does in each mode. --postprocess adds "numpy+post" rows: the
+same candidates through PostProcessor, with context_chars (what goes into the
+prompt) next to the plain top-k rows; their latency is the post-processing alone.
+"""
+import argparse
+import itertools
+import json
+import random
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT))
+
+from benchmarks.vault import VaultSpec, generate_vault
+from benchmarks.standins import HashingEmbeddings
+from MONITORING.metrics import percentile
+
+
+class NumpyIndex:
+    """Exact cosine search over a dense matrix; the reference backend."""
+
+    def __init__(self, embeddings: Sequence[Sequence[float]], sources: List[str]):
+        matrix = np.asarray(embeddings, dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        self.matrix = matrix / np.where(norms == 0, 1, norms)
+        self.sources = sources
+
+    def search(self, query: Sequence[float], k: int) -> List[int]:
+        vector = np.asarray(query, dtype=np.float32)
+        vector /= np.linalg.norm(vector) or 1
+        scores = self.matrix @ vector
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        return top[np.argsort(-scores[top])].tolist()
+
+
+def golden_from_vault(vault, count: int, seed: int) -> List[Dict]:
+    """One query per sampled note: a shuffled subset of one of its sentences."""
+    rng = random.Random(seed + 2)
+    pairs = []
+    for path in rng.sample(vault.files, min(count, len(vault.files))):
+        text = path.read_text(encoding="utf-8")
+        sentences = [s.strip() for s in text.replace("\n", " ").split(".") if len(s.split()) >= 8 and "#" not in s]
+        if not sentences:
+            continue
+        words = rng.choice(sentences).split()
+        rng.shuffle(words)
+        pairs.append({"query": " ".join(words[:max(5, len(words) * 2 // 3)]), "relevant": [str(path)]})
+    return pairs
+
+
+def load_golden(path, vault_root: Path) -> List[Dict]:
+    pairs = json.loads(Path(path).read_text(encoding="utf-8"))
+    return [{"query": p["query"], "relevant": [str(vault_root / r) for r in p["relevant"]]} for p in pairs]
+
+
+def chunk_vault(files: List[Path], chunk_size: int, overlap: float, chunker: str = "recursive"):
+    from RAG.components.documents_processor import DocumentsProcessor
+
+    processor = DocumentsProcessor(chunk_size=chunk_size, chunk_overlap=int(chunk_size * overlap), chunker=chunker)
+    documents = [document for path in files for document in processor.load_document(str(path))]
+    start = time.perf_counter()
+    chunks = processor.split(documents)
+    return chunks, time.perf_counter() - start
+
+
+def score(ranked_sources: List[List[str]], golden: List[Dict], k: int) -> Dict[str, float]:
+    recall = reciprocal = 0.0
+    for sources, pair in zip(ranked_sources, golden):
+        relevant = set(pair["relevant"])
+        # Several chunks of one note count once, at the rank of the first
+        notes = list(dict.fromkeys(sources))[:k]
+        recall += len(relevant.intersection(notes)) / len(relevant)
+        rank = next((i for i, source in enumerate(notes, 1) if source in relevant), None)
+        reciprocal += 1 / rank if rank else 0.0
+    return {f"recall@{k}": round(recall / len(golden), 4), "mrr": round(reciprocal / len(golden), 4)}
+
+
+def latency(samples: List[float]) -> Dict[str, float]:
+    ordered = sorted(samples)
+    return {
+        "p50_ms": round(percentile(ordered, 0.5) * 1000, 3),
+        "p95_ms": round(percentile(ordered, 0.95) * 1000, 3),
+    }
+
+
+def evaluate_numpy(embeddings, sources, query_vectors, golden, k, fetch):
+    start = time.perf_counter()
+    index = NumpyIndex(embeddings, sources)
+    build = time.perf_counter() - start
+
+    timings, ranked, exact = [], [], []
+    for vector in query_vectors:
+        q_start = time.perf_counter()
+        top = index.search(vector, fetch)
+        timings.append(time.perf_counter() - q_start)
+        exact.append(top[:k])
+        ranked.append([sources[i] for i in top])
+    return {"build_s": round(build, 4), **score(ranked, golden, k), **latency(timings)}, exact, index
+
+
+def evaluate_postprocess(index, texts, query_vectors, golden, k, fetch, margin=None):
+    """Top fetch candidates through PostProcessor, as RAGAssistant.query_refined does."""
+    from RAG.components.postprocess import PostProcessor
+
+    processor = PostProcessor(k=k, margin=margin)
+    timings, ranked, chars = [], [], []
+    for vector, pair in zip(query_vectors, golden):
+        top = index.search(vector, fetch)
+        query = np.asarray(vector, dtype=np.float32)
+        query /= np.linalg.norm(query) or 1
+        candidates = index.matrix[top]
+        results = {
+            "ids": [top],
+            "documents": [[texts[i] for i in top]],
+            "metadatas": [[{"source": index.sources[i]} for i in top]],
+            "distances": [(1 - candidates @ query).tolist()],
+            "embeddings": [candidates],
+        }
+        start = time.perf_counter()
+        refined = processor.apply(results, pair["query"], query)
+        timings.append(time.perf_counter() - start)
+        ranked.append([m["source"] for m in refined["metadatas"][0]])
+        chars.append(sum(map(len, refined["documents"][0])))
+    return {**score(ranked, golden, k), "context_chars": round(float(np.mean(chars))), **latency(timings)}
+
+
+def evaluate_chroma(chunks, embeddings, query_vectors, golden, k, fetch, hnsw, exact, workdir):
+    from RAG.components.vectorstorage import ChromaVectorStorage
+
+    store_dir = tempfile.mkdtemp(dir=workdir, prefix="chroma-")
+    storage = ChromaVectorStorage(persist_directory=store_dir, hnsw=hnsw)
+    position = {chunk_id: i for i, chunk_id in enumerate(chunks.ids())}
+
+    start = time.perf_counter()
+    storage.add_documents(chunks, embeddings)
+    build = time.perf_counter() - start
+
+    timings, ranked, overlap = [], [], 0.0
+    for vector, truth in zip(query_vectors, exact):
+        q_start = time.perf_counter()
+        results = storage.search(vector, k=fetch)
+        timings.append(time.perf_counter() - q_start)
+        found = results["ids"][0]
+        ranked.append([m.get("source", "") for m in results["metadatas"][0]])
+        overlap += len({position[i] for i in found[:k]}.intersection(truth)) / max(1, len(truth))
+
+    shutil.rmtree(store_dir, ignore_errors=True)
+    return {
+        "build_s": round(build, 4),
+        **score(ranked, golden, k),
+        "ann_recall": round(overlap / len(exact), 4),
+        **latency(timings),
+    }
+
+
+def hnsw_grid(args):
+    from RAG.components.vectorstorage import HnswParams
+
+    return [
+        HnswParams(m=m, construction_ef=construction_ef, search_ef=search_ef)
+        for m, construction_ef, search_ef in itertools.product(args.m, args.construction_ef, args.search_ef)
+    ]
+
+
+def run_eval(args) -> Dict:
+    workdir = Path(tempfile.mkdtemp(prefix="notes-eval-"))
+    try:
+        if args.vault:
+            root = Path(args.vault)
+            files = sorted(p for p in root.rglob("*") if p.suffix in (".md", ".txt"))
+            if not args.golden:
+                raise SystemExit("--vault needs --golden with query -> note pairs")
+            golden = load_golden(args.golden, root)
+        else:
+            vault = generate_vault(workdir / "vault", VaultSpec(notes=args.notes, seed=args.seed, extension=args.extension))
+            files = vault.files
+            golden = load_golden(args.golden, vault.root) if args.golden else golden_from_vault(vault, args.queries, args.seed)
+
+        if args.ollama:
+            from RAG.components.embedding_model import EmbeddingModel
+            embedder = EmbeddingModel()
+        else:
+            embedder = HashingEmbeddings(dim=args.dim)
+        query_vectors = [embedder.embed_query(p["query"]) for p in golden]
+        # Extra candidates so that several chunks of one note do not push others out of the top k
+        fetch = args.k * args.fetch_factor
+
+        rows = []
+        for chunker, chunk_size in itertools.product(args.chunkers, args.chunk_sizes):
+            chunks, split = chunk_vault(files, chunk_size, args.overlap, chunker)
+            embeddings = embedder.embed_documents(chunks.texts)
+            sources = chunks.sources()
+            base = {"chunker": chunker, "chunk_size": chunk_size, "chunks": len(chunks), "split_s": round(split, 4)}
+
+            reference, exact, index = evaluate_numpy(embeddings, sources, query_vectors, golden, args.k, fetch)
+            if "numpy" in args.backends:
+                if args.postprocess:
+                    # What plain top-k puts into the prompt
+                    reference["context_chars"] = round(float(np.mean([sum(len(chunks.texts[i]) for i in top) for top in exact])))
+                rows.append({**base, "backend": "numpy", "m": None, "construction_ef": None, "search_ef": None, **reference})
+                if args.postprocess:
+                    result = evaluate_postprocess(index, chunks.texts, query_vectors, golden, args.k, fetch, args.margin)
+                    rows.append({**base, "backend": "numpy+post", "m": None, "construction_ef": None, "search_ef": None, **result})
+            if "chroma" in args.backends:
+                for hnsw in hnsw_grid(args):
+                    result = evaluate_chroma(chunks, embeddings, query_vectors, golden, args.k, fetch, hnsw, exact, workdir)
+                    rows.append({
+                        **base, "backend": "chroma",
+                        "m": hnsw.m, "construction_ef": hnsw.construction_ef, "search_ef": hnsw.search_ef,
+                        **result,
+                    })
+
+        return {
+            "params": {k: v for k, v in vars(args).items() if k != "output"},
+            "queries": len(golden),
+            "results": rows,
+        }
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def render(report: Dict) -> str:
+    rows = report["results"]
+    if not rows:
+        return "No results"
+    columns = list(dict.fromkeys(key for row in rows for key in row))
+    table = [columns] + [["-" if row.get(c) is None else str(row[c]) for c in columns] for row in rows]
+    widths = [max(len(line[i]) for line in table) for i in range(len(columns))]
+    return "\n".join("  ".join(cell.ljust(w) for cell, w in zip(line, widths)).rstrip() for line in table)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vault", default=None, help="evaluate a real vault instead of a synthetic one")
+    parser.add_argument("--golden", default=None, help="JSON list of {query, relevant} pairs")
+    parser.add_argument("--notes", type=int, default=200)
+    parser.add_argument("--extension", default=".md", choices=[".md", ".txt"])
+    parser.add_argument("--queries", type=int, default=100, help="generated golden pairs")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--dim", type=int, default=256, help="stand-in embedding size")
+    parser.add_argument("--ollama", action="store_true", help="use the real EmbeddingModel instead of the stand-in")
+    parser.add_argument("--chunkers", nargs="+", choices=["recursive", "markdown"], default=["recursive"])
+    parser.add_argument("--chunk-sizes", type=int, nargs="+", default=[1000])
+    parser.add_argument("--overlap", type=float, default=0.2, help="chunk overlap as a share of chunk size")
+    parser.add_argument("--backends", nargs="+", choices=["chroma", "numpy"], default=["chroma", "numpy"])
+    parser.add_argument("--m", type=int, nargs="+", default=[16])
+    parser.add_argument("--construction-ef", type=int, nargs="+", default=[100])
+    parser.add_argument("--search-ef", type=int, nargs="+", default=[10, 50, 100])
+    parser.add_argument("-k", type=int, default=5)
+    parser.add_argument("--postprocess", action="store_true", help="add numpy+post rows: cut-off, MMR and sentence trimming")
+    parser.add_argument("--margin", type=float, default=None, help="relative distance cut-off for numpy+post rows (off by default)")
+    parser.add_argument("--fetch-factor", type=int, default=3, help="chunks fetched per query = k * fetch-factor")
+    parser.add_argument("--output", default=None)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    report = run_eval(args)
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
+    print(render(report))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""In-process stand-ins for the embedding model and the chat LLM.
+
+Both are deterministic, so benchmark runs differ only by the code under test.
+They are plugged in behind the project's own wrappers (EmbeddingModel,
+BaseChatModel), so metrics, tracing and the rest of the pipeline still run.
+"""
+import hashlib
+import math
+import re
+import time
+from typing import Any, List
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+class HashingEmbeddings:
+    """Signed feature hashing of word tokens: texts sharing words get close vectors."""
+
+    def __init__(self, dim: int = 256, latency: float = 0.0, per_text_latency: float = 0.0):
+        self.dim = dim
+        self.latency = latency
+        self.per_text_latency = per_text_latency
+        self.calls = 0
+
+    def _embed(self, text: str) -> List[float]:
+        vector = [0.0] * self.dim
+        for token in _TOKEN_RE.findall(text.lower()):
+            digest = hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest()
+            index = int.from_bytes(digest[:4], "little") % self.dim
+            vector[index] += 1.0 if digest[4] & 1 else -1.0
+        norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+        return [v / norm for v in vector]
+
+    def _wait(self, texts: int):
+        delay = self.latency + self.per_text_latency * texts
+        if delay:
+            time.sleep(delay)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.calls += 1
+        self._wait(len(texts))
+        return [self._embed(t) for t in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        self.calls += 1
+        self._wait(1)
+        return self._embed(text)
+
+
+class StandInChatModel(BaseChatModel):
+    """Scripted ReAct model: asks for one search_notes call per turn, then answers from the results."""
+
+    latency: float = 0.0
+    tool_name: str = "search_notes"
+    use_tools: bool = False
+
+    @property
+    def _llm_type(self) -> str:
+        return "stand-in"
+
+    def bind_tools(self, tools, **kwargs) -> "StandInChatModel":
+        names = {getattr(t, "name", None) for t in tools}
+        return self.model_copy(update={"use_tools": self.tool_name in names})
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs: Any) -> ChatResult:
+        if self.latency:
+            time.sleep(self.latency)
+
+        last_human = max((i for i, m in enumerate(messages) if isinstance(m, HumanMessage)), default=0)
+        turn = messages[last_human:]
+        question = messages[last_human].content if messages else ""
+        tool_results = [m for m in turn if isinstance(m, ToolMessage)]
+
+        if self.use_tools and not tool_results:
+            message = AIMessage(content="", tool_calls=[{
+                "id": f"call_{hashlib.md5(question.encode('utf-8')).hexdigest()[:8]}",
+                "name": self.tool_name,
+                "args": {"query": question[:200], "k": 3},
+            }])
+        else:
+            context = tool_results[-1].content if tool_results else question
+            message = AIMessage(content=f"Ответ на «{question[:60]}»: {str(context)[:200]}")
+
+        prompt_chars = sum(len(str(m.content)) for m in messages)
+        message.usage_metadata = {
+            "input_tokens": prompt_chars // 3,
+            "output_tokens": len(message.content) // 3,
+            "total_tokens": prompt_chars // 3 + len(message.content) // 3,
+        }
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+def use_embeddings(assistant, embeddings) -> None:
+    """Swaps the Ollama client inside a RAGAssistant's EmbeddingModel for a stand-in."""
+    assistant.embedding_model._embedding_model = embeddings
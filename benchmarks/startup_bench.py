@@ -0,0 +1,116 @@
+"""Cold-start benchmark: import time of the entry modules and first-query latency.
+
+Every measurement runs in a fresh interpreter so module caches do not leak
+between runs. Embeddings come from a local hashing stand-in, so no Ollama is needed.
+
+    python -m benchmarks.startup_bench --repeat 5 --output startup.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+IMPORT_TARGETS = ["RAG.notes_rag", "AGENT.react_agent", "LLM.openrouter_llm"]
+
+IMPORT_SNIPPET = """
+import json, sys, time
+sys.path.insert(0, {root!r})
+start = time.perf_counter()
+import {module}
+print(json.dumps({{"seconds": time.perf_counter() - start}}))
+"""
+
+FIRST_QUERY_SNIPPET = """
+import hashlib, json, sys, time
+sys.path.insert(0, {root!r})
+start = time.perf_counter()
+from RAG.notes_rag import RAGAssistant
+imported = time.perf_counter()
+
+
+class HashEmbeddingModel:
+    def _embed(self, text):
+        digest = hashlib.sha256(text.encode("utf-8")).digest()
+        return [b / 255.0 for b in digest]
+
+    def embed_documents(self, texts):
+        return [self._embed(t) for t in texts]
+
+    def embed_query(self, text):
+        return self._embed(text)
+
+
+assistant = RAGAssistant({notes!r}, persist_dir={persist!r})
+assistant.embedding_model = HashEmbeddingModel()
+assistant.updater.embedding_model = assistant.embedding_model
+constructed = time.perf_counter()
+
+assistant.query("first query", k=3)
+first = time.perf_counter()
+assistant.query("second query", k=3)
+second = time.perf_counter()
+
+print(json.dumps({{
+    "import": imported - start,
+    "construct": constructed - imported,
+    "first_query": first - constructed,
+    "warm_query": second - first,
+    "total_to_first_answer": first - start,
+}}))
+"""
+
+
+def run_snippet(code: str) -> dict:
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=tempfile.gettempdir(),
+        capture_output=True,
+        text=True,
+        env=env,
+        check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def summarize(samples):
+    return {
+        "median": round(statistics.median(samples), 4),
+        "min": round(min(samples), 4),
+        "max": round(max(samples), 4),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", type=str, default=None)
+    args = parser.parse_args()
+
+    results = {"imports": {}, "first_query": {}}
+
+    for module in IMPORT_TARGETS:
+        samples = [run_snippet(IMPORT_SNIPPET.format(root=str(ROOT), module=module))["seconds"] for _ in range(args.repeat)]
+        results["imports"][module] = summarize(samples)
+
+    runs = []
+    for _ in range(args.repeat):
+        with tempfile.TemporaryDirectory() as notes, tempfile.TemporaryDirectory() as persist:
+            runs.append(run_snippet(FIRST_QUERY_SNIPPET.format(root=str(ROOT), notes=notes, persist=persist)))
+    for key in runs[0]:
+        results["first_query"][key] = summarize([r[key] for r in runs])
+
+    report = json.dumps(results, indent=2, ensure_ascii=False)
+    if args.output:
+        Path(args.output).write_text(report, encoding="utf-8")
+    print(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,270 @@
+"""Scenario benchmarks on a synthetic vault: indexing, watcher bursts and queries.
+
+Embeddings come from the in-process hashing stand-in, so the numbers cover the
+pipeline (loading, splitting, Chroma, bookkeeping) rather than Ollama. Every
+scenario is timed over --repeat runs and then run once more under tracemalloc
+for peak Python memory, so tracing overhead does not leak into the timings.
+
+    python -m benchmarks.suite --notes 300 --repeat 3 --output results.json
+    python -m benchmarks.suite --scenarios query query_many --queries 200
+"""
+import argparse
+import json
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Dict, List
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(ROOT))
+
+from benchmarks.vault import VaultSpec, generate_vault, sample_queries
+from benchmarks.standins import HashingEmbeddings, use_embeddings
+from MONITORING.metrics import percentile
+
+
+def latency_summary(samples: List[float]) -> Dict[str, float]:
+    ordered = sorted(samples)
+    return {
+        "p50_ms": round(percentile(ordered, 0.5) * 1000, 3),
+        "p95_ms": round(percentile(ordered, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(ordered, 0.99) * 1000, 3),
+    }
+
+
+class Context:
+    def __init__(self, args):
+        self.args = args
+        self.workdir = Path(tempfile.mkdtemp(prefix="notes-bench-"))
+        self.vault = generate_vault(self.workdir / "vault", VaultSpec(
+            notes=args.notes,
+            median_words=args.median_words,
+            depth=args.depth,
+            seed=args.seed,
+            extension=args.extension,
+        ))
+        self.queries = sample_queries(args.queries, seed=args.seed)
+        self._indexed_dir = None
+
+    def new_assistant(self, persist_dir=None):
+        from RAG.notes_rag import RAGAssistant
+
+        persist_dir = persist_dir or tempfile.mkdtemp(dir=self.workdir, prefix="store-")
+        assistant = RAGAssistant(str(self.vault.root), persist_dir=persist_dir)
+        use_embeddings(assistant, HashingEmbeddings(dim=self.args.dim))
+        return assistant
+
+    def indexed_assistant(self):
+        # Built once through the per-file path, which works for both .md and .txt vaults
+        if self._indexed_dir is None:
+            self._indexed_dir = tempfile.mkdtemp(dir=self.workdir, prefix="indexed-")
+            assistant = self.new_assistant(self._indexed_dir)
+            for path in self.vault.files:
+                assistant.updater.update_handler(str(path), "created")
+        return self.new_assistant(self._indexed_dir)
+
+    def cleanup(self):
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+
+def scenario_initial_indexing(ctx: Context) -> Callable[[], Dict]:
+    # initial_indexing() goes through DocumentsProcessor.load_documents, which only globs **/*.md
+    if ctx.args.extension != ".md":
+        raise ValueError(f"initial_indexing only loads .md notes, the vault has {ctx.args.extension}")
+
+    assistant = ctx.new_assistant()
+    processor = assistant.documents_processor
+    load_documents = processor.load_documents
+    loaded = []
+
+    def recording_load(notes_path):
+        documents = load_documents(notes_path)
+        loaded[:] = documents
+        return documents
+
+    processor.load_documents = recording_load
+
+    def run():
+        start = time.perf_counter()
+        assistant.initial_indexing()
+        seconds = time.perf_counter() - start
+        chunks = assistant.vectorstorage.collection.count()
+        if not chunks:
+            raise RuntimeError(f"initial_indexing stored no chunks from {len(loaded)} loaded notes")
+        # Rates cover what was actually loaded, not the files generated into the vault
+        loaded_bytes = sum(len(doc.page_content.encode("utf-8")) for doc in loaded)
+        return {
+            "seconds": seconds,
+            "notes": len(loaded),
+            "chunks": chunks,
+            "notes_per_second": len(loaded) / seconds,
+            "mb_per_second": loaded_bytes / 1e6 / seconds,
+        }
+
+    return run
+
+
+def scenario_watcher_burst(ctx: Context) -> Callable[[], Dict]:
+    from watchdog.events import FileModifiedEvent
+    from RAG.components.notes_handler import NotesHandler
+
+    assistant = ctx.indexed_assistant()
+    latencies = []
+
+    def callback(filepath, event_type):
+        start = time.perf_counter()
+        assistant.updater.update_handler(filepath, event_type)
+        latencies.append(time.perf_counter() - start)
+
+    handler = NotesHandler(callback)
+    edited = ctx.vault.files[:ctx.args.burst]
+    for i, path in enumerate(edited):
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(f"\n\nПравка {i}: burst edit line.\n")
+
+    def run():
+        latencies.clear()
+        start = time.perf_counter()
+        for path in edited:
+            handler.on_modified(FileModifiedEvent(str(path)))
+        seconds = time.perf_counter() - start
+        return {"seconds": seconds, "events": len(edited), "events_per_second": len(edited) / seconds, **latency_summary(latencies)}
+
+    return run
+
+
+def scenario_query(ctx: Context) -> Callable[[], Dict]:
+    assistant = ctx.indexed_assistant()
+
+    def run():
+        latencies = []
+        start = time.perf_counter()
+        for query in ctx.queries:
+            q_start = time.perf_counter()
+            assistant.query(query, k=ctx.args.k)
+            latencies.append(time.perf_counter() - q_start)
+        seconds = time.perf_counter() - start
+        return {"seconds": seconds, "queries_per_second": len(ctx.queries) / seconds, **latency_summary(latencies)}
+
+    return run
+
+
+def scenario_query_many(ctx: Context) -> Callable[[], Dict]:
+    assistant = ctx.indexed_assistant()
+    batch = ctx.args.batch
+    batches = [ctx.queries[i:i + batch] for i in range(0, len(ctx.queries), batch)]
+
+    def run():
+        latencies = []
+        start = time.perf_counter()
+        for queries in batches:
+            b_start = time.perf_counter()
+            assistant.query_many(queries, k=ctx.args.k)
+            latencies.append(time.perf_counter() - b_start)
+        seconds = time.perf_counter() - start
+        return {
+            "seconds": seconds,
+            "queries_per_second": len(ctx.queries) / seconds,
+            "batch_size": batch,
+            **{f"batch_{k}": v for k, v in latency_summary(latencies).items()},
+        }
+
+    return run
+
+
+SCENARIOS = {
+    "initial_indexing": scenario_initial_indexing,
+    "watcher_burst": scenario_watcher_burst,
+    "query": scenario_query,
+    "query_many": scenario_query_many,
+}
+
+
+def run_scenario(name: str, ctx: Context, repeat: int, memory: bool) -> Dict:
+    runs = [SCENARIOS[name](ctx)() for _ in range(repeat)]
+    result = {key: round(statistics.median(r[key] for r in runs), 6) for key in runs[0]}
+    result["seconds_min"] = round(min(r["seconds"] for r in runs), 6)
+    result["seconds_samples"] = [round(r["seconds"], 6) for r in runs]
+
+    if memory:
+        prepared = SCENARIOS[name](ctx)
+        tracemalloc.start()
+        try:
+            prepared()
+            result["peak_mb"] = round(tracemalloc.get_traced_memory()[1] / 1e6, 3)
+        finally:
+            tracemalloc.stop()
+    return result
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return "unknown"
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--notes", type=int, default=200)
+    parser.add_argument("--median-words", type=int, default=250)
+    parser.add_argument("--depth", type=int, default=3)
+    parser.add_argument("--extension", default=".md", choices=[".md", ".txt"])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--dim", type=int, default=256, help="stand-in embedding size")
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--batch", type=int, default=16, help="queries per query_many call")
+    parser.add_argument("--burst", type=int, default=50, help="files edited in the watcher burst")
+    parser.add_argument("-k", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc pass")
+    parser.add_argument("--output", type=str, default=None)
+    return parser
+
+
+def run_suite(args) -> Dict:
+    ctx = Context(args)
+    results = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "params": {k: v for k, v in vars(args).items() if k != "output"},
+            "vault": {"notes": len(ctx.vault.files), "bytes": ctx.vault.total_bytes},
+        },
+        "scenarios": {},
+    }
+
+    try:
+        for name in args.scenarios:
+            try:
+                results["scenarios"][name] = run_scenario(name, ctx, args.repeat, not args.no_memory)
+            except Exception as e:
+                results["scenarios"][name] = {"error": f"{type(e).__name__}: {e}"}
+    finally:
+        ctx.cleanup()
+    return results
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    results = run_suite(args)
+
+    report = json.dumps(results, indent=2, ensure_ascii=False)
+    if args.output:
+        Path(args.output).write_text(report, encoding="utf-8")
+    print(report)
+
+
+if __name__ == "__main__":
+    main()
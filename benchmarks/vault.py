@@ -0,0 +1,158 @@
+"""Deterministic synthetic vault: Markdown notes in Russian and English under nested folders.
+
+The same seed and parameters always produce byte-identical files, so results
+from different commits are measured on the same input.
+
+    python -m benchmarks.vault ./bench_vault --notes 500 --depth 3 --seed 7
+"""
+import argparse
+import math
+import random
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List
+
+
+TOPICS = {
+    "ru": [
+        ("Векторный поиск", "эмбеддинги индекс косинусное расстояние ближайшие соседи запрос релевантность"),
+        ("Алгоритмы", "сортировка граф динамическое программирование сложность рекурсия массив"),
+        ("Python", "генераторы декораторы асинхронность типизация пакеты виртуальное окружение"),
+        ("Базы данных", "транзакции индексы репликация шардирование запросы нормализация"),
+        ("Личные заметки", "планы встречи книги идеи путешествия привычки цели"),
+        ("Машинное обучение", "модель обучение валидация переобучение признаки градиент метрика"),
+    ],
+    "en": [
+        ("Vector search", "embeddings index cosine distance nearest neighbours query relevance"),
+        ("Algorithms", "sorting graph dynamic programming complexity recursion array"),
+        ("Python", "generators decorators asyncio typing packages virtual environment"),
+        ("Databases", "transactions indexes replication sharding queries normalization"),
+        ("Journal", "plans meetings books ideas travel habits goals"),
+        ("Machine learning", "model training validation overfitting features gradient metric"),
+    ],
+}
+
+FILLER = {
+    "ru": "это и в на с по для как что при от до из но же или также потому поэтому если когда".split(),
+    "en": "the and of to in for with on as that by from but or also because so if when".split(),
+}
+
+FOLDERS = ["projects", "study", "work", "archive", "inbox", "daily", "research", "ideas"]
+
+
+@dataclass
+class VaultSpec:
+    notes: int = 200
+    # Log-normal size distribution in words: most notes are short, a few are long
+    median_words: int = 250
+    size_sigma: float = 0.8
+    max_words: int = 5000
+    depth: int = 3
+    folders_per_level: int = 3
+    ru_share: float = 0.5
+    seed: int = 0
+    extension: str = ".md"
+
+
+@dataclass
+class Vault:
+    root: Path
+    spec: VaultSpec
+    files: List[Path] = field(default_factory=list)
+    topics: Dict[str, str] = field(default_factory=dict)
+    total_bytes: int = 0
+
+
+def _folders(spec: VaultSpec, rng: random.Random) -> List[Path]:
+    folders = [Path(".")]
+    level = [Path(".")]
+    for _ in range(spec.depth):
+        next_level = []
+        for parent in level:
+            for name in rng.sample(FOLDERS, min(spec.folders_per_level, len(FOLDERS))):
+                next_level.append(parent / name)
+        folders.extend(next_level)
+        level = next_level
+    return folders
+
+
+def _sentence(rng: random.Random, lang: str, keywords: List[str]) -> str:
+    words = [rng.choice(keywords) if rng.random() < 0.45 else rng.choice(FILLER[lang]) for _ in range(rng.randint(6, 16))]
+    return " ".join(words).capitalize() + "."
+
+
+def render_note(rng: random.Random, lang: str, title: str, keywords: List[str], words: int) -> str:
+    lines = [f"# {title}", ""]
+    written = 0
+    section = 1
+    while written < words:
+        heading = "Раздел" if lang == "ru" else "Section"
+        lines += [f"## {heading} {section}: {rng.choice(keywords)}", ""]
+        for _ in range(rng.randint(1, 3)):
+            if rng.random() < 0.2:
+                items = [f"- {_sentence(rng, lang, keywords)}" for _ in range(rng.randint(2, 5))]
+                lines += items + [""]
+                written += sum(len(i.split()) for i in items)
+            else:
+                paragraph = " ".join(_sentence(rng, lang, keywords) for _ in range(rng.randint(2, 6)))
+                lines += [paragraph, ""]
+                written += len(paragraph.split())
+        section += 1
+    return "\n".join(lines)
+
+
+def generate_vault(root, spec: VaultSpec | None = None) -> Vault:
+    spec = spec or VaultSpec()
+    rng = random.Random(spec.seed)
+    root = Path(root)
+    vault = Vault(root=root, spec=spec)
+    folders = _folders(spec, rng)
+
+    for i in range(spec.notes):
+        lang = "ru" if rng.random() < spec.ru_share else "en"
+        topic, vocabulary = rng.choice(TOPICS[lang])
+        keywords = vocabulary.split()
+        words = min(spec.max_words, max(20, int(rng.lognormvariate(math.log(spec.median_words), spec.size_sigma))))
+
+        path = root / rng.choice(folders) / f"note_{i:05d}{spec.extension}"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        content = render_note(rng, lang, f"{topic} {i}", keywords, words)
+        path.write_text(content, encoding="utf-8")
+
+        vault.files.append(path)
+        vault.topics[str(path)] = topic
+        vault.total_bytes += len(content.encode("utf-8"))
+
+    return vault
+
+
+def sample_queries(count: int, seed: int = 0) -> List[str]:
+    rng = random.Random(seed + 1)
+    queries = []
+    for _ in range(count):
+        lang = rng.choice(["ru", "en"])
+        topic, vocabulary = rng.choice(TOPICS[lang])
+        queries.append(f"{topic}: " + " ".join(rng.sample(vocabulary.split(), 3)))
+    return queries
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("root")
+    parser.add_argument("--notes", type=int, default=200)
+    parser.add_argument("--median-words", type=int, default=250)
+    parser.add_argument("--depth", type=int, default=3)
+    parser.add_argument("--ru-share", type=float, default=0.5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--extension", default=".md", choices=[".md", ".txt"])
+    args = parser.parse_args()
+
+    vault = generate_vault(args.root, VaultSpec(
+        notes=args.notes, median_words=args.median_words, depth=args.depth,
+        ru_share=args.ru_share, seed=args.seed, extension=args.extension,
+    ))
+    print(f"{len(vault.files)} notes, {vault.total_bytes / 1024:.1f} KiB in {vault.root}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,251 @@
+import pytest
+import tempfile
+import shutil
+import time
+from typing import Any, List
+
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from pydantic import Field
+
+from AGENT.react_agent import ReActAgent
+
+
+class ScriptedModel(BaseChatModel):
+    """Replies from a script, then echoes the last message; summary requests get "SUMMARY"."""
+
+    replies: List[Any] = Field(default_factory=list)
+    seen: List[Any] = Field(default_factory=list)
+    delay: float = 0.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        last = messages[-1].content
+        if "Context Extraction Assistant" in str(last):
+            reply = AIMessage(content="SUMMARY")
+        else:
+            self.seen.append(list(messages))
+            time.sleep(self.delay)
+            reply = self.replies.pop(0) if self.replies else AIMessage(content=f"ответ: {last}")
+        return ChatResult(generations=[ChatGeneration(message=reply)])
+
+
+class FakeRag:
+    def __init__(self):
+        self.queries = []
+
+    def query(self, query, k=5):
+        self.queries.append(query)
+        return {"documents": [[f"фрагмент про {query}"]], "metadatas": [[{"source": "a.md"}]]}
+
+
+@pytest.fixture
+def workdir():
+    temp = tempfile.mkdtemp()
+    yield temp
+    shutil.rmtree(temp)
+
+
+def make_agent(workdir, model, **kwargs):
+    options = dict(fast_path=False, prefetch=False, verbose=False)
+    options.update(kwargs)
+    return ReActAgent(
+        notes_dir=workdir, persist_dir=workdir, llm=model, rag_assistant=FakeRag(),
+        checkpoint_path=os.path.join(workdir, "checkpoints.sqlite"), **options
+    )
+
+
+def human_texts(messages):
+    return [m.content for m in messages if isinstance(m, HumanMessage)]
+
+
+def test_thread_survives_turns_and_a_restart(workdir):
+    model = ScriptedModel()
+    agent = make_agent(workdir, model, thread_id="thread-1")
+    agent.answer("меня зовут Оля")
+    agent.answer("как меня зовут?")
+
+    assert human_texts(model.seen[-1]) == ["меня зовут Оля", "как меня зовут?"]
+
+    restarted = make_agent(workdir, model, thread_id="thread-1")
+    restarted.answer("а теперь?")
+
+    assert human_texts(model.seen[-1]) == ["меня зовут Оля", "как меня зовут?", "а теперь?"]
+
+
+def test_long_thread_is_summarised(workdir):
+    model = ScriptedModel()
+    agent = make_agent(workdir, model, thread_id="thread-2", summary_trigger_tokens=200, summary_keep_messages=2)
+    for i in range(4):
+        agent.answer(f"вопрос {i}: " + "подробности " * 40)
+
+    messages = agent.agent.get_state(agent._run_config(agent.default_session)).values["messages"]
+    assert any("SUMMARY" in str(m.content) for m in messages)
+    # Only the summary and the kept tail of the thread reach the model
+    assert len(model.seen[-1]) <= 4
+    assert human_texts(model.seen[-1])[-1].startswith("вопрос 3")
+
+
+def tool_call(i, usage=None):
+    return AIMessage(
+        content="", tool_calls=[{"name": "get_dir_structure", "args": {"root_path": "."}, "id": f"call-{i}"}],
+        usage_metadata=usage
+    )
+
+
+def test_step_limit_ends_with_the_last_tool_result(workdir):
+    model = ScriptedModel(replies=[tool_call(i) for i in range(10)])
+    agent = make_agent(workdir, model, max_iterations=2)
+    agent.tools_manager.notes_manager.get_dir_structure = lambda root_path: {"tree": "a.md"}
+
+    answer = agent.answer("разложи всё по папкам")
+
+    assert len(model.seen) == 2
+    assert "max_steps" in answer and "a.md" in answer
+    assert agent.last_run_metrics["budget"]["limit_hit"] == "max_steps"
+
+
+def test_token_limit_stops_before_the_next_model_call(workdir):
+    usage = {"input_tokens": 400, "output_tokens": 100, "total_tokens": 500}
+    model = ScriptedModel(replies=[tool_call(i, usage) for i in range(10)])
+    agent = make_agent(workdir, model, max_run_tokens=300)
+
+    answer = agent.answer("разложи всё по папкам")
+
+    assert len(model.seen) == 1
+    assert "max_tokens" in answer
+    assert agent.last_run_metrics["budget"]["limit_hit"] == "max_tokens"
+
+
+def test_slow_model_call_is_cut_at_the_remaining_time(workdir):
+    model = ScriptedModel(delay=2.0)
+    agent = make_agent(workdir, model, max_seconds=0.3)
+
+    started = time.perf_counter()
+    answer = agent.answer("расскажи что-нибудь")
+
+    assert time.perf_counter() - started < 1.5
+    assert "max_seconds" in answer
+    assert agent.last_run_metrics["budget"]["limit_hit"] == "max_seconds"
+
+
+def test_slow_tool_call_is_cut_at_the_remaining_time(workdir):
+    model = ScriptedModel(replies=[tool_call(0)])
+    agent = make_agent(workdir, model, max_seconds=0.5)
+
+    def slow_structure(root_path):
+        time.sleep(2.0)
+        return {"tree": "a.md"}
+
+    agent.tools_manager.notes_manager.get_dir_structure = slow_structure
+
+    started = time.perf_counter()
+    answer = agent.answer("разложи всё по папкам")
+
+    assert time.perf_counter() - started < 1.5
+    assert len(model.seen) == 1
+    assert "max_seconds" in answer
+
+
+def test_fast_path_turns_are_checkpointed_and_seen_after_a_restart(workdir):
+    model = ScriptedModel()
+    agent = make_agent(workdir, model, fast_path=True, thread_id="thread-fast")
+
+    agent.answer("найди заметки про kafka")
+    agent.answer("найди заметки про отпуск")
+
+    assert "Пользователь: найди заметки про kafka" in model.seen[-1][-1].content
+    messages = agent.agent.get_state(agent._run_config(agent.default_session)).values["messages"]
+    assert human_texts(messages) == ["найди заметки про kafka", "найди заметки про отпуск"]
+
+    restarted = make_agent(workdir, model, fast_path=True, thread_id="thread-fast")
+    restarted.answer("найди заметки про отчёт")
+
+    assert "Пользователь: найди заметки про отпуск" in model.seen[-1][-1].content
+
+    restarted.answer("расскажи что-нибудь")
+
+    assert human_texts(model.seen[-1]) == [
+        "найди заметки про kafka", "найди заметки про отпуск", "найди заметки про отчёт", "расскажи что-нибудь"
+    ]
+
+
+def test_slow_fast_path_call_is_cut_at_the_remaining_time(workdir):
+    model = ScriptedModel(delay=2.0)
+    agent = make_agent(workdir, model, fast_path=True, max_seconds=0.5)
+
+    started = time.perf_counter()
+    answer = agent.answer("найди заметки про kafka")
+
+    assert time.perf_counter() - started < 1.5
+    assert "max_seconds" in answer and "фрагмент про" in answer
+    assert agent.last_run_metrics["path"] == "fast"
+    assert agent.last_run_metrics["budget"]["limit_hit"] == "max_seconds"
+
+
+def search_call(query):
+    return AIMessage(content="", tool_calls=[{"name": "search_notes", "args": {"query": query, "k": 5}, "id": "search-1"}])
+
+
+def test_lookup_query_is_prefetched_and_served_from_it(workdir):
+    model = ScriptedModel(replies=[search_call("kafka consumer groups")])
+    agent = make_agent(workdir, model, prefetch=True)
+
+    agent.answer("найди заметки про kafka consumer groups")
+
+    assert agent.rag_assistant.queries == ["найди заметки про kafka consumer groups"]
+    assert agent.last_run_metrics["tool_cache"]["prefetch_hits"] == 1
+
+
+def test_other_queries_are_not_prefetched(workdir):
+    model = ScriptedModel(replies=[search_call("kafka")])
+    agent = make_agent(workdir, model, prefetch=True)
+
+    agent.answer("расскажи про kafka")
+
+    assert agent.rag_assistant.queries == ["kafka"]
+    assert agent.last_run_metrics["tool_cache"]["prefetch_issued"] == 0
+
+
+def test_sessions_on_a_shared_agent_keep_separate_threads(workdir):
+    model = ScriptedModel()
+    agent = make_agent(workdir, model)
+    alice, bob = agent.new_session(), agent.new_session()
+
+    agent.answer("меня зовут Алиса", session=alice)
+    agent.answer("меня зовут Боб", session=bob)
+    agent.answer("как меня зовут?", session=alice)
+
+    assert alice.thread_id != bob.thread_id
+    assert human_texts(model.seen[-1]) == ["меня зовут Алиса", "как меня зовут?"]
+    assert [turn["content"] for turn in agent.get_conversation_history(bob) if turn["role"] == "user"] == ["меня зовут Боб"]
+    assert len(agent.get_conversation_history(alice)) == 4
+    assert not agent.get_conversation_history()
+
+
+def test_agent_runs_on_the_default_openrouter_provider(workdir, monkeypatch):
+    from benchmarks.fake_servers import fake_openai
+
+    with fake_openai() as server:
+        monkeypatch.setenv("OPENROUTER_API", "offline-test")
+        monkeypatch.setenv("OPENROUTER_BASE_URL", f"{server.url}/api/v1")
+        agent = ReActAgent(
+            notes_dir=workdir, persist_dir=workdir, rag_assistant=FakeRag(), llm_providers=["openrouter"],
+            checkpoint_path=os.path.join(workdir, "checkpoints.sqlite"), fast_path=False, prefetch=False, verbose=False
+        )
+
+        answer = agent.answer("найди заметки про kafka")
+
+    assert type(agent.llm).__name__ == "OpenRouterAdapter"
+    assert answer.startswith("[") and "Ответ по заметкам" in answer
+    assert agent.last_run_metrics["llm_calls"] == 2
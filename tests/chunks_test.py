@@ -0,0 +1,49 @@
+from langchain_core.documents import Document
+
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from RAG.components.chunks import ChunkBatch
+from RAG.components.documents_processor import DocumentsProcessor
+
+
+def test_split_records_offsets_per_file_ids_and_one_path_per_file():
+    text = "\n\n".join(f"Параграф {i}: " + "слово " * 30 for i in range(8))
+    documents = [Document(page_content=text, metadata={"source": "a.md"}), Document(page_content=text, metadata={"source": "b.md"})]
+
+    batch = DocumentsProcessor(chunk_size=200, chunk_overlap=40).split(documents)
+
+    assert batch.paths == ["a.md", "b.md"]
+    assert list(batch.chunk_ids[:3]) == [0, 1, 2]
+    for piece, start, end in zip(batch.texts, batch.starts, batch.ends):
+        assert text[start:end] == piece
+    for piece, start, end in zip(batch.texts, batch.byte_starts, batch.byte_ends):
+        assert text.encode("utf-8")[start:end].decode("utf-8") == piece
+    assert batch.ids()[0] == "a.md#0"
+    assert set(batch.metadatas()[0]) == {"source", "chunk_id", "start_index", "end_index", "start_byte", "end_byte"}
+
+
+def test_slices_and_documents_round_trip():
+    batch = ChunkBatch()
+    batch.add_text("a.md", "one two three", ["one two", "three"])
+    batch.add_text("b.md", "four", ["four"])
+
+    tail = batch[1:]
+    documents = batch.to_documents()
+
+    assert tail.texts == ["three", "four"]
+    assert tail.sources() == ["a.md", "b.md"]
+    assert documents[1].metadata == {
+        "source": "a.md", "chunk_id": 1, "start_index": 8, "end_index": 13, "start_byte": 8, "end_byte": 13,
+    }
+    assert ChunkBatch.from_documents(documents).ids() == batch.ids()
+
+
+def test_integer_index_gives_a_document():
+    batch = ChunkBatch()
+    batch.add_text("a.md", "one two three", ["one two", "three"])
+    batch.append("## Раздел", "b.md", 0, 0, 9, heading="Раздел")
+
+    assert batch[0].page_content == "one two"
+    assert batch[1].metadata == batch.to_documents()[1].metadata
+    assert batch[-1].metadata["headings"] == "Раздел"
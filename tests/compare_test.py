@@ -0,0 +1,55 @@
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from benchmarks.compare import Tolerance, compare, failed, render
+
+
+def results(qps, p95, peak, samples=(1.0, 1.0, 1.0)):
+    return {
+        "meta": {"commit": "abc"},
+        "scenarios": {"query": {
+            "queries_per_second": qps, "p50_ms": p95 / 2, "p95_ms": p95, "peak_mb": peak,
+            "seconds_samples": list(samples),
+        }},
+    }
+
+
+def statuses(deltas):
+    return {d.metric: d.status for d in deltas}
+
+
+def test_regression_beyond_tolerance_fails():
+    deltas = compare(results(100, 10, 5), results(80, 13, 5), Tolerance(timing=0.1, min_ms=0.0))
+
+    assert statuses(deltas)["queries_per_second"] == "regression"
+    assert statuses(deltas)["p95_ms"] == "regression"
+    assert statuses(deltas)["peak_mb"] == "ok"
+    assert failed(deltas)
+    assert "regression(s)" in render(deltas)
+
+
+def test_noisy_runs_widen_the_gate():
+    noisy = (1.0, 1.2, 0.9)
+    deltas = compare(results(100, 10, 5, noisy), results(80, 12, 5, noisy), Tolerance(timing=0.1, noise_factor=2.0))
+
+    assert not failed(deltas)
+    assert deltas[0].allowed > 0.5
+
+
+def test_memory_and_improvements_are_reported():
+    deltas = compare(results(100, 10, 5), results(150, 10, 6), Tolerance(memory=0.1))
+
+    assert statuses(deltas)["queries_per_second"] == "improvement"
+    assert statuses(deltas)["peak_mb"] == "regression"
+
+
+def test_errored_scenario_counts_as_failure():
+    current = {"meta": {"commit": "def"}, "scenarios": {"query": {"error": "RuntimeError: boom"}}}
+
+    assert failed(compare(results(100, 10, 5), current))
+
+
+def test_small_absolute_latency_changes_are_ignored():
+    deltas = compare(results(100, 1.0, 5), results(100, 1.8, 5), Tolerance(timing=0.1, min_ms=2.0))
+
+    assert statuses(deltas)["p95_ms"] == "ok"
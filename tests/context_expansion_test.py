@@ -0,0 +1,102 @@
+import pytest
+import tempfile
+import shutil
+
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from RAG.components.chunks import ChunkBatch
+from RAG.components.context_expansion import ContextExpander, passages_to_results
+from RAG.components.markdown_chunker import MarkdownChunker
+from RAG.components.vectorstorage import ChromaVectorStorage
+
+TEXT = " ".join(f"w{i:03d}" for i in range(120))
+
+
+class CharCounter:
+    def count(self, text):
+        return len(text)
+
+
+@pytest.fixture
+def storage():
+    temp = tempfile.mkdtemp()
+    yield ChromaVectorStorage(persist_directory=temp)
+    shutil.rmtree(temp)
+
+
+def index(storage, batch):
+    storage.add_documents(batch, [[1.0, float(i)] for i in range(len(batch))])
+
+
+def search_results(storage, ids, distances):
+    found = storage.get_chunks(ids=ids)
+    order = [found['ids'].index(i) for i in ids]
+    return {
+        "ids": [ids],
+        "documents": [[found['documents'][i] for i in order]],
+        "metadatas": [[found['metadatas'][i] for i in order]],
+        "distances": [distances],
+    }
+
+
+def overlapping_batch():
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+    pieces = RecursiveCharacterTextSplitter(chunk_size=60, chunk_overlap=20, separators=[" "]).split_text(TEXT)
+    batch = ChunkBatch()
+    batch.add_text("a.md", TEXT, pieces, 20)
+    batch.add_text("b.md", "другая заметка", ["другая заметка"])
+    return batch
+
+
+def test_neighbours_are_merged_without_overlap_and_ranked_by_best_hit(storage):
+    batch = overlapping_batch()
+    index(storage, batch)
+    results = search_results(storage, ["b.md#0", "a.md#3", "a.md#4"], [0.1, 0.2, 0.3])
+
+    passages = ContextExpander(storage, window=1, max_tokens=10_000).expand(results)
+
+    assert [p.source for p in passages] == ["b.md", "a.md"]
+    merged = passages[1]
+    assert merged.chunk_ids == [2, 3, 4, 5]
+    assert merged.text == TEXT[merged.start_index:merged.end_index]
+    assert merged.distance == 0.2
+    assert passages_to_results(passages)["metadatas"][0][1]["chunk_ids"] == "2,3,4,5"
+
+
+def test_budget_falls_back_to_the_matched_chunks(storage):
+    batch = overlapping_batch()
+    index(storage, batch)
+    results = search_results(storage, ["a.md#3"], [0.2])
+    hit = results["documents"][0][0]
+
+    passages = ContextExpander(storage, window=2, max_tokens=len(hit), counter=CharCounter()).expand(results)
+
+    assert [p.text for p in passages] == [hit]
+
+
+def test_section_mode_returns_the_whole_section_once(storage):
+    note = "# Заметка\n\n## Раздел\n\n" + "\n\n".join(f"Абзац {i} " + "слово " * 8 for i in range(4)) + "\n\n## Другой\n\nКонец."
+    batch = MarkdownChunker(chunk_size=80).split(note, "n.md")
+    index(storage, batch)
+    section = [i for i in range(len(batch)) if batch.heading(i) == "Заметка > Раздел"]
+    results = search_results(storage, [f"n.md#{section[1]}"], [0.1])
+
+    passages = ContextExpander(storage, section=True, max_tokens=10_000).expand(results)
+
+    assert len(passages) == 1
+    assert passages[0].chunk_ids == section
+    assert passages[0].text.startswith("Заметка > Раздел\n\nАбзац 0")
+    assert passages[0].text.count("Заметка > Раздел") == 1
+    assert "Конец." not in passages[0].text
+
+
+def test_window_into_the_next_section_keeps_its_heading_path(storage):
+    batch = MarkdownChunker().split("# Заметка\n\n## Раздел\n\nНачало.\n\n## Другой\n\nКонец.\n", "n.md")
+    index(storage, batch)
+    results = search_results(storage, ["n.md#0"], [0.1])
+
+    passages = ContextExpander(storage, window=1, max_tokens=10_000).expand(results)
+
+    assert passages[0].text == "Заметка > Раздел\n\nНачало.\n\nЗаметка > Другой\n\nКонец."
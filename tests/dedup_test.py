@@ -0,0 +1,124 @@
+import pytest
+import tempfile
+import shutil
+from pathlib import Path
+
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from RAG.components.chunks import ChunkBatch
+from RAG.components.dedup import ChunkDeduplicator, minhash
+from RAG.components.vectorstorage import ChromaVectorStorage
+
+TEMPLATE = " ".join(f"пункт{i} шаблона встречи" for i in range(40))
+LOG = " ".join(f"INFO worker-{i % 3} processed batch {i} in 12ms" for i in range(30))
+
+
+@pytest.fixture
+def store():
+    temp = tempfile.mkdtemp()
+    storage = ChromaVectorStorage(persist_directory=temp)
+    yield storage, ChunkDeduplicator(storage, Path(temp) / "duplicates.json")
+    shutil.rmtree(temp)
+
+
+def batch_for(source, *texts):
+    batch = ChunkBatch()
+    for chunk_id, text in enumerate(texts):
+        batch.append(text, source, chunk_id, 0, len(text))
+    return batch
+
+
+def index(storage, deduplicator, batch):
+    with deduplicator.staged(batch) as unique:
+        if unique:
+            storage.add_documents(unique, [[1.0, float(len(text))] for text in unique.texts])
+    return unique
+
+
+def similarity(a, b):
+    return (minhash(a) == minhash(b)).mean()
+
+
+def test_minhash_ignores_case_and_spacing_and_tolerates_small_edits():
+    edited = LOG.replace("batch 7 ", "batch 70 ")
+
+    assert similarity(LOG, LOG.upper().replace(" ", "  ")) == 1.0
+    assert similarity(LOG, edited) >= 0.7
+    assert similarity(LOG, TEMPLATE) < 0.3
+
+
+def test_near_duplicates_are_referenced_instead_of_stored(store):
+    storage, deduplicator = store
+    index(storage, deduplicator, batch_for("a.md", TEMPLATE, "заметка A"))
+
+    unique = index(storage, deduplicator, batch_for("b.md", TEMPLATE.replace("пункт3 ", "пункт3а "), "заметка B"))
+
+    assert unique.texts == ["заметка B"]
+    assert storage.collection.count() == 3
+    results = deduplicator.annotate({"ids": [["a.md#0"]], "metadatas": [[{"source": "a.md"}]]})
+    assert results["metadatas"][0][0]["also_in"] == "b.md"
+    report = deduplicator.report(dim=768)
+    assert report["duplicate_chunks"] == 1
+    assert report["saved_vector_bytes"] == 768 * 4
+
+
+def test_deleting_the_canonical_file_promotes_a_reference(store):
+    storage, deduplicator = store
+    index(storage, deduplicator, batch_for("a.md", LOG))
+    index(storage, deduplicator, batch_for("b.md", LOG))
+    index(storage, deduplicator, batch_for("c.md", LOG))
+
+    deduplicator.release("a.md")
+    storage.delete_by_source("a.md")
+
+    stored = storage.get_chunks(ids=["b.md#0"])
+    assert stored["metadatas"][0]["source"] == "b.md"
+    assert deduplicator.references["c.md#0"]["canonical"] == "b.md#0"
+    # b.md comes back unchanged: it is still the canonical chunk for c.md
+    assert index(storage, deduplicator, batch_for("b.md", LOG)).texts == [LOG]
+
+
+def test_state_survives_a_restart(store):
+    storage, deduplicator = store
+    index(storage, deduplicator, batch_for("a.md", TEMPLATE))
+    deduplicator.save()
+
+    reloaded = ChunkDeduplicator(storage, deduplicator.path)
+
+    with reloaded.staged(batch_for("b.md", TEMPLATE)) as unique:
+        assert not unique
+    assert reloaded.references["b.md#0"]["canonical"] == "a.md#0"
+
+
+def test_passages_repeated_within_one_note_are_kept(store):
+    storage, deduplicator = store
+
+    unique = index(storage, deduplicator, batch_for("a.md", LOG, "между повторами", LOG))
+
+    assert len(unique) == 3
+    assert not deduplicator.references
+
+
+def test_failed_store_write_leaves_no_state(store):
+    storage, deduplicator = store
+    index(storage, deduplicator, batch_for("a.md", TEMPLATE))
+
+    with pytest.raises(RuntimeError):
+        with deduplicator.staged(batch_for("b.md", TEMPLATE, LOG)) as unique:
+            assert unique.texts == [LOG]
+            raise RuntimeError("embedding service down")
+
+    assert list(deduplicator.signatures) == ["a.md#0"]
+    assert not deduplicator.references
+    # c.md is not matched against the LOG chunk that never reached the store
+    assert index(storage, deduplicator, batch_for("c.md", LOG)).texts == [LOG]
+
+
+def test_duplicates_across_files_of_one_batch_are_found(store):
+    storage, deduplicator = store
+    batch = batch_for("a.md", LOG)
+    batch.append(LOG, "b.md", 0, 0, len(LOG))
+
+    assert index(storage, deduplicator, batch).texts == [LOG]
+    assert deduplicator.references["b.md#0"]["canonical"] == "a.md#0"
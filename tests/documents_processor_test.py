@@ -7,7 +7,7 @@ from RAG.components.documents_processor import DocumentsProcessor, logger
 test_notes = "C:/WebApps/NoteAssistant/tests/testnotes"
 processor = DocumentsProcessor()
 
-chunks = processor.process_documents(test_notes)
+chunks = processor.documents_processor(test_notes)
 
 # 1. Базовый анализ chunks
 print("=== BASIC CHUNKS ANALYSIS ===")
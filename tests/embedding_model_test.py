@@ -0,0 +1,22 @@
+import numpy as np
+
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from RAG.components.embedding_model import EmbeddingModel
+from benchmarks.standins import HashingEmbeddings
+
+
+def test_embeddings_come_back_as_contiguous_float32():
+    model = EmbeddingModel()
+    model._embedding_model = HashingEmbeddings(dim=16)
+
+    documents = model.embed_documents(["первая заметка", "second note"])
+    queries = model.embed_queries(["первая", "second"])
+    query = model.embed_query("первая")
+
+    assert documents.dtype == np.float32 and documents.shape == (2, 16)
+    assert documents.flags["C_CONTIGUOUS"]
+    assert queries.shape == (2, 16)
+    assert query.shape == (16,)
+    np.testing.assert_array_equal(queries[0], query)
@@ -0,0 +1,69 @@
+import json
+import urllib.error
+import urllib.request
+import pytest
+
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from benchmarks.fake_servers import fake_ollama, fake_openai, FakeServerConfig
+
+
+def post(url, payload):
+    request = urllib.request.Request(url, data=json.dumps(payload).encode("utf-8"), headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(request, timeout=5) as response:
+        return response.read().decode("utf-8")
+
+
+SEARCH_TOOL = {"type": "function", "function": {
+    "name": "search_notes",
+    "parameters": {"type": "object", "properties": {"query": {"type": "string"}, "k": {"type": "integer"}}},
+}}
+
+
+def test_ollama_embeddings_are_deterministic():
+    with fake_ollama(FakeServerConfig(dim=32)) as server:
+        first = json.loads(post(f"{server.url}/api/embeddings", {"model": "m", "prompt": "векторный поиск"}))
+        second = json.loads(post(f"{server.url}/api/embed", {"model": "m", "input": ["векторный поиск", "other"]}))
+
+    assert len(first["embedding"]) == 32
+    assert second["embeddings"][0] == first["embedding"]
+    assert second["embeddings"][1] != first["embedding"]
+
+
+def test_chat_requests_tool_then_answers():
+    with fake_openai() as server:
+        url = f"{server.url}/api/v1/chat/completions"
+        messages = [{"role": "user", "content": "find kafka notes"}]
+        first = json.loads(post(url, {"model": "m", "messages": messages, "tools": [SEARCH_TOOL]}))
+        call = first["choices"][0]["message"]["tool_calls"][0]
+
+        messages += [
+            {"role": "assistant", "content": None, "tool_calls": [call]},
+            {"role": "tool", "tool_call_id": call["id"], "content": "results"},
+        ]
+        second = json.loads(post(url, {"model": "m", "messages": messages, "tools": [SEARCH_TOOL]}))
+
+    assert first["choices"][0]["finish_reason"] == "tool_calls"
+    assert json.loads(call["function"]["arguments"]) == {"query": "find kafka notes", "k": 3}
+    assert second["choices"][0]["finish_reason"] == "stop"
+    assert second["usage"]["total_tokens"] > 0
+
+
+def test_chat_streams_sse_chunks():
+    with fake_openai() as server:
+        body = post(f"{server.url}/v1/chat/completions", {"model": "m", "stream": True, "messages": [{"role": "user", "content": "hello notes"}]})
+
+    events = [line[len("data: "):] for line in body.splitlines() if line.startswith("data: ")]
+    assert events[-1] == "[DONE]"
+    text = "".join(json.loads(e)["choices"][0]["delta"].get("content", "") for e in events[:-1])
+    assert "hello notes" in text
+
+
+def test_error_injection():
+    with fake_openai(FakeServerConfig(error_rate=1.0, error_status=429)) as server:
+        with pytest.raises(urllib.error.HTTPError) as error:
+            post(f"{server.url}/v1/chat/completions", {"model": "m", "messages": [{"role": "user", "content": "x"}]})
+
+        assert error.value.code == 429
+        assert server.stats() == {"requests": 1, "errors": 1}
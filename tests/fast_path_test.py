@@ -0,0 +1,50 @@
+import pytest
+
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from AGENT.fast_path import build_rag_prompt, classify_query, is_lookup
+
+
+@pytest.mark.parametrize("query", [
+    "Найди заметки про Kafka",
+    "что я писал про отпуск в моих заметках?",
+    "Что говорится по заметкам о бюджете",
+    "find the meeting notes about hiring",
+    "what did I decide about the API in my notes",
+])
+def test_lookup_questions_take_the_fast_path(query):
+    assert classify_query(query) == "retrieval"
+
+
+@pytest.mark.parametrize("query", [
+    "Найди заметку про Kafka и удали её",
+    "найди в заметках список покупок и добавь туда молоко",
+    "find my notes about python and update the summary",
+    "Найди plan.md",
+    "покажи структуру папки с заметками",
+    "Создай заметку 'Python Tips'",
+])
+def test_mutations_and_file_operations_stay_on_the_agent_path(query):
+    assert classify_query(query) == "agent"
+
+
+def test_open_questions_default_to_the_agent():
+    assert classify_query("Привет! Как дела?") == "agent"
+    assert classify_query("summarise this week") == "agent"
+
+
+def test_lookups_with_mutations_still_count_as_lookups():
+    assert is_lookup("Найди заметку про Kafka и удали её")
+    assert not is_lookup("Создай заметку 'Python Tips'")
+
+
+def test_rag_prompt_includes_recent_dialogue():
+    history = [{"role": "user", "content": "Найди заметки про Kafka"}, {"role": "assistant", "content": "Есть две [1]"}]
+
+    prompt = build_rag_prompt("а про вторую?", ["текст"], [{"source": "kafka.md"}], history)
+
+    assert "Пользователь: Найди заметки про Kafka\nАссистент: Есть две [1]" in prompt
+    assert prompt.index("НЕДАВНИЙ ДИАЛОГ") < prompt.index("ФРАГМЕНТЫ ЗАМЕТОК")
+    assert "(kafka.md)" in prompt
+    assert "НЕДАВНИЙ ДИАЛОГ" not in build_rag_prompt("вопрос", ["текст"])
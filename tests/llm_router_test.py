@@ -0,0 +1,191 @@
+import time
+import threading
+import pytest
+from typing import Any, ClassVar, List
+
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from LLM.router import LLMRouter, ProviderStats
+
+
+class FakeProvider(BaseChatModel):
+    answer: str = "ok"
+    delay: float = 0.0
+    fail: bool = False
+    calls: int = 0
+    bound_tools: List[Any] | None = None
+    seen_kwargs: List[Any] = []
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        self.calls += 1
+        self.seen_kwargs.append(kwargs)
+        time.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("provider down")
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.answer))])
+
+    def bind_tools(self, tools, **kwargs):
+        self.bound_tools = list(tools)
+        return self
+
+
+def test_fails_over_to_next_provider():
+    broken = FakeProvider(answer="broken", fail=True)
+    backup = FakeProvider(answer="backup")
+    router = LLMRouter(providers=[broken, backup], provider_names=["a", "b"])
+
+    response = router.invoke([HumanMessage(content="hi")])
+
+    assert response.content == "backup"
+    assert response.response_metadata["provider"] == "b"
+    assert router.get_stats()[0]["error_rate"] == 1.0
+
+
+def test_prefers_faster_provider():
+    slow = FakeProvider(answer="slow", delay=0.05)
+    fast = FakeProvider(answer="fast")
+    router = LLMRouter(providers=[slow, fast], provider_names=["slow", "fast"])
+
+    router.invoke([HumanMessage(content="1")])
+    router.invoke([HumanMessage(content="2")])
+    response = router.invoke([HumanMessage(content="3")])
+
+    assert response.content == "fast"
+    assert slow.calls == 1
+
+
+def test_timeout_counts_as_failure():
+    hanging = FakeProvider(answer="late", delay=0.5)
+    backup = FakeProvider(answer="backup")
+    router = LLMRouter(providers=[hanging, backup], provider_names=["hang", "backup"], timeout=0.05)
+
+    assert router.invoke([HumanMessage(content="hi")]).content == "backup"
+    assert router.get_stats()[0]["error_rate"] == 1.0
+
+
+def test_all_providers_failing_raises():
+    router = LLMRouter(providers=[FakeProvider(fail=True), FakeProvider(fail=True)])
+
+    with pytest.raises(RuntimeError):
+        router.invoke([HumanMessage(content="hi")])
+
+
+def test_provider_cooldown_after_consecutive_failures():
+    stats = ProviderStats("p", failure_threshold=2, cooldown=60)
+    stats.record_failure(0.1)
+    assert stats.healthy
+    stats.record_failure(0.1)
+    assert not stats.healthy
+    stats.record_success(0.1)
+    assert stats.healthy
+
+
+def test_bind_tools_shares_stats():
+    provider = FakeProvider()
+    router = LLMRouter(providers=[provider], provider_names=["only"])
+
+    bound = router.bind_tools(["tool"])
+    bound.invoke([HumanMessage(content="hi")])
+
+    assert provider.bound_tools == ["tool"]
+    assert router.get_stats()[0]["calls"] == 1
+
+
+def test_instantly_failing_provider_loses_its_place():
+    broken = FakeProvider(answer="broken", fail=True)
+    working = FakeProvider(answer="ok", delay=0.01)
+    router = LLMRouter(providers=[broken, working], provider_names=["broken", "working"], failure_threshold=100)
+
+    for i in range(4):
+        assert router.invoke([HumanMessage(content=str(i))]).content == "ok"
+
+    assert broken.calls == 1
+    assert [name for name, _ in router.ranked_providers()] == ["working", "broken"]
+
+
+class NoToolsProvider(FakeProvider):
+    supports_tools: ClassVar[bool] = False
+
+
+def test_bind_tools_skips_providers_without_tool_calling():
+    no_tools = NoToolsProvider(answer="no tools")
+    with_tools = FakeProvider(answer="tools", delay=0.01)
+    router = LLMRouter(providers=[no_tools, with_tools], provider_names=["plain", "tools"])
+
+    bound = router.bind_tools(["tool"])
+
+    assert bound.provider_names == ["tools"]
+    assert bound.invoke([HumanMessage(content="hi")]).content == "tools"
+    assert router.invoke([HumanMessage(content="hi")]).content == "no tools"
+    with pytest.raises(ValueError):
+        LLMRouter(providers=[NoToolsProvider()], provider_names=["plain"]).bind_tools(["tool"])
+
+
+class DeadlineProvider(FakeProvider):
+    supports_deadline: ClassVar[bool] = True
+
+
+def test_deadline_is_passed_to_providers_that_enforce_it():
+    deadline = DeadlineProvider()
+    plain = FakeProvider(fail=True)
+    router = LLMRouter(providers=[plain, deadline], provider_names=["plain", "deadline"], timeout=7, provider_retries=1)
+
+    router.invoke([HumanMessage(content="hi")])
+
+    assert "timeout" not in plain.seen_kwargs[0]
+    assert deadline.seen_kwargs[0]["timeout"] == 7
+    assert deadline.seen_kwargs[0]["max_retries"] == 1
+
+
+def test_saturated_provider_is_skipped_without_queueing():
+    busy = FakeProvider(answer="busy", delay=0.5)
+    backup = FakeProvider(answer="backup", delay=0.01)
+    router = LLMRouter(providers=[busy, backup], provider_names=["busy", "backup"], max_concurrency=1)
+
+    first = threading.Thread(target=router.invoke, args=([HumanMessage(content="1")],))
+    first.start()
+    time.sleep(0.1)
+    started = time.perf_counter()
+    response = router.invoke([HumanMessage(content="2")])
+    elapsed = time.perf_counter() - started
+    first.join()
+
+    assert response.content == "backup"
+    assert elapsed < 0.3
+    assert busy.calls == 1
+    # Skipping for saturation is not held against the provider, and its latency excludes any wait
+    assert router.get_stats()[0]["error_rate"] == 0.0
+    assert 0.5 <= router.get_stats()[0]["avg_latency"] < 0.6
+
+
+def test_openrouter_client_enforces_the_router_deadline(monkeypatch):
+    from benchmarks.fake_servers import FakeServerConfig, fake_openai
+    from LLM.base import LLMConfig
+    from LLM.openrouter_llm import OpenRouterAdapter
+
+    with fake_openai(FakeServerConfig(latency=2.0)) as server:
+        config = LLMConfig(
+            model_name="test", temperature=0.1, max_tokens=100, timeout=30, retry_attempts=3,
+            api_key="offline-test", base_url=f"{server.url}/api/v1"
+        )
+        router = LLMRouter(
+            providers=[OpenRouterAdapter(config), FakeProvider(answer="backup")],
+            provider_names=["openrouter", "backup"], timeout=0.2, deadline_grace=5.0
+        )
+
+        started = time.perf_counter()
+        response = router.invoke([HumanMessage(content="hi")])
+        elapsed = time.perf_counter() - started
+
+    assert response.content == "backup"
+    # The client gave up at the router's deadline, well before the backstop and its own 30s x 3 retries
+    assert elapsed < 1.5
+    assert router.get_stats()[0]["error_rate"] == 1.0
@@ -0,0 +1,46 @@
+import os
+import sys
+import pytest
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import benchmarks.loadtest as loadtest
+from benchmarks.loadtest import ENV_OVERRIDES, build_parser, run_load
+
+
+def test_short_load_run_reports_and_restores_the_environment(monkeypatch):
+    monkeypatch.setenv("OLLAMA_BASE_URL", "http://ollama.example:11434")
+    monkeypatch.delenv("OPENROUTER_BASE_URL", raising=False)
+    before = {name: os.environ.get(name) for name in ENV_OVERRIDES}
+
+    args = build_parser().parse_args([
+        "--users", "2", "--duration", "1", "--notes", "10", "--extension", ".txt", "--think", "0.05",
+        "--llm-latency", "0.01", "--embed-latency", "0.001",
+    ])
+    report = run_load(args)
+
+    assert {name: os.environ.get(name) for name in ENV_OVERRIDES} == before
+    assert report["operations"]["total"]["requests"] > 0
+    assert report["operations"]["total"]["errors"] == 0
+    assert report["servers"]["ollama"]
+
+
+def test_failed_setup_stops_the_servers_and_restores_the_environment(monkeypatch):
+    monkeypatch.delenv("OPENROUTER_BASE_URL", raising=False)
+    before = {name: os.environ.get(name) for name in ENV_OVERRIDES}
+    started = []
+    fake_openai = loadtest.fake_openai
+
+    def recording_openai(*args, **kwargs):
+        started.append(fake_openai(*args, **kwargs))
+        return started[-1]
+
+    def broken_vault(*args, **kwargs):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(loadtest, "fake_openai", recording_openai)
+    monkeypatch.setattr(loadtest, "generate_vault", broken_vault)
+
+    with pytest.raises(OSError):
+        run_load(build_parser().parse_args(["--users", "1", "--duration", "1", "--extension", ".txt"]))
+
+    assert {name: os.environ.get(name) for name in ENV_OVERRIDES} == before
+    assert not started[0]._thread.is_alive()
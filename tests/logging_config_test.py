@@ -0,0 +1,85 @@
+import logging
+import queue
+import subprocess
+import tempfile
+import shutil
+import textwrap
+from pathlib import Path
+
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from RAG import logging_config
+from RAG.logging_config import _DeferredQueueHandler, setup_logger
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def test_setup_twice_adds_no_handlers_or_listeners():
+    listeners = len(logging_config._listeners)
+
+    first = setup_logger("notes.test.twice", "RAG_debug.log")
+    second = setup_logger("notes.test.twice", "RAG_debug.log")
+    other = setup_logger("notes.test.other", "RAG_debug.log")
+
+    assert first is second
+    assert len(first.handlers) == 1
+    # Loggers sharing a file share its queue handler and listener
+    assert other.handlers == first.handlers
+    assert len(logging_config._listeners) == listeners
+
+
+def test_listener_flushes_and_stops_at_exit():
+    temp = tempfile.mkdtemp()
+    script = textwrap.dedent("""
+        import atexit
+        import sys
+        sys.path.insert(0, sys.argv[1])
+        listeners = []
+        # Registered before the module's own hook, so it runs after it
+        atexit.register(lambda: print(all(listener._thread is None for listener in listeners)))
+
+        from RAG import logging_config
+        listeners.extend(logging_config._listeners)
+        logging_config.logger.debug("последняя запись")
+    """)
+    try:
+        done = subprocess.run(
+            [sys.executable, "-c", script, str(ROOT)],
+            env={**os.environ, "NOTES_LOG_DIR": temp},
+            capture_output=True, text=True, timeout=60
+        )
+        log = (Path(temp) / "RAG_debug.log").read_text(encoding="utf-8")
+    finally:
+        shutil.rmtree(temp)
+
+    assert done.returncode == 0, done.stderr
+    assert done.stdout.strip() == "True"
+    assert "последняя запись" in log
+
+
+def test_record_is_snapshotted_before_it_is_queued():
+    log_queue = queue.SimpleQueue()
+    handler = _DeferredQueueHandler(log_queue)
+    logger = logging.getLogger("notes.test.snapshot")
+    logger.propagate = False
+    logger.addHandler(handler)
+    values = ["до"]
+    try:
+        logger.warning("значения: %s", values)
+        values.append("после")
+        try:
+            raise ValueError("сбой")
+        except ValueError:
+            logger.exception("ошибка")
+    finally:
+        logger.removeHandler(handler)
+
+    first, second = log_queue.get_nowait(), log_queue.get_nowait()
+    formatter = logging.Formatter("%(levelname)s %(message)s")
+
+    # The listener formats later, after the argument has changed
+    assert formatter.format(first) == "WARNING значения: ['до']"
+    assert first.args is None
+    assert second.exc_info is None
+    assert "ValueError: сбой" in formatter.format(second)
@@ -0,0 +1,67 @@
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from RAG.components.markdown_chunker import MarkdownChunker
+
+
+NOTE = """# Заметка
+
+Вступление.
+
+## Раздел 1
+
+Первый абзац раздела.
+
+```python
+# не заголовок
+x = 1
+```
+
+### Подраздел
+
+Текст подраздела.
+
+## Раздел 2
+
+Второй раздел.
+"""
+
+
+def test_chunks_never_cross_headings_and_carry_the_heading_path():
+    batch = MarkdownChunker(chunk_size=1000).split(NOTE, "note.md")
+
+    assert [batch.heading(i) for i in range(len(batch))] == [
+        "Заметка",
+        "Заметка > Раздел 1",
+        "Заметка > Раздел 1 > Подраздел",
+        "Заметка > Раздел 2",
+    ]
+    # The fenced comment is code, not a heading
+    assert "# не заголовок" in batch.texts[1]
+    assert batch.texts[3] == "Заметка > Раздел 2\n\nВторой раздел."
+    # The heading path replaces the heading line instead of repeating it
+    for i, text in enumerate(batch.texts):
+        titles = batch.heading(i).split(" > ")
+        body = text[len(batch.heading(i)) + 2:]
+        assert not any(line.startswith("#") and line.lstrip("#").strip() in titles for line in body.splitlines())
+    assert batch.metadatas()[3]["headings"] == "Заметка > Раздел 2"
+    assert list(batch.chunk_ids) == [0, 1, 2, 3]
+
+
+def test_heading_without_own_text_yields_no_chunk():
+    batch = MarkdownChunker().split("# A\n\n## B\n\ntext\n", "note.md")
+
+    assert batch.texts == ["A > B\n\ntext"]
+
+
+def test_offsets_locate_the_body_in_characters_and_bytes():
+    text = NOTE + "\n".join("Длинный абзац " + "слово " * 40 for _ in range(3))
+    batch = MarkdownChunker(chunk_size=120).split(text, "note.md")
+    raw = text.encode("utf-8")
+
+    assert len(batch) > 4
+    assert all(end - start <= 120 for start, end in zip(batch.starts, batch.ends))
+    for i, chunk in enumerate(batch.texts):
+        body = text[batch.starts[i]:batch.ends[i]]
+        assert chunk.endswith(body)
+        assert raw[batch.byte_starts[i]:batch.byte_ends[i]].decode("utf-8") == body
@@ -0,0 +1,91 @@
+import urllib.request
+import pytest
+
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from MONITORING.metrics import (
+    MetricsRegistry, Histogram, registry, timed, record_cache, cache_hit_rates,
+    start_metrics_server, STAGE_SECONDS, STAGE_CALLS, INFLIGHT
+)
+
+
+@pytest.fixture(autouse=True)
+def clean_registry():
+    registry.reset()
+    yield
+    registry.reset()
+
+
+def test_histogram_quantiles():
+    histogram = Histogram()
+    for value in range(1, 101):
+        histogram.observe(value / 100)
+
+    snapshot = histogram.snapshot()
+
+    assert snapshot["count"] == 100
+    assert snapshot["p50"] == 0.5
+    assert snapshot["p95"] == 0.95
+    assert snapshot["p99"] == 0.99
+
+
+def test_histogram_window_bounds_quantiles_to_recent_samples():
+    histogram = Histogram(window=10)
+    for _ in range(100):
+        histogram.observe(10.0)
+    for _ in range(10):
+        histogram.observe(1.0)
+
+    assert histogram.count == 110
+    assert histogram.snapshot()["p99"] == 1.0
+
+
+def test_timed_records_latency_outcome_and_inflight():
+    with timed("embed_query"):
+        assert registry.snapshot()[INFLIGHT]["stage=embed_query"] == 1
+
+    with pytest.raises(RuntimeError):
+        with timed("embed_query"):
+            raise RuntimeError("ollama down")
+
+    snapshot = registry.snapshot()
+    assert snapshot[STAGE_SECONDS]["stage=embed_query"]["count"] == 2
+    assert snapshot[STAGE_CALLS]["stage=embed_query,status=ok"] == 1
+    assert snapshot[STAGE_CALLS]["stage=embed_query,status=error"] == 1
+    assert snapshot[INFLIGHT]["stage=embed_query"] == 0
+
+
+def test_kind_conflict_rejected():
+    local = MetricsRegistry()
+    local.counter("x_total")
+
+    with pytest.raises(ValueError):
+        local.gauge("x_total")
+
+
+def test_cache_hit_rates():
+    record_cache("tool_results", True, tool="read_note")
+    record_cache("tool_results", True, tool="search_notes")
+    record_cache("tool_results", False, tool="read_note")
+    record_cache("search_prefetch", False)
+
+    assert cache_hit_rates() == {"tool_results": 0.6667, "search_prefetch": 0.0}
+
+
+def test_prometheus_endpoint_serves_text_format():
+    with timed("vector_search"):
+        pass
+    registry.counter("notes_watcher_events_total", "File events").labels(event='say "hi"').inc()
+
+    server = start_metrics_server(port=0)
+    try:
+        host, port = server.server_address
+        body = urllib.request.urlopen(f"http://{host}:{port}/metrics", timeout=5).read().decode("utf-8")
+    finally:
+        server.shutdown()
+
+    assert "# TYPE notes_stage_seconds summary" in body
+    assert 'notes_stage_seconds{stage="vector_search",quantile="0.95"}' in body
+    assert 'notes_stage_seconds_count{stage="vector_search"} 1' in body
+    assert 'notes_watcher_events_total{event="say \\"hi\\""} 1' in body
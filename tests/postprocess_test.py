@@ -0,0 +1,59 @@
+import tempfile
+import shutil
+
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from RAG.components.chunks import ChunkBatch
+from RAG.components.postprocess import PostProcessor, mmr, relevance_mask, trim_sentences
+from RAG.components.vectorstorage import ChromaVectorStorage
+
+
+def test_relevance_mask_applies_absolute_and_relative_cutoffs():
+    distances = [0.2, 0.3, 0.45, 0.9]
+
+    assert relevance_mask(distances, margin=0.2).tolist() == [True, True, False, False]
+    assert relevance_mask(distances, max_distance=0.25).tolist() == [True, False, False, False]
+
+
+def test_mmr_skips_near_duplicates_for_a_distinct_hit():
+    query = [1.0, 0.0, 0.0]
+    embeddings = [[1.0, 0.1, 0.0], [1.0, 0.11, 0.0], [0.7, 0.0, 0.7]]
+
+    assert mmr(query, embeddings, k=2) == [0, 2]
+    assert mmr(query, embeddings, k=3, diversity=0.5, duplicate_similarity=1.1) == [0, 2, 1]
+
+
+def test_trim_sentences_keeps_query_sentences_in_order():
+    text = "Погода была хорошей. Python использует отступы. Кот спал. Отступы в Python важны. Конец."
+
+    assert trim_sentences(text, "отступы python", max_sentences=2) == "Python использует отступы. … Отступы в Python важны."
+    assert trim_sentences("Одно. Два.", "python", max_sentences=2) == "Одно. Два."
+
+
+def test_post_processor_on_a_chroma_result():
+    temp = tempfile.mkdtemp()
+    try:
+        storage = ChromaVectorStorage(persist_directory=temp)
+        batch = ChunkBatch()
+        for i, text in enumerate(["про python", "про python копия", "про кошек", "далеко"]):
+            batch.add_text(f"{i}.md", text, [text])
+        storage.add_documents(batch, [[1.0, 0.1], [1.0, 0.1001], [0.8, 0.6], [0.0, 1.0]])
+
+        query = [1.0, 0.0]
+        results = storage.search(query, k=4, include_embeddings=True)
+        refined = PostProcessor(k=3, margin=0.3).apply(results, "python", query)
+    finally:
+        shutil.rmtree(temp)
+
+    assert refined["documents"][0][0].startswith("про python")
+    assert refined["documents"][0][1] == "про кошек"
+    assert len(refined["documents"][0]) == 2
+    assert "embeddings" not in refined
+
+
+def test_post_processor_has_no_relative_cutoff_by_default():
+    results = {"ids": [["a", "b"]], "documents": [["близко", "далеко"]], "metadatas": [[{}, {}]], "distances": [[0.1, 0.9]]}
+
+    assert PostProcessor(k=2).apply(results, "вопрос", [1.0])["documents"][0] == ["близко", "далеко"]
+    assert PostProcessor(k=2, margin=0.2).apply(results, "вопрос", [1.0])["documents"][0] == ["близко"]
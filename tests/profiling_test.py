@@ -0,0 +1,88 @@
+import pytest
+import threading
+import tracemalloc
+
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from MONITORING.profiling import configure, profiled, render
+
+
+@pytest.fixture
+def profile_dir(tmp_path):
+    yield tmp_path
+    configure()
+
+
+def busy():
+    return sum(i * i for i in range(20000))
+
+
+def test_disabled_profiling_yields_none():
+    configure()
+    with profiled("agent.answer") as profile:
+        busy()
+
+    assert profile is None
+
+
+def test_only_targeted_names_are_profiled(profile_dir):
+    configure(["cprofile"], ["rag.*"], profile_dir)
+
+    with profiled("agent.answer") as skipped:
+        busy()
+    with profiled("rag.initial_indexing") as profile:
+        busy()
+
+    assert skipped is None
+    assert [p.name.endswith(".prof") for p in profile.files] == [True]
+    assert "busy" in render(str(profile.files[0]))
+
+
+def test_nested_targets_share_the_outer_cprofile(profile_dir):
+    configure(["cprofile", "sample"], [], profile_dir, interval=0.001)
+
+    with profiled("agent.answer") as outer:
+        with profiled("watcher.update") as inner:
+            busy()
+
+    assert {p.suffix for p in outer.files} == {".prof", ".folded"}
+    assert {p.suffix for p in inner.files} == {".folded"}
+
+
+def test_tracemalloc_reports_allocations(profile_dir):
+    configure(["tracemalloc"], [], profile_dir)
+
+    with profiled("rag.initial_indexing") as profile:
+        data = [bytearray(1024) for _ in range(200)]
+
+    report = next(p for p in profile.files if p.name.endswith(".tracemalloc.txt")).read_text(encoding="utf-8")
+    assert "profiling_test.py" in report
+    assert len(data) == 200
+
+
+def test_overlapping_tracemalloc_profiles_share_tracing(profile_dir):
+    configure(["tracemalloc"], [], profile_dir)
+    started, finish = threading.Event(), threading.Event()
+    results = {}
+
+    def first():
+        with profiled("agent.answer") as profile:
+            started.set()
+            finish.wait(5)
+        results["first"] = profile
+
+    thread = threading.Thread(target=first)
+    thread.start()
+    started.wait(5)
+    with profiled("agent.answer") as second:
+        # The profile that started tracing ends while this one is still running
+        finish.set()
+        thread.join(5)
+        assert tracemalloc.is_tracing()
+        data = [bytearray(1024) for _ in range(100)]
+
+    assert not tracemalloc.is_tracing()
+    assert len(data) == 100
+    for profile in (results["first"], second):
+        assert any(p.name.endswith(".tracemalloc.txt") for p in profile.files)
@@ -0,0 +1,20 @@
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from benchmarks.retrieval_eval import NumpyIndex, score
+
+
+def test_numpy_index_returns_exact_cosine_order():
+    index = NumpyIndex([[1.0, 0.0], [0.0, 1.0], [1.0, 1.0]], ["a", "b", "c"])
+
+    assert index.search([1.0, 0.2], k=3) == [0, 2, 1]
+
+
+def test_score_counts_each_note_once():
+    golden = [{"query": "q1", "relevant": ["a"]}, {"query": "q2", "relevant": ["c"]}]
+    ranked = [["b", "b", "a"], ["b", "d", "e"]]
+
+    result = score(ranked, golden, k=2)
+
+    assert result["recall@2"] == 0.5
+    assert result["mrr"] == 0.25
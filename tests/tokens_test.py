@@ -0,0 +1,113 @@
+from types import SimpleNamespace
+
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+from LLM.base import LLMConfig
+from LLM.openrouter_llm import OpenRouterLLM
+from LLM.tokens import ContextBudget, TokenCounter, TokenUsage, usage_from_messages
+
+
+def char_counter():
+    # Deterministic 1 token per 4 chars, with or without tiktoken installed
+    counter = TokenCounter(chars_per_token=4.0)
+    counter._encoding = None
+    return counter
+
+
+def test_truncate_keeps_head_and_tail():
+    counter = char_counter()
+    text = "START " + "x" * 4000 + " END"
+
+    truncated = counter.truncate(text, 100)
+
+    assert truncated.startswith("START")
+    assert truncated.endswith("END")
+    assert "обрезано" in truncated
+    assert counter.count(truncated) < counter.count(text)
+    assert counter.truncate("short", 100) == "short"
+
+
+def test_budget_drops_oldest_turns_but_keeps_system_and_latest_question():
+    counter = char_counter()
+    system = SystemMessage(content="system prompt")
+    old = [HumanMessage(content="old " * 200), AIMessage(content="old answer " * 100)]
+    latest = HumanMessage(content="latest question")
+    budget = ContextBudget(max_prompt_tokens=120, counter=counter)
+
+    kept = budget.apply([system, *old, latest])
+
+    assert kept[0] is system
+    assert kept[-1].content == "latest question"
+    assert all(m not in kept for m in old)
+    assert counter.count_messages(kept) <= 120
+
+
+def test_budget_does_not_start_history_with_orphaned_tool_result():
+    counter = char_counter()
+    call = AIMessage(content="", tool_calls=[{"name": "search_notes", "args": {"query": "q"}, "id": "1"}])
+    messages = [
+        HumanMessage(content="first " * 100), call,
+        ToolMessage(content="found " * 50, tool_call_id="1"),
+        HumanMessage(content="second"),
+    ]
+
+    kept = ContextBudget(max_prompt_tokens=60, counter=counter).apply(messages)
+
+    assert not isinstance(kept[0], ToolMessage)
+    assert kept[-1].content == "second"
+
+
+def test_over_budget_latest_message_is_shrunk_not_dropped():
+    counter = char_counter()
+    system = SystemMessage(content="system")
+    huge = HumanMessage(content="question " + "y" * 4000)
+
+    kept = ContextBudget(max_prompt_tokens=200, counter=counter).apply([system, huge])
+
+    assert kept[0] is system
+    assert kept[1].content.startswith("question")
+    assert counter.count_messages(kept) <= 200 + counter.MESSAGE_OVERHEAD
+
+
+def test_oversize_tool_result_is_truncated_first():
+    counter = char_counter()
+    tool = ToolMessage(content="r" * 8000, tool_call_id="1")
+
+    kept = ContextBudget(max_prompt_tokens=10_000, max_tool_result_tokens=100, counter=counter).apply([tool])
+
+    assert counter.count(kept[0].content) <= 150
+
+
+def response(content, usage=None):
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))], usage=usage)
+
+
+def test_record_usage_accumulates_reported_and_estimated_tokens():
+    llm = OpenRouterLLM.__new__(OpenRouterLLM)
+    llm.llm_config = LLMConfig(model_name="test", temperature=0.1, max_tokens=100, timeout=10, retry_attempts=1, api_key=None)
+    llm.logger = None
+    llm.token_counter = char_counter()
+    llm.usage = TokenUsage()
+
+    first = llm._record_usage(response("hi", SimpleNamespace(prompt_tokens=10, completion_tokens=3)), [], None)
+    # No usage from the upstream: estimated locally from the prompt and the answer
+    second = llm._record_usage(response("a" * 40), [{"role": "user", "content": "b" * 40}], None)
+
+    assert first == {"input_tokens": 10, "output_tokens": 3, "total_tokens": 13}
+    assert second["output_tokens"] == 10
+    assert llm.usage.calls == 2
+    assert llm.usage.prompt_tokens == 10 + second["input_tokens"]
+    assert llm.usage.total_tokens == 13 + second["total_tokens"]
+    assert llm.last_response.tokens_used == second["total_tokens"]
+
+
+def test_usage_from_messages_sums_ai_usage_only():
+    messages = [
+        HumanMessage(content="q"),
+        AIMessage(content="a", usage_metadata={"input_tokens": 5, "output_tokens": 2, "total_tokens": 7}),
+        AIMessage(content="b", usage_metadata={"input_tokens": 8, "output_tokens": 1, "total_tokens": 9}),
+    ]
+
+    assert usage_from_messages(messages) == {"prompt_tokens": 13, "completion_tokens": 3, "total_tokens": 16}
@@ -0,0 +1,177 @@
+import json
+import time
+import threading
+import pytest
+import tempfile
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from AGENT.tools import FileOperationTools
+
+
+@pytest.fixture
+def temp_dir():
+    temp = tempfile.mkdtemp()
+    yield temp
+    shutil.rmtree(temp)
+
+
+@pytest.fixture
+def file_tools(temp_dir):
+    return FileOperationTools(notes_dir=temp_dir)
+
+
+def get_tool(file_tools, name):
+    return {t.name: t for t in file_tools.create_tools()}[name]
+
+
+class ConcurrencyProbe:
+    def __init__(self, delay=0.05):
+        self.delay = delay
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, *args, **kwargs):
+        with self._lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        time.sleep(self.delay)
+        with self._lock:
+            self.active -= 1
+        return {"status": "success"}
+
+
+def test_read_does_not_wait_for_a_mutation_lock(file_tools):
+    file_tools.notes_manager.create_note("a", "first")
+    read_note = get_tool(file_tools, "read_note")
+
+    with file_tools._locked("a.md"), ThreadPoolExecutor(max_workers=1) as executor:
+        result = executor.submit(read_note.invoke, {"filename": "a.md"}).result(timeout=1)
+
+    assert "first" in json.loads(result)["content"]
+
+
+def test_mutations_on_same_file_are_serialised(file_tools):
+    probe = ConcurrencyProbe()
+    file_tools.notes_manager.edit_note = probe
+    edit_note = get_tool(file_tools, "edit_note")
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        list(executor.map(
+            lambda i: edit_note.invoke({"filename": "a.md", "content": str(i), "title": "a"}),
+            range(4)
+        ))
+
+    assert probe.max_active == 1
+
+
+def test_mutations_on_different_files_run_concurrently(file_tools):
+    probe = ConcurrencyProbe()
+    file_tools.notes_manager.delete_note = probe
+    delete_note = get_tool(file_tools, "delete_note")
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        list(executor.map(lambda i: delete_note.invoke({"filename": f"{i}.md"}), range(4)))
+
+    assert probe.max_active > 1
+
+
+def test_searches_run_concurrently(file_tools):
+    probe = ConcurrencyProbe()
+
+    class SlowRag:
+        def query(self, query, k=5):
+            probe()
+            return {"documents": [[query]]}
+
+    file_tools.rag_assistant = SlowRag()
+    search_notes = get_tool(file_tools, "search_notes")
+
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        results = list(executor.map(lambda q: search_notes.invoke({"query": q}), ["a", "b", "c"]))
+
+    assert probe.max_active == 3
+    assert [json.loads(r)["results"][0]["content"] for r in results] == ["a", "b", "c"]
+
+
+def test_read_note_memoized_within_run(file_tools):
+    file_tools.notes_manager.create_note("a", "first")
+    read_note = get_tool(file_tools, "read_note")
+
+    with file_tools.run_scope() as cache:
+        read_note.invoke({"filename": "a.md"})
+        (file_tools.notes_manager.notes_dir / "a.md").write_text("changed outside", encoding="utf-8")
+        result = json.loads(read_note.invoke({"filename": "a.md"}))
+
+    assert "first" in result["content"]
+    assert cache.stats()["hits"] == 1
+
+
+def test_mutation_invalidates_cached_read(file_tools):
+    file_tools.notes_manager.create_note("a", "first")
+    tools = {t.name: t for t in file_tools.create_tools()}
+
+    with file_tools.run_scope() as cache:
+        tools["read_note"].invoke({"filename": "a.md"})
+        tools["edit_note"].invoke({"filename": "a.md", "content": "second", "title": "a"})
+        result = json.loads(tools["read_note"].invoke({"filename": "a.md"}))
+
+    assert "second" in result["content"]
+    assert cache.stats()["hits"] == 0
+    assert cache.stats()["invalidations"] >= 1
+
+
+def test_near_identical_searches_share_results(file_tools):
+    calls = []
+
+    class Rag:
+        def query(self, query, k=5):
+            calls.append(query)
+            return {"documents": [[f"doc{i}" for i in range(k)]]}
+
+    file_tools.rag_assistant = Rag()
+    search_notes = get_tool(file_tools, "search_notes")
+
+    with file_tools.run_scope() as cache:
+        search_notes.invoke({"query": "Python tips", "k": 5})
+        search_notes.invoke({"query": "tips, python!", "k": 5})
+        smaller = json.loads(search_notes.invoke({"query": "python tips", "k": 2}))
+
+    assert len(calls) == 1
+    assert smaller["results_count"] == 2
+    assert cache.stats()["hits_by_tool"]["search_notes"] == 2
+
+
+def test_no_memo_outside_run_scope(file_tools):
+    file_tools.notes_manager.create_note("a", "first")
+    read_note = get_tool(file_tools, "read_note")
+
+    read_note.invoke({"filename": "a.md"})
+    (file_tools.notes_manager.notes_dir / "a.md").write_text("changed", encoding="utf-8")
+
+    assert json.loads(read_note.invoke({"filename": "a.md"}))["content"] == "changed"
+
+
+def test_search_served_from_matching_prefetch(file_tools):
+    calls = []
+
+    class Rag:
+        def query(self, query, k=5):
+            calls.append(query)
+            return {"documents": [[f"doc{i}" for i in range(k)]]}
+
+    file_tools.rag_assistant = Rag()
+    search_notes = get_tool(file_tools, "search_notes")
+
+    with ThreadPoolExecutor(max_workers=1) as executor, file_tools.run_scope() as cache:
+        cache.add_prefetch("Explain kafka consumer groups", 5, executor.submit(Rag().query, "prefetched", k=5))
+        hit = json.loads(search_notes.invoke({"query": "kafka consumer groups", "k": 3}))
+        search_notes.invoke({"query": "something unrelated"})
+
+    assert hit["results_count"] == 3
+    assert calls == ["prefetched", "something unrelated"]
+    assert cache.stats()["prefetch_hits"] == 1
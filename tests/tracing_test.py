@@ -0,0 +1,85 @@
+import contextvars
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from MONITORING.tracing import span, configure, load_spans, render_waterfall, NOOP_SPAN
+
+
+class ListExporter:
+    def __init__(self):
+        self.spans = []
+
+    def export(self, span):
+        self.spans.append(span)
+
+
+@pytest.fixture
+def exporter():
+    exporter = ListExporter()
+    configure(exporters=[exporter])
+    yield exporter
+    configure()
+
+
+def test_disabled_tracing_yields_noop():
+    configure()
+    with span("agent.turn") as s:
+        s.set(ignored=True)
+    assert s is NOOP_SPAN
+
+
+def test_spans_nest_and_share_trace(exporter):
+    with span("agent.turn") as turn:
+        with span("rag.query", k=5) as query:
+            with span("vector.search"):
+                pass
+
+    search, rag, root = exporter.spans
+    assert root is turn and rag is query
+    assert root.parent_id is None
+    assert rag.parent_id == root.span_id
+    assert search.parent_id == rag.span_id
+    assert {s.trace_id for s in exporter.spans} == {root.trace_id}
+    assert rag.attributes == {"k": 5}
+
+
+def test_error_marks_span(exporter):
+    with pytest.raises(ValueError):
+        with span("embed.query"):
+            raise ValueError("ollama down")
+
+    assert exporter.spans[0].status == "error"
+    assert "ollama down" in exporter.spans[0].attributes["error"]
+
+
+def test_copied_context_carries_parent_into_worker_thread(exporter):
+    def work():
+        with span("llm.call"):
+            pass
+
+    with ThreadPoolExecutor(max_workers=1) as executor, span("agent.turn") as turn:
+        executor.submit(contextvars.copy_context().run, work).result()
+
+    assert exporter.spans[0].parent_id == turn.span_id
+
+
+def test_json_lines_roundtrip_and_waterfall(tmp_path):
+    trace_file = tmp_path / "traces.jsonl"
+    configure(trace_file=str(trace_file))
+    try:
+        with span("agent.turn", path="agent") as turn:
+            with span("tool.call", tool="search_notes"):
+                pass
+    finally:
+        configure()
+
+    spans = load_spans(str(trace_file), turn.trace_id[:8])
+    output = render_waterfall(spans)
+
+    assert len(spans) == 2
+    assert output.splitlines()[0].startswith(f"trace {turn.trace_id}")
+    assert "agent.turn" in output and "  tool.call" in output
+    assert "tool=search_notes" in output
@@ -0,0 +1,49 @@
+import pytest
+from unittest.mock import MagicMock
+
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from RAG.components.updater import IncrementalHandler
+from RAG.components.chunks import ChunkBatch
+
+
+@pytest.fixture
+def handler():
+    return IncrementalHandler(vectorstorage=MagicMock(), embedding_model=MagicMock(), processor=MagicMock())
+
+
+def test_deleted_event_removes_chunks(handler):
+    handler.update_handler("/tmp/note.md", "deleted")
+
+    handler.vectorstorage.delete_by_source.assert_called_once_with("/tmp/note.md")
+    handler.processor.document_processor.assert_not_called()
+
+
+def test_modified_event_reindexes(handler):
+    chunks = ChunkBatch()
+    chunks.append("text", "/tmp/note.md", 0, 0, 4)
+    handler.processor.document_processor.return_value = chunks
+    handler.embedding_model.embed_documents.return_value = [[0.1]]
+
+    handler.update_handler("/tmp/note.md", "modified")
+
+    handler.vectorstorage.delete_by_source.assert_called_once_with("/tmp/note.md")
+    handler.embedding_model.embed_documents.assert_called_once_with(["text"])
+    handler.vectorstorage.add_documents.assert_called_once_with(chunks, [[0.1]])
+
+
+def test_duplicates_are_released_and_filtered_before_embedding(handler):
+    chunks = ChunkBatch()
+    chunks.append("text", "/tmp/note.md", 0, 0, 4)
+    chunks.append("copy", "/tmp/note.md", 1, 5, 9)
+    handler.processor.document_processor.return_value = chunks
+    handler.deduplicator = MagicMock()
+    handler.deduplicator.staged.return_value.__enter__.return_value = chunks[:1]
+    handler.embedding_model.embed_documents.return_value = [[0.1]]
+
+    handler.update_handler("/tmp/note.md", "modified")
+
+    handler.deduplicator.release.assert_called_once_with("/tmp/note.md")
+    handler.embedding_model.embed_documents.assert_called_once_with(["text"])
+    handler.deduplicator.save.assert_called_once()
@@ -0,0 +1,74 @@
+import pytest
+import tempfile
+import shutil
+from langchain_core.documents import Document
+
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from RAG.components.vectorstorage import ChromaVectorStorage, HnswParams
+
+
+@pytest.fixture
+def storage():
+    temp = tempfile.mkdtemp()
+    yield ChromaVectorStorage(persist_directory=temp)
+    shutil.rmtree(temp)
+
+
+def chunks_for(source, count):
+    return [
+        Document(page_content=f"{source} part {i}", metadata={"source": source, "file_path": source, "chunk_id": i})
+        for i in range(count)
+    ]
+
+
+def embeddings_for(count, offset=0):
+    return [[1.0, float(offset + i)] for i in range(count)]
+
+
+def test_incremental_adds_do_not_overwrite_other_files(storage):
+    storage.add_documents(chunks_for("a.md", 2), embeddings_for(2))
+    storage.add_documents(chunks_for("b.md", 3), embeddings_for(3, offset=2))
+
+    assert storage.collection.count() == 5
+
+
+def test_readding_a_file_replaces_its_chunks(storage):
+    storage.add_documents(chunks_for("a.md", 2), embeddings_for(2))
+    storage.delete_by_source("a.md")
+    storage.add_documents(chunks_for("a.md", 2), embeddings_for(2))
+
+    assert storage.collection.count() == 2
+
+
+def test_empty_batch_is_noop(storage):
+    storage.add_documents([], [])
+
+    assert storage.collection.count() == 0
+
+
+def test_search_many_matches_individual_searches(storage):
+    storage.add_documents(chunks_for("a.md", 4), [[1.0, 0.0], [0.0, 1.0], [1.0, 1.0], [-1.0, 0.5]])
+    queries = [[1.0, 0.1], [0.1, 1.0]]
+
+    batched = storage.search_many(queries, k=2)
+
+    assert len(batched) == 2
+    for query, result in zip(queries, batched):
+        single = storage.search(query, k=2)
+        assert result["ids"] == single["ids"]
+        assert result["documents"] == single["documents"]
+
+
+def test_hnsw_params_are_applied_on_creation_and_search_ef_on_reopen():
+    temp = tempfile.mkdtemp()
+    try:
+        storage = ChromaVectorStorage(persist_directory=temp, hnsw=HnswParams(m=24, construction_ef=150, search_ef=40))
+        hnsw = storage.collection.configuration_json["hnsw"]
+        assert (hnsw["max_neighbors"], hnsw["ef_construction"], hnsw["ef_search"]) == (24, 150, 40)
+
+        reopened = ChromaVectorStorage(persist_directory=temp, hnsw=HnswParams(search_ef=90))
+        assert reopened.collection.configuration_json["hnsw"]["ef_search"] == 90
+    finally:
+        shutil.rmtree(temp)